@@ -0,0 +1,81 @@
+"""Time JSON encoding, decoding and copying of large KafkaUsers.
+
+    python -m benchmarks.serialization [--acls 500] [--objects 200]
+
+Compares the standard library with knuto.codec, which uses orjson when it is installed.
+"""
+import argparse
+import json
+import timeit
+from copy import deepcopy
+
+from knuto import codec
+from knuto.utils import _copy_object
+
+
+def kafkauser(index, acls):
+    return {
+        "apiVersion": "kafka.strimzi.io/v1beta1",
+        "kind": "KafkaUser",
+        "metadata": {
+            "name": f"production-user-{index}",
+            "namespace": "production",
+            "resourceVersion": str(1000 + index),
+            "uid": f"00000000-0000-0000-0000-{index:012d}",
+            "creationTimestamp": "2021-01-01T00:00:00Z",
+            "labels": {"strimzi.io/cluster": "production"},
+            "annotations": {"knuto.niradynamics.se/source": f"production/user-{index}"},
+        },
+        "spec": {
+            "authentication": {"type": "scram-sha-512"},
+            "authorization": {
+                "type": "simple",
+                "acls": [
+                    {
+                        "resource": {
+                            "type": "topic",
+                            "name": f"production-topic-{acl}",
+                            "patternType": "literal",
+                        },
+                        "operation": operation,
+                        "host": "*",
+                    }
+                    for acl in range(acls)
+                    for operation in ["Read", "Describe"]
+                ],
+            },
+        },
+    }
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    argparser.add_argument("--acls", type=int, default=500, help="ACLs per KafkaUser")
+    argparser.add_argument("--objects", type=int, default=200, help="KafkaUsers per list")
+    argparser.add_argument("--repeat", type=int, default=5)
+    args = argparser.parse_args()
+
+    items = [kafkauser(index, args.acls) for index in range(args.objects)]
+    kafkauser_list = {"apiVersion": "v1", "kind": "List", "items": items}
+    encoded = json.dumps(kafkauser_list)
+
+    cases = [
+        ("encode list, json", lambda: json.dumps(kafkauser_list)),
+        ("encode list, codec", lambda: codec.dumps(kafkauser_list)),
+        ("decode list, json", lambda: json.loads(encoded)),
+        ("decode list, codec", lambda: codec.loads(encoded)),
+        ("copy users, deepcopy", lambda: [deepcopy(item) for item in items]),
+        ("copy users, _copy_object", lambda: [_copy_object(item) for item in items]),
+    ]
+
+    print(
+        f"{args.objects} KafkaUsers with {2 * args.acls} ACLs each, "
+        f"{len(encoded) / 1e6:.1f} MB, orjson {'used' if codec.orjson else 'not installed'}"
+    )
+    for name, fn in cases:
+        best = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+        print(f"{name:<28} {best * 1000:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Pacing of new copies by how far Strimzi is behind.
+
+The copies in the Strimzi namespace are watched, and a copy counts as not ready until its
+Ready condition is True for its current generation. With --strimzi-max-not-ready, a new
+KafkaUser or KafkaTopic is not copied while that many copies of its kind are not ready;
+its create handler is retried after a delay that grows with the number of copies that are
+not ready, up to --strimzi-pacing-max-delay seconds. Updates and deletions are not paced.
+"""
+import threading
+import time
+
+import kopf
+
+from . import metrics
+
+not_ready_copies = metrics.gauge(
+    "knuto_strimzi_not_ready_copies", "Copies Strimzi has not made ready yet", ["kind"]
+)
+oldest_not_ready_copy = metrics.gauge(
+    "knuto_strimzi_oldest_not_ready_seconds",
+    "Time since the copy that has been not ready for the longest was written",
+    ["kind"],
+)
+
+
+def is_ready(body):
+    status = body.get("status") or {}
+    generation = body["metadata"].get("generation")
+    if generation is not None and status.get("observedGeneration") != generation:
+        return False
+
+    return any(
+        condition.get("type") == "Ready" and condition.get("status") == "True"
+        for condition in status.get("conditions") or []
+    )
+
+
+class ReadinessTracker:
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._not_ready = {}
+
+    def observe(self, kind, event_type, body):
+        key = (body["metadata"]["namespace"], body["metadata"]["name"])
+        with self._lock:
+            not_ready = self._not_ready.setdefault(kind, {})
+            if event_type == "DELETED" or is_ready(body):
+                not_ready.pop(key, None)
+            else:
+                not_ready.setdefault(key, self.clock())
+            self._export(kind)
+
+    def not_ready(self, kind):
+        with self._lock:
+            return len(self._not_ready.get(kind, {}))
+
+    def _export(self, kind):
+        not_ready = self._not_ready[kind]
+        not_ready_copies.labels(kind).set(len(not_ready))
+        oldest_not_ready_copy.labels(kind).set(
+            self.clock() - min(not_ready.values()) if not_ready else 0
+        )
+
+    def pace(self, kind, limit, max_delay):
+        """Raise kopf.TemporaryError to retry a create later if Strimzi is behind"""
+        not_ready = self.not_ready(kind)
+        if not_ready < limit:
+            return
+
+        delay = min(max_delay, 5.0 * not_ready / limit)
+        raise kopf.TemporaryError(
+            f"{not_ready} {kind} copies are not ready in Strimzi yet, "
+            f"retrying in {delay:.0f}s",
+            delay=delay,
+        )
+
+
+readiness = ReadinessTracker()
@@ -0,0 +1,141 @@
+import threading
+from copy import deepcopy
+
+SOURCE_ANNOTATION = "knuto.niradynamics.se/source"
+
+
+class KafkaUserIndex:
+    """
+    In-memory index of KafkaUsers, fed by watch events.
+    Only what is needed to join secrets with users and to adopt secrets is kept:
+    apiVersion, kind, name, namespace, uid, labels and annotations.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_name = {}
+        self._by_source = {}
+
+    def apply(self, event_type, body):
+        metadata = body["metadata"]
+        key = (metadata["namespace"], metadata["name"])
+
+        with self._lock:
+            self._forget(key)
+            if event_type == "DELETED":
+                return
+
+            entry = {
+                "apiVersion": body.get("apiVersion"),
+                "kind": body.get("kind"),
+                "metadata": {
+                    "namespace": metadata["namespace"],
+                    "name": metadata["name"],
+                    "uid": metadata.get("uid"),
+                    "labels": dict(metadata.get("labels") or {}),
+                    "annotations": dict(metadata.get("annotations") or {}),
+                },
+            }
+            self._by_name[key] = entry
+            source = entry["metadata"]["annotations"].get(SOURCE_ANNOTATION)
+            if source is not None:
+                self._by_source.setdefault(source, {})[key] = entry
+
+    def _forget(self, key):
+        entry = self._by_name.pop(key, None)
+        if entry is None:
+            return
+
+        source = entry["metadata"]["annotations"].get(SOURCE_ANNOTATION)
+        copies = self._by_source.get(source, {})
+        copies.pop(key, None)
+        if not copies:
+            self._by_source.pop(source, None)
+
+    def get(self, namespace, name):
+        with self._lock:
+            return deepcopy(self._by_name.get((namespace, name)))
+
+    def by_source(self, source):
+        """KafkaUsers annotated as copies of source, on the form namespace/name"""
+        with self._lock:
+            return deepcopy(list(self._by_source.get(source, {}).values()))
+
+
+class DestinationNameCollision(Exception):
+    pass
+
+
+class DestinationNameIndex:
+    """
+    The source of each copy name in the Strimzi namespace, per kind. Copies are named
+    after their source, and KafkaUser copies are prefixed with its namespace, so that
+    e.g. a-b/c and a/b-c would both be copied to a-b-c. The first source to claim a name
+    owns it, unless a copy of another source is seen with that name. As each process has
+    an index of its own, the handlers also index the copy they are about to write before
+    claiming its name.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._owners = {}
+        self._names = {}
+
+    def claim(self, kind, name, source):
+        """
+        Claim the copy name for source, on the form namespace/name, releasing the name
+        it claimed before. Raises DestinationNameCollision if another source owns it.
+        """
+        with self._lock:
+            owner = self._owners.get((kind, name))
+            if owner is not None and owner != source:
+                raise DestinationNameCollision(
+                    f"{source} would be copied to {kind} {name}, which is the copy of "
+                    f"{owner}"
+                )
+            self._set(kind, name, source)
+
+    def _set(self, kind, name, source):
+        previous = self._names.get((kind, source))
+        if previous is not None and previous != name:
+            self._owners.pop((kind, previous), None)
+        self._owners[(kind, name)] = source
+        self._names[(kind, source)] = name
+
+    def apply_copy(self, kind, event_type, body):
+        """Index a copy in the Strimzi namespace as owned by its source annotation"""
+        metadata = body["metadata"]
+        source = (metadata.get("annotations") or {}).get(SOURCE_ANNOTATION)
+        if source is None:
+            return
+
+        with self._lock:
+            if event_type != "DELETED":
+                self._set(kind, metadata["name"], source)
+            elif self._owners.get((kind, metadata["name"])) == source:
+                del self._owners[(kind, metadata["name"])]
+                self._names.pop((kind, source), None)
+
+    def owner(self, kind, name):
+        with self._lock:
+            return self._owners.get((kind, name))
+
+    def release(self, kind, source):
+        with self._lock:
+            name = self._names.pop((kind, source), None)
+            if name is not None and self._owners.get((kind, name)) == source:
+                del self._owners[(kind, name)]
+
+    def release_namespace(self, namespace, kinds):
+        """Release the names of the sources of kinds in namespace, once their copies are
+        gone"""
+        with self._lock:
+            for kind, source in list(self._names):
+                if kind in kinds and source.partition("/")[0] == namespace:
+                    name = self._names.pop((kind, source))
+                    if self._owners.get((kind, name)) == source:
+                        del self._owners[(kind, name)]
+
+
+kafkauser_index = KafkaUserIndex()
+destination_names = DestinationNameIndex()
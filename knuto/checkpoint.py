@@ -0,0 +1,59 @@
+"""Optional checkpoint of knuto-migrate, kept in a SQLite file.
+
+Every object knuto-migrate has rewritten with an API version is recorded, so that a
+migration that is interrupted continues where it stopped.
+"""
+import logging
+import sqlite3
+import threading
+
+from .config import state
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointStore:
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS migrations ("
+            "object TEXT, api_version TEXT, PRIMARY KEY (object, api_version))"
+        )
+        self._db.commit()
+
+    def is_migrated(self, key, api_version):
+        """True if knuto-migrate has rewritten the object key with api_version"""
+        with self._lock:
+            if self._db is None:
+                return False
+
+            row = self._db.execute(
+                "SELECT 1 FROM migrations WHERE object = ? AND api_version = ?",
+                (key, api_version),
+            ).fetchone()
+
+        return row is not None
+
+    def record_migrated(self, key, api_version):
+        with self._lock:
+            if self._db is None:
+                return
+
+            self._db.execute(
+                "INSERT OR REPLACE INTO migrations VALUES (?, ?)", (key, api_version)
+            )
+            self._db.commit()
+
+    def close(self):
+        # Taking the lock waits for a write in progress, so the file is left consistent,
+        # and workers still running after this will no longer touch it.
+        with self._lock:
+            self._db.close()
+            self._db = None
+
+
+def open_checkpoint(path):
+    logger.info(f"Using checkpoint file {path}")
+    state.checkpoint = CheckpointStore(path)
+
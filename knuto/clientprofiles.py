@@ -0,0 +1,73 @@
+"""Tuning profiles for the Kafka clients, rendered into kafka-client.properties.
+
+A profile is a named set of client settings, added to the generated
+kafka-client.properties after the credentials and bootstrap.servers. The profile of a
+KafkaUser is the one named in its knuto.niradynamics.se/client-profile annotation, or
+else that of its namespace, set with --namespace-client-profile NAMESPACE=PROFILE. The
+built-in profiles can be changed, and new ones defined, with --client-profile
+PROFILE/KEY=VALUE.
+"""
+PROFILE_ANNOTATION = "knuto.niradynamics.se/client-profile"
+
+PROFILES = {
+    "high-throughput-producer": {
+        "batch.size": "262144",
+        "linger.ms": "20",
+        "compression.type": "zstd",
+        "buffer.memory": "67108864",
+    },
+    "low-latency-producer": {
+        "batch.size": "16384",
+        "linger.ms": "0",
+        "compression.type": "lz4",
+    },
+    "low-latency-consumer": {
+        "fetch.min.bytes": "1",
+        "fetch.max.wait.ms": "10",
+        "max.poll.records": "100",
+    },
+    "bulk-ingest": {
+        "batch.size": "1048576",
+        "linger.ms": "100",
+        "compression.type": "zstd",
+        "buffer.memory": "134217728",
+        "fetch.min.bytes": "1048576",
+        "fetch.max.wait.ms": "500",
+        "max.partition.fetch.bytes": "4194304",
+    },
+}
+
+# Settings knuto renders itself, from the secret type and the credentials
+RESERVED_PREFIXES = ("bootstrap.servers", "security.protocol", "sasl.", "ssl.")
+
+
+def profile_setting_argument(text):
+    """Parse an argument of the form PROFILE/KEY=VALUE into (PROFILE, KEY, VALUE)"""
+    key, separator, value = text.partition("=")
+    profile, _, key = key.partition("/")
+    if not separator or not profile or not key:
+        raise ValueError(f"{text} is not on the form PROFILE/KEY=VALUE")
+    if key.startswith(RESERVED_PREFIXES):
+        raise ValueError(f"{key} is set by knuto and can not be part of a profile")
+    return profile, key, value
+
+
+def profile_settings(name, custom_profiles):
+    """The settings of the profile name, with those given for it in custom_profiles, or
+    None if there is no such profile"""
+    if name not in PROFILES and name not in custom_profiles:
+        return None
+    return dict(PROFILES.get(name, {}), **custom_profiles.get(name, {}))
+
+
+def profile_name(annotations, namespace, namespace_profiles):
+    """The profile named by a KafkaUser's annotations, or else that of its namespace"""
+    annotations = annotations or {}
+    return annotations.get(PROFILE_ANNOTATION, namespace_profiles.get(namespace))
+
+
+def render(name, settings):
+    """The lines of kafka-client.properties for the profile name"""
+    return f"# Client profile {name}\n" + "".join(
+        f"{key}={value}\n" for key, value in settings.items()
+    )
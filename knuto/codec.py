@@ -0,0 +1,57 @@
+"""JSON encoding and decoding of API payloads.
+
+Uses orjson when it is installed (the "fastjson" extra), and the standard library otherwise.
+Both produce the same objects; orjson is several times faster on large KafkaUsers.
+"""
+import json
+from copy import deepcopy
+from typing import Mapping
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the installed extras
+    orjson = None
+
+
+def _plain(obj):
+    # kopf passes bodies as Mapping views, which neither encoder knows
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+
+    def dumps(obj):
+        """Encode obj as a JSON string"""
+        return orjson.dumps(obj, default=_plain).decode("utf-8")
+
+    def loads(data):
+        """Decode a JSON str or bytes"""
+        return orjson.loads(data)
+
+    def _roundtrip(obj):
+        return orjson.loads(orjson.dumps(obj, default=_plain))
+
+
+else:
+
+    def dumps(obj):
+        """Encode obj as a JSON string"""
+        return json.dumps(obj, default=_plain, separators=(",", ":"))
+
+    def loads(data):
+        """Decode a JSON str or bytes"""
+        return json.loads(data)
+
+    def _roundtrip(obj):
+        return json.loads(json.dumps(obj, default=_plain))
+
+
+def clone(obj):
+    """Deep copy of a JSON-like object, as plain dicts and lists"""
+    try:
+        return _roundtrip(obj)
+    except TypeError:
+        # Not JSON, e.g. bytes, so copy it the slow way
+        return deepcopy(_plain(obj) if isinstance(obj, Mapping) else obj)
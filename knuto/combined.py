@@ -0,0 +1,33 @@
+"""Run the secrets and the KafkaUser/KafkaTopic handlers in one process.
+
+The handlers share one kopf loop, one API client and one watch per kind and namespace, and
+the KafkaUser index of the secrets handlers is also fed by the KafkaUsers the
+KafkaUser/KafkaTopic handlers watch. The ACL, deletion and quota settings apply to all
+source namespaces.
+
+With --workers, the source namespaces are split between several processes, see
+knuto.supervisor.
+"""
+from knuto import kafka_user_topic, secrets
+from knuto.supervisor import _supervisor_arguments, _workers_arguments, run_supervisor
+from knuto.utils import default_main
+
+
+def main():
+    args, remaining_args = _supervisor_arguments().parse_known_args()
+    if args.workers > 1:
+        return run_supervisor(args, remaining_args)
+
+    return default_main(
+        [
+            kafka_user_topic._kafka_user_topic_arguments(),
+            secrets._secret_arguments(),
+            secrets._regenerate_on_startup_arguments(),
+            _workers_arguments(),
+        ],
+        combined=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
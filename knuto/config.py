@@ -2,11 +2,55 @@
 
 
 class globalconf:
+    strimzi_version = "v1beta1"
     kafka_user_topic_destination_namespace = None
     kafka_user_topic_source_namespaces = set([])
     secret_type_to_hostname_map = {}
+    tls_secret_mount_path = "/etc/kafka-config"
+    client_profiles = {}
+    namespace_client_profiles = {}
     kafka_topic_deletion_enabled = False
 
+    max_topics = None
+    max_topic_partitions = None
+    max_topic_partition_replicas = None
+
+    kafkauser_quota_defaults = {}
+    kafkauser_quota_maximums = {}
+    kafkatopic_config_defaults = {}
+    kafkatopic_config_ranges = {}
+
+    drift_scan_interval = None
+    drift_scan_page_size = 100
+    drift_scan_max_api_calls = 200
+    drift_scan_cpu_budget = 1.0
+
+    watch_copies = False
+    strimzi_max_not_ready = None
+    strimzi_pacing_max_delay = 60.0
+    status_reflection_enabled = False
+    status_flush_interval = 5.0
+    status_batch_size = 50
+
+    watch_timeout = None
+    watch_check_interval = None
+    watch_stale_after = 300
+
+    handler_threads = None
+    namespace_weights = {}
+    handler_priorities = {}
+
+    event_window = None
+    events_per_namespace = None
+    event_level = None
+
+    metrics_port = None
+    skip_unchanged_writes = False
+    replication_lag_tracking_enabled = False
+
+    regenerate_secrets_on_startup = False
+    regenerate_concurrency = 8
+
     cross_namespace_read_enabled = False
     read_allowed_non_namespaced_topics = []
 
@@ -27,3 +71,9 @@ class globalconf:
 
 class state:
     api = None
+    namespace = None
+    combined = False
+    checkpoint = None
+    drift_scanner = None
+    watch_checker = None
+    status_reflector = None
@@ -0,0 +1,33 @@
+"""Content hashes of the objects knuto writes.
+
+With --skip-unchanged-writes, _update_or_create writes a hash of the content of every
+object to the object itself, in the knuto.niradynamics.se/content-hash annotation. When a
+handler is run again, e.g. after a restart or on a retry, the write is skipped if the
+object in the cluster still has the hash of what would be written. A copy that has been
+deleted, or edited by someone else, has not, and is written again.
+"""
+import hashlib
+import json
+
+from .tracing import without_trace_annotations
+
+CONTENT_HASH_ANNOTATION = "knuto.niradynamics.se/content-hash"
+
+
+def content_hash(obj):
+    """Hash of an object as written by knuto, ignoring the per-write trace annotations and
+    the hash annotation itself"""
+    projected = without_trace_annotations(obj)
+    (projected.get("metadata", {}).get("annotations") or {}).pop(
+        CONTENT_HASH_ANNOTATION, None
+    )
+    return hashlib.sha256(
+        json.dumps(projected, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def stamp_content_hash(obj):
+    """Annotate the pykube object obj with the hash of its content, and return the hash"""
+    digest = content_hash(obj.obj)
+    obj.annotations[CONTENT_HASH_ANNOTATION] = digest
+    return digest
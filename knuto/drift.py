@@ -0,0 +1,190 @@
+"""Detection and repair of copies that have been changed in the Strimzi namespace.
+
+A single background thread periodically lists the source objects and their copies page by
+page, and compares the spec of each copy with the spec the handlers would write for its
+source. Divergent copies are replaced with what the handlers would write. Each scan stops
+when it has used up its budget of API calls or CPU time, and the next scan continues from
+the page of sources it stopped at, or starts over if that page's continue token has
+expired.
+"""
+import threading
+import time
+
+from pykube.exceptions import HTTPError
+
+from . import codec, metrics
+from .cache import SOURCE_ANNOTATION
+from .config import state
+from .tracing import untraced_spec
+from .utils import _list_pages, _list_paged, _stamp_content_hash
+
+drift_repairs = metrics.counter(
+    "knuto_drift_repairs_total", "Copies replaced because they had drifted", ["kind"]
+)
+
+
+def _spec_projection(obj):
+    """The spec of a copy, without the per-write trace annotations"""
+    return untraced_spec(obj)
+
+
+class ScanBudgetExceeded(Exception):
+    pass
+
+
+class DriftScanner:
+    """
+    kinds is a list of (api_object_class, desired_copy) pairs, where
+    desired_copy(body, namespace, name, copies) returns the copy the handlers would
+    write for a source object, given the copies that exist by name, or None if the
+    source may not be copied.
+    """
+
+    def __init__(
+        self,
+        kinds,
+        source_namespaces,
+        destination_namespace,
+        logger,
+        *,
+        interval,
+        page_size=100,
+        max_api_calls=200,
+        cpu_budget=1.0,
+    ):
+        self.kinds = kinds
+        self.source_namespaces = sorted(source_namespaces)
+        self.destination_namespace = destination_namespace
+        self.logger = logger
+        self.interval = interval
+        self.page_size = page_size
+        self.max_api_calls = max_api_calls
+        self.cpu_budget = cpu_budget
+        self._stopped = threading.Event()
+        self._thread = None
+        # (kind index, source namespace index, continue token) of where a scan stopped
+        self._position = None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="knuto-drift-scanner", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.scan()
+            except Exception as e:
+                self.logger.error(f"Drift scan failed: {e}")
+
+    def _spend(self, api_calls=0):
+        self._api_calls += api_calls
+        if (
+            self._api_calls > self.max_api_calls
+            or time.thread_time() - self._cpu_started > self.cpu_budget
+        ):
+            raise ScanBudgetExceeded()
+
+    def scan(self):
+        """Scan the kinds once, from where the last scan stopped, and return the number
+        of repaired copies"""
+        self._api_calls = 0
+        self._cpu_started = time.thread_time()
+        self._repaired = 0
+
+        kind_index, namespace_index, token = self._position or (0, 0, None)
+        try:
+            for kind_index in range(kind_index, len(self.kinds)):
+                self._scan_kind(kind_index, namespace_index, token)
+                namespace_index, token = 0, None
+            self._position = None
+        except ScanBudgetExceeded:
+            kind_index, namespace_index, _ = self._position
+            self.logger.info(
+                f"Drift scan budget used up after {self._api_calls} API calls, "
+                f"continuing with the {self.kinds[kind_index][0].kind}s of "
+                f"{self.source_namespaces[namespace_index]} in the next scan"
+            )
+        except HTTPError as e:
+            if e.code != 410:
+                raise
+            self.logger.info("Drift scan position has expired, starting over")
+            self._position = None
+
+        return self._repaired
+
+    def _scan_kind(self, kind_index, namespace_index, token):
+        api_object_class, desired_copy = self.kinds[kind_index]
+        self._position = (kind_index, namespace_index, token)
+        source_prefixes = tuple(f"{namespace}/" for namespace in self.source_namespaces)
+        copies = {}
+        for copy in _list_paged(
+            api_object_class.objects(state.api).filter(
+                namespace=self.destination_namespace
+            ),
+            self.page_size,
+            on_page=lambda: self._spend(api_calls=1),
+        ):
+            if copy.annotations.get(SOURCE_ANNOTATION, "").startswith(source_prefixes):
+                copies[copy.name] = copy
+
+        for namespace_index in range(namespace_index, len(self.source_namespaces)):
+            for sources, token in _list_pages(
+                api_object_class.objects(state.api).filter(
+                    namespace=self.source_namespaces[namespace_index]
+                ),
+                self.page_size,
+                token=token,
+                on_page=lambda: self._spend(api_calls=1),
+            ):
+                for source in sources:
+                    self._check(api_object_class, desired_copy, copies, source)
+                # Where the next scan continues if this one stops before the next page
+                if token is not None:
+                    self._position = (kind_index, namespace_index, token)
+                else:
+                    self._position = (kind_index, namespace_index + 1, None)
+
+    def _check(self, api_object_class, desired_copy, copies, source):
+        desired = desired_copy(source.obj, source.namespace, source.name, copies)
+        if desired is None:
+            return
+
+        current = copies.get(desired.name)
+        if current is None or _spec_projection(current.obj) == _spec_projection(
+            desired.obj
+        ):
+            return
+        # The copy of another source, whose copy would have the same name
+        source_key = f"{source.namespace}/{source.name}"
+        if current.annotations[SOURCE_ANNOTATION] != source_key:
+            return
+
+        self._spend(api_calls=1)
+        self.logger.warning(
+            f"{api_object_class.kind} {current.namespace}/{current.name} has drifted "
+            f"from {source.namespace}/{source.name}, replacing it"
+        )
+        _replace(desired, current)
+        drift_repairs.labels(api_object_class.kind).inc()
+        self._repaired += 1
+
+
+def _replace(desired, current):
+    """Replace current with desired, keeping what others maintain in its metadata"""
+    # Hashed as the handlers hash it, before the metadata of current is added, so that
+    # they do not write the repaired copy again
+    _stamp_content_hash(desired)
+    for key in ["resourceVersion", "finalizers", "ownerReferences"]:
+        if key in current.obj["metadata"]:
+            desired.obj["metadata"][key] = current.obj["metadata"][key]
+
+    r = state.api.put(**desired.api_kwargs(data=codec.dumps(desired.obj)))
+    state.api.raise_for_status(r)
+    desired.set_obj(codec.loads(r.content))
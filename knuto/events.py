@@ -0,0 +1,131 @@
+"""Limits on the Kubernetes Events kopf posts for handler log messages.
+
+kopf posts every message logged for an object as an Event of that object, with the reason
+Logging and a type given by the level of the message. With --event-window, only the first
+message of each object and level, and so of each Event type and reason, is posted per
+window, and the next one posted says how many were left out in between. With
+--events-per-namespace, at most that many Events are posted per namespace and window.
+--event-level warning posts warnings and errors only, such as refused ACLs and topics
+without the namespace prefix.
+"""
+import logging
+import threading
+import time
+
+import kopf
+
+from . import metrics
+from .config import globalconf
+
+events_suppressed = metrics.counter(
+    "knuto_events_suppressed_total",
+    "Log messages not posted as Kubernetes Events",
+    ["namespace", "cause"],
+)
+
+EVENT_LEVELS = {"info": logging.INFO, "warning": logging.WARNING}
+
+
+class EventAggregator(logging.Filter):
+    def __init__(self, window, per_namespace_limit=None, clock=time.monotonic):
+        super(EventAggregator, self).__init__()
+        self.window = window
+        self.per_namespace_limit = per_namespace_limit
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._objects = {}
+        self._namespaces = {}
+
+    def filter(self, record):
+        ref = getattr(record, "k8s_ref", None)
+        if ref is None:
+            return True
+
+        namespace = ref.get("namespace") or ""
+        key = (ref.get("kind"), namespace, ref.get("name"), record.levelno)
+        now = self.clock()
+
+        with self._lock:
+            window_started, suppressed = self._objects.get(key, (None, 0))
+            if window_started is not None and now - window_started < self.window:
+                self._objects[key] = (window_started, suppressed + 1)
+                events_suppressed.labels(namespace, "aggregated").inc()
+                return False
+
+            if self.per_namespace_limit is not None:
+                namespace_started, posted = self._namespaces.get(namespace, (now, 0))
+                if now - namespace_started >= self.window:
+                    namespace_started, posted = now, 0
+                if posted >= self.per_namespace_limit:
+                    self._namespaces[namespace] = (namespace_started, posted)
+                    events_suppressed.labels(namespace, "namespace_limit").inc()
+                    return False
+                self._namespaces[namespace] = (namespace_started, posted + 1)
+
+            self._objects[key] = (now, 0)
+            self._expire(now)
+
+        if suppressed:
+            record.knuto_suppressed_events = suppressed
+        return True
+
+    def _expire(self, now):
+        if len(self._objects) < 10000:
+            return
+
+        self._objects = {
+            key: value
+            for key, value in self._objects.items()
+            if now - value[0] < self.window
+        }
+
+
+class AggregatedFormatter(logging.Formatter):
+    """Adds the number of messages left out since the last Event to the message"""
+
+    def __init__(self, formatter):
+        super(AggregatedFormatter, self).__init__()
+        self.formatter = formatter or logging.Formatter()
+
+    def format(self, record):
+        message = self.formatter.format(record)
+        suppressed = getattr(record, "knuto_suppressed_events", 0)
+        if suppressed:
+            message += f" ({suppressed} similar messages not posted)"
+        return message
+
+
+def _event_posters():
+    # kopf adds its Event-posting handler to this logger when it is imported. It is not
+    # part of kopf's API, so configure_event_posting warns when it is not found.
+    return [
+        handler
+        for handler in logging.getLogger("kopf.objects").handlers
+        if type(handler).__name__ == "K8sPoster"
+    ]
+
+
+@kopf.on.startup()
+def configure_event_posting(settings, logger, **_):
+    if globalconf.event_level is not None:
+        settings.posting.level = EVENT_LEVELS[globalconf.event_level]
+
+    if globalconf.event_window is None:
+        return
+
+    logger.info(
+        f"Posting at most one Event per object and level every "
+        f"{globalconf.event_window}s"
+    )
+    aggregator = EventAggregator(
+        globalconf.event_window, globalconf.events_per_namespace
+    )
+    posters = _event_posters()
+    if not posters:
+        logger.warning(
+            "kopf's Event poster not found, Events are posted without --event-window "
+            "and --events-per-namespace"
+        )
+    for poster in posters:
+        poster.addFilter(aggregator)
+        poster.setFormatter(AggregatedFormatter(poster.formatter))
@@ -0,0 +1,226 @@
+"""An in-memory Kubernetes API for running the handlers without a cluster.
+
+FakeApiAdapter is mounted as the transport of a pykube HTTPClient. It serves get, list,
+create, merge patch and delete of namespaced objects, the status subresource, and the
+discovery requests of object_factory. Objects are kept by API group, plural, namespace and
+name, so all versions of a group serve the same objects. Every request is counted by method
+and resource.
+"""
+import threading
+from collections import Counter
+from urllib.parse import parse_qs, urlparse
+
+import pykube
+import requests
+from requests.adapters import BaseAdapter
+
+from . import codec
+
+RESOURCES = {
+    "": [("namespaces", "Namespace", False), ("secrets", "Secret", True)],
+    "kafka.strimzi.io": [
+        ("kafkausers", "KafkaUser", True),
+        ("kafkatopics", "KafkaTopic", True),
+    ],
+}
+PLURALS = {
+    kind: (group, plural)
+    for group, resources in RESOURCES.items()
+    for plural, kind, _ in resources
+}
+
+
+def merge_patch(target, patch):
+    """Apply a JSON merge patch (RFC 7386)"""
+    if not isinstance(patch, dict):
+        return patch
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = merge_patch(result.get(key), value)
+    return result
+
+
+def _matches(obj, selector):
+    labels = obj["metadata"].get("labels") or {}
+    for requirement in filter(None, (selector or "").split(",")):
+        key, equals, value = requirement.partition("=")
+        if not equals:
+            if key not in labels:
+                return False
+        elif labels.get(key) != value:
+            return False
+    return True
+
+
+class FakeApiAdapter(BaseAdapter):
+    def __init__(self):
+        super(FakeApiAdapter, self).__init__()
+        self._lock = threading.Lock()
+        self._objects = {}
+        self._resource_version = 0
+        self.calls = Counter()
+
+    def _key(self, obj):
+        group, plural = PLURALS[obj["kind"]]
+        return (group, plural, obj["metadata"].get("namespace"), obj["metadata"]["name"])
+
+    def put_object(self, obj):
+        """Store obj as it is, without counting a request"""
+        with self._lock:
+            self._objects[self._key(obj)] = codec.clone(obj)
+
+    def remove_object(self, obj):
+        with self._lock:
+            self._objects.pop(self._key(obj), None)
+
+    def get_object(self, kind, namespace, name):
+        group, plural = PLURALS[kind]
+        with self._lock:
+            return self._objects.get((group, plural, namespace, name))
+
+    def _response(self, request, status_code, body):
+        response = requests.Response()
+        response.status_code = status_code
+        response.headers["Content-Type"] = "application/json"
+        response._content = codec.dumps(body).encode("utf-8")
+        response.url = request.url
+        response.request = request
+        response.encoding = "utf-8"
+        return response
+
+    def _status(self, request, code, reason):
+        return self._response(
+            request,
+            code,
+            {"kind": "Status", "status": "Failure", "code": code, "reason": reason},
+        )
+
+    def _parse(self, path):
+        """(group, version, namespace, plural, name, subresource) of a path"""
+        parts = [part for part in path.split("/") if part]
+        if parts[:1] == ["api"]:
+            group, rest = "", parts[1:]
+        else:
+            group, rest = parts[1], parts[2:]
+        version, rest = (rest[0], rest[1:]) if rest else (None, [])
+
+        namespace = None
+        if len(rest) >= 3 and rest[0] == "namespaces":
+            namespace, rest = rest[1], rest[2:]
+        plural = rest[0] if rest else None
+        name = rest[1] if len(rest) > 1 else None
+        subresource = rest[2] if len(rest) > 2 else None
+        return group, version, namespace, plural, name, subresource
+
+    def send(self, request, **kwargs):
+        url = urlparse(request.url)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        group, version, namespace, plural, name, subresource = self._parse(url.path)
+        self.calls[(request.method, plural or "discovery")] += 1
+
+        if version is None:
+            return self._response(
+                request,
+                200,
+                {
+                    "preferredVersion": {
+                        "groupVersion": f"{group}/v1beta1",
+                        "version": "v1beta1",
+                    }
+                },
+            )
+        if plural is None:
+            return self._response(
+                request,
+                200,
+                {
+                    "resources": [
+                        {"name": plural, "kind": kind, "namespaced": namespaced}
+                        for plural, kind, namespaced in RESOURCES.get(group, [])
+                    ]
+                },
+            )
+
+        body = codec.loads(request.body) if request.body else None
+        with self._lock:
+            return self._handle(
+                request, params, (group, plural, namespace, name), subresource, body
+            )
+
+    def _handle(self, request, params, key, subresource, body):
+        group, plural, namespace, name = key
+        if name is None:
+            items = [
+                obj
+                for (g, p, ns, _), obj in sorted(self._objects.items())
+                if g == group
+                and p == plural
+                and (namespace is None or ns == namespace)
+                and _matches(obj, params.get("labelSelector"))
+            ]
+            if request.method == "GET":
+                return self._response(
+                    request,
+                    200,
+                    {
+                        "items": items,
+                        "metadata": {"resourceVersion": str(self._resource_version)},
+                    },
+                )
+            if request.method == "DELETE":
+                for obj in items:
+                    del self._objects[
+                        (group, plural, namespace, obj["metadata"]["name"])
+                    ]
+                return self._response(request, 200, {"kind": "Status"})
+
+            # POST creates an object in the collection
+            key = (group, plural, namespace, body["metadata"]["name"])
+            if key in self._objects:
+                return self._status(request, 409, "AlreadyExists")
+            self._resource_version += 1
+            body["metadata"]["resourceVersion"] = str(self._resource_version)
+            self._objects[key] = body
+            return self._response(request, 201, body)
+
+        obj = self._objects.get(key)
+        if obj is None:
+            if plural == "namespaces":
+                return self._response(
+                    request,
+                    200,
+                    {"metadata": {"name": name}, "status": {"phase": "Active"}},
+                )
+            return self._status(request, 404, "NotFound")
+
+        if request.method == "GET":
+            return self._response(request, 200, obj)
+        if request.method == "DELETE":
+            del self._objects[key]
+            return self._response(request, 200, {"kind": "Status"})
+
+        if request.method == "PATCH":
+            if subresource == "status":
+                body = {"status": body.get("status")}
+            obj = merge_patch(obj, body)
+        else:
+            obj = body
+        self._resource_version += 1
+        obj["metadata"]["resourceVersion"] = str(self._resource_version)
+        self._objects[key] = obj
+        return self._response(request, 200, obj)
+
+    def close(self):
+        pass
+
+
+def fake_api():
+    """A pykube HTTPClient and the FakeApiAdapter serving it"""
+    adapter = FakeApiAdapter()
+    api = pykube.HTTPClient(
+        pykube.KubeConfig.from_url("http://knuto-fake-api"), http_adapter=adapter
+    )
+    return api, adapter
@@ -1,16 +1,136 @@
+import logging
 from argparse import ArgumentParser, Action
 
 import kopf
 from pykube import object_factory
 
+from knuto import codec, strimzi, tracing
+from knuto.backpressure import readiness
+from knuto.cache import SOURCE_ANNOTATION, DestinationNameCollision, destination_names
 from knuto.config import globalconf, state
+from knuto.drift import DriftScanner
+from knuto.profiling import profiled
+from knuto.scheduling import prioritized
+from knuto.quota import (
+    QuotaExceeded,
+    capped_user_quotas,
+    topic_quota_index,
+    user_quota_argument,
+    user_quotas,
+)
+from knuto.reflection import StatusReflector, reflected_status
+from knuto.teardown import SOURCE_NAMESPACE_LABEL, namespace_teardown
+from knuto.topicconfig import (
+    ADJUSTED_ANNOTATION,
+    adjust_spec,
+    config_default_argument,
+    config_range_argument,
+    namespace_settings,
+)
 from knuto.utils import _copy_object, _update_or_create, default_main
+from knuto.watchhealth import start_watch_checker, watch_health
+
+
+logger = logging.getLogger(__name__)
 
 
 class AclNotAllowed(Exception):
     pass
 
 
+def _in_source_namespace(namespace, **_):
+    # The destination namespace is also watched when running combined with the secrets
+    # handlers, and the copies in it must not be copied again.
+    return namespace != globalconf.kafka_user_topic_destination_namespace
+
+
+def _is_copy(namespace, annotations, **_):
+    return (
+        namespace == globalconf.kafka_user_topic_destination_namespace
+        and SOURCE_ANNOTATION in annotations
+    )
+
+
+def _pace_create(kind):
+    if globalconf.strimzi_max_not_ready is not None:
+        readiness.pace(
+            kind,
+            globalconf.strimzi_max_not_ready,
+            globalconf.strimzi_pacing_max_delay,
+        )
+
+
+def _reflect_status(kind, event_type, body):
+    if state.status_reflector is None or event_type == "DELETED":
+        return
+
+    namespace, _, name = body["metadata"]["annotations"][SOURCE_ANNOTATION].partition(
+        "/"
+    )
+    if namespace in _source_namespaces():
+        state.status_reflector.reflect(
+            kind, namespace, name, reflected_status(kind, body)
+        )
+
+
+def _observe_source_status(kind, event_type, body):
+    if state.status_reflector is None:
+        return
+
+    namespace, name = body["metadata"]["namespace"], body["metadata"]["name"]
+    if event_type == "DELETED":
+        state.status_reflector.forget(kind, namespace, name)
+    else:
+        state.status_reflector.observe_source(kind, namespace, name, body)
+
+
+def _destination_name(kind, namespace, name):
+    """The name of the copy of namespace/name in the destination namespace"""
+    if kind == "KafkaUser":
+        return f"{namespace}-{name}"
+    return name
+
+
+def _existing_copy(kind, namespace, name):
+    """The copy in the destination namespace with the name that namespace/name would
+    be copied to, or None"""
+    api_object_class = object_factory(state.api, strimzi.api_version(), kind)
+    return (
+        api_object_class.objects(state.api)
+        .filter(namespace=globalconf.kafka_user_topic_destination_namespace)
+        .get_or_none(name=_destination_name(kind, namespace, name))
+    )
+
+
+def _claim_destination_name(kind, namespace, name):
+    """Claim the copy name for namespace/name, and return the existing copy, if any"""
+    # The index is per process, and the copy may be that of a source handled by another
+    # knuto-kafka-user-topic, so the copy itself is checked, and decides over the index
+    copy = _existing_copy(kind, namespace, name)
+    if copy is not None:
+        destination_names.apply_copy(kind, "MODIFIED", copy.obj)
+    destination_names.claim(
+        kind, _destination_name(kind, namespace, name), f"{namespace}/{name}"
+    )
+    return copy
+
+
+def _copy_of_other_source(copy, namespace, name):
+    """The other source, if any, that copy is annotated as the copy of"""
+    owner = copy.annotations.get(SOURCE_ANNOTATION)
+    if owner not in (None, f"{namespace}/{name}"):
+        return owner
+    return None
+
+
+def _source_namespaces():
+    """The namespaces KafkaUsers and KafkaTopics are copied from"""
+    if state.combined:
+        return sorted(globalconf.kafka_user_topic_source_namespaces)
+    return [state.namespace]
+
+
+@profiled
 def check_acl_allowed(logger, namespace, acls):
     logger.debug("Checking if ACLs given by user are permitted")
     idx = 0
@@ -67,14 +187,22 @@ def check_acl_allowed(logger, namespace, acls):
         idx += 1
 
 
-@kopf.on.create("kafka.strimzi.io", "v1beta1", "kafkausers")
+@kopf.on.create(strimzi.GROUP, "kafkausers", when=_in_source_namespace)
+@prioritized
 def create_kafkauser(body, namespace, name, logger, **_):
     _update_or_create_kafkauser(
-        body, namespace, name, logger, return_key="copied_to", logged_action="created"
+        body,
+        namespace,
+        name,
+        logger,
+        return_key="copied_to",
+        logged_action="created",
+        paced=True,
     )
 
 
-@kopf.on.update("kafka.strimzi.io", "v1beta1", "kafkausers")
+@kopf.on.update(strimzi.GROUP, "kafkausers", when=_in_source_namespace)
+@prioritized
 def update_kafkauser(body, namespace, name, logger, **_):
     _update_or_create_kafkauser(
         body, namespace, name, logger, return_key="updated", logged_action="updated"
@@ -82,7 +210,7 @@ def update_kafkauser(body, namespace, name, logger, **_):
 
 
 def _update_or_create_kafkauser(
-    body, namespace, name, logger, *, return_key, logged_action
+    body, namespace, name, logger, *, return_key, logged_action, paced=False
 ):
     dst_namespace = globalconf.kafka_user_topic_destination_namespace
 
@@ -93,50 +221,95 @@ def _update_or_create_kafkauser(
     except AclNotAllowed as e:
         return {"acl_not_allowed": str(e)}
 
+    try:
+        current = _claim_destination_name("KafkaUser", namespace, name)
+    except DestinationNameCollision as e:
+        logger.error(f"KafkaUser {namespace}/{name} not copied: {e}")
+        return {"name_collision": str(e)}
+
+    if paced:
+        _pace_create("KafkaUser")
+    namespace_teardown.forget(namespace)
     logger.info(
         f"KafkaUser {namespace}/{name} {logged_action}, copying change to {dst_namespace}"
     )
+    capped = capped_user_quotas(
+        body["spec"].get("quotas"),
+        namespace_settings(globalconf.kafkauser_quota_maximums, namespace),
+    )
+    if capped:
+        logger.warning(
+            f"KafkaUser {namespace}/{name} has {', '.join(capped)} above the maximum "
+            f"of the namespace, copying the maximum"
+        )
     new_kafkauser = _copy_kafkauser(body, namespace, name)
+    if globalconf.replication_lag_tracking_enabled:
+        tracing.stamp_copy(body, new_kafkauser, current)
     _update_or_create(new_kafkauser)
     return {return_key: f"{dst_namespace}/{namespace}-{name}"}
 
 
-@kopf.on.delete("kafka.strimzi.io", "v1beta1", "kafkausers")
+@kopf.on.delete(strimzi.GROUP, "kafkausers", when=_in_source_namespace)
+@prioritized
 def delete_kafkauser(body, namespace, name, logger, **_):
     dst_namespace = globalconf.kafka_user_topic_destination_namespace
-    logger.info(
-        f"KafkaUser {namespace}/{name} deleted, deleting copy in {dst_namespace}"
-    )
-    to_be_deleted = _copy_kafkauser(body, namespace, name)
-    logger.debug(
-        "Checking if {to_be_deleted.metadata['namespace']}/{to_be_deleted} exists"
-    )
-    if to_be_deleted.exists():
-        logger.info("Deleting {to_be_deleted.metadata['namespace']}/{to_be_deleted}")
+    if _torn_down_with_namespace(namespace, logger):
+        return {"deleted_with_namespace": namespace}
+
+    to_be_deleted = _existing_copy("KafkaUser", namespace, name)
+    if to_be_deleted is not None:
+        owner = _copy_of_other_source(to_be_deleted, namespace, name)
+        if owner is not None:
+            logger.info(
+                f"KafkaUser {namespace}/{name} deleted, it was never copied, as its "
+                f"copy would be the copy of {owner}"
+            )
+            return {"not_deleting": f"Copy belongs to {owner}"}
+
+        logger.info(
+            f"KafkaUser {namespace}/{name} deleted, deleting copy in {dst_namespace}"
+        )
         to_be_deleted.delete()
+    destination_names.release("KafkaUser", f"{namespace}/{name}")
 
 
 def _copy_kafkauser(body, namespace, name):
     dst_namespace = globalconf.kafka_user_topic_destination_namespace
     new_obj = _copy_object(body)
+    quotas = user_quotas(
+        new_obj["spec"].get("quotas"),
+        namespace_settings(globalconf.kafkauser_quota_defaults, namespace),
+        namespace_settings(globalconf.kafkauser_quota_maximums, namespace),
+    )
+    if quotas:
+        new_obj["spec"]["quotas"] = quotas
     new_obj["metadata"]["namespace"] = dst_namespace
-    new_obj["metadata"]["name"] = f"{namespace}-{name}"
-    KafkaUser = object_factory(state.api, "kafka.strimzi.io/v1beta1", "KafkaUser")
+    new_obj["metadata"]["name"] = _destination_name("KafkaUser", namespace, name)
+    KafkaUser = object_factory(state.api, strimzi.api_version(), "KafkaUser")
     new_kafkauser = KafkaUser(state.api, new_obj)
     new_kafkauser.annotations["knuto.niradynamics.se/source"] = f"{namespace}/{name}"
     new_kafkauser.annotations["knuto.niradynamics.se/created"] = "true"
+    new_kafkauser.labels[SOURCE_NAMESPACE_LABEL] = namespace
 
     return new_kafkauser
 
 
-@kopf.on.create("kafka.strimzi.io", "v1beta1", "kafkatopics")
+@kopf.on.create(strimzi.GROUP, "kafkatopics", when=_in_source_namespace)
+@prioritized
 def create_kafkatopic(body, namespace, name, logger, **_):
     return _update_or_create_kafkatopic(
-        body, namespace, name, logger, return_key="copied_to", logged_action="created"
+        body,
+        namespace,
+        name,
+        logger,
+        return_key="copied_to",
+        logged_action="created",
+        paced=True,
     )
 
 
-@kopf.on.update("kafka.strimzi.io", "v1beta1", "kafkatopics")
+@kopf.on.update(strimzi.GROUP, "kafkatopics", when=_in_source_namespace)
+@prioritized
 def update_kafkatopic(body, namespace, name, logger, **_):
     return _update_or_create_kafkatopic(
         body, namespace, name, logger, return_key="updated", logged_action="updated"
@@ -144,7 +317,7 @@ def update_kafkatopic(body, namespace, name, logger, **_):
 
 
 def _update_or_create_kafkatopic(
-    body, namespace, name, logger, *, return_key, logged_action
+    body, namespace, name, logger, *, return_key, logged_action, paced=False
 ):
     dst_namespace = globalconf.kafka_user_topic_destination_namespace
 
@@ -155,16 +328,152 @@ def _update_or_create_kafkatopic(
         )
         return {"policy_violation": f"Topic name should be prefixed with {namespace}-"}
 
+    try:
+        current = _claim_destination_name("KafkaTopic", namespace, name)
+    except DestinationNameCollision as e:
+        logger.error(f"KafkaTopic {namespace}/{name} not copied: {e}")
+        return {"name_collision": str(e)}
+
+    try:
+        _admit_kafkatopic(
+            body, namespace, name, limits=_topic_quota_limits(), current=current
+        )
+    except QuotaExceeded as e:
+        logger.warning(f"KafkaTopic {namespace}/{name} not copied: {e}")
+        return {"quota_exceeded": str(e)}
+
+    if paced:
+        _pace_create("KafkaTopic")
+    namespace_teardown.forget(namespace)
     logger.info(
         f"KafkaTopic {namespace}/{name} {logged_action}, copying change to {dst_namespace}"
     )
-    new_kafkatopic = _copy_kafkatopic(body, namespace, name)
+    _warn_partitions_above_maximum(namespace, name, current, logger)
+    new_kafkatopic = _copy_kafkatopic(body, namespace, name, current)
+    adjusted = codec.loads(new_kafkatopic.annotations.get(ADJUSTED_ANNOTATION, "{}"))
+    if adjusted:
+        logger.info(
+            f"KafkaTopic {namespace}/{name} copied with {', '.join(adjusted)} set by "
+            f"the defaults and ranges of the namespace"
+        )
+    if globalconf.replication_lag_tracking_enabled:
+        tracing.stamp_copy(body, new_kafkatopic, current)
     _update_or_create(new_kafkatopic)
 
     return {return_key: f"{dst_namespace}/{namespace}-{name}"}
 
 
-@kopf.on.delete("kafka.strimzi.io", "v1beta1", "kafkatopics")
+def _topic_quota_limits():
+    return {
+        "topics": globalconf.max_topics,
+        "partitions": globalconf.max_topic_partitions,
+        "replicas": globalconf.max_topic_partition_replicas,
+    }
+
+
+def _admit_kafkatopic(
+    body, namespace, name, *, limits=None, check_only=False, current=None
+):
+    # Counted as copied, after partitions and replicas have been clamped
+    spec, _ = _adjusted_kafkatopic_spec(body["spec"], namespace, current)
+    admit = topic_quota_index.check if check_only else topic_quota_index.admit
+    admit(
+        namespace,
+        name,
+        spec.get("partitions", 1),
+        spec.get("replicas", 1),
+        limits=limits,
+    )
+
+
+def _adjusted_kafkatopic_spec(spec, namespace, current=None):
+    """spec adjusted for namespace, where current is the copy if it already exists"""
+    return adjust_spec(
+        spec,
+        namespace_settings(globalconf.kafkatopic_config_defaults, namespace),
+        namespace_settings(globalconf.kafkatopic_config_ranges, namespace),
+        current_partitions=_current_partitions(current),
+    )
+
+
+def _current_partitions(current):
+    if current is None:
+        return None
+    return current.obj.get("spec", {}).get("partitions")
+
+
+def _warn_partitions_above_maximum(namespace, name, current, logger):
+    ranges = namespace_settings(globalconf.kafkatopic_config_ranges, namespace)
+    _, maximum = ranges.get("partitions", (None, None))
+    partitions = _current_partitions(current)
+    if maximum is not None and partitions is not None and partitions > maximum:
+        logger.warning(
+            f"KafkaTopic {namespace}/{name} has {partitions} partitions, above the "
+            f"maximum of {maximum}, which Kafka cannot reduce them to, keeping them"
+        )
+
+
+@kopf.on.event(strimzi.GROUP, "kafkatopics", when=_in_source_namespace)
+@prioritized
+def index_existing_kafkatopic(event, body, namespace, name, **_):
+    """Account for the topics that exist when the operator starts. Later changes go
+    through the create, update and delete handlers."""
+    watch_health.observe("KafkaTopic", event["type"], body)
+    _observe_source_status("KafkaTopic", event["type"], body)
+    if event["type"] is not None:
+        return
+
+    previous_results = [
+        body.get("status", {}).get(handler, {})
+        for handler in ["create_kafkatopic", "update_kafkatopic"]
+    ]
+    if any(
+        "quota_exceeded" in result
+        or "policy_violation" in result
+        or "name_collision" in result
+        for result in previous_results
+    ):
+        return
+
+    _claim_existing_destination_name("KafkaTopic", namespace, name)
+    _admit_kafkatopic(body, namespace, name)
+
+
+def _claim_existing_destination_name(kind, namespace, name):
+    try:
+        _claim_destination_name(kind, namespace, name)
+    except DestinationNameCollision:
+        # Listed when the operator starts, and copied by the source that owns the name
+        pass
+
+
+@kopf.on.event(strimzi.GROUP, "kafkausers", when=_in_source_namespace)
+@prioritized
+def observe_kafkauser(event, body, namespace, name, **_):
+    watch_health.observe("KafkaUser", event["type"], body)
+    _observe_source_status("KafkaUser", event["type"], body)
+    if event["type"] is None:
+        _claim_existing_destination_name("KafkaUser", namespace, name)
+
+
+@kopf.on.event(strimzi.GROUP, "kafkausers", when=_is_copy)
+@prioritized
+def observe_kafkauser_copy(event, body, **_):
+    destination_names.apply_copy("KafkaUser", event["type"], body)
+    readiness.observe("KafkaUser", event["type"], body)
+    _reflect_status("KafkaUser", event["type"], body)
+
+
+@kopf.on.event(strimzi.GROUP, "kafkatopics", when=_is_copy)
+@prioritized
+def observe_kafkatopic_copy(event, body, **_):
+    destination_names.apply_copy("KafkaTopic", event["type"], body)
+    readiness.observe("KafkaTopic", event["type"], body)
+    _reflect_status("KafkaTopic", event["type"], body)
+
+
+@kopf.on.delete(strimzi.GROUP, "kafkatopics", when=_in_source_namespace)
+@prioritized
 def delete_kafkatopic(body, namespace, name, logger, **_):
     dst_namespace = globalconf.kafka_user_topic_destination_namespace
     if not globalconf.kafka_topic_deletion_enabled:
@@ -175,30 +484,186 @@ def delete_kafkatopic(body, namespace, name, logger, **_):
             "not_deleting": f"Deletion of KafkaTopic not enabled for namespace {namespace}"
         }
 
-    logger.info(
-        f"KafkaTopic {namespace}/{name} deleted, deleting copy in {dst_namespace}"
+    if _torn_down_with_namespace(namespace, logger):
+        return {"deleted_with_namespace": namespace}
+
+    to_be_deleted = _existing_copy("KafkaTopic", namespace, name)
+    if to_be_deleted is not None:
+        owner = _copy_of_other_source(to_be_deleted, namespace, name)
+        if owner is not None:
+            logger.info(
+                f"KafkaTopic {namespace}/{name} deleted, it was never copied, as its "
+                f"copy would be the copy of {owner}"
+            )
+            return {"not_deleting": f"Copy belongs to {owner}"}
+
+        logger.info(
+            f"KafkaTopic {namespace}/{name} deleted, deleting copy in {dst_namespace}"
+        )
+        to_be_deleted.delete()
+    destination_names.release("KafkaTopic", f"{namespace}/{name}")
+    # Only topics that are deleted from Kafka stop counting against the quota
+    topic_quota_index.remove(namespace, name)
+
+
+def _torn_down_with_namespace(namespace, logger):
+    """
+    If namespace is being deleted, delete all copies from it at once: KafkaUsers, and
+    KafkaTopics if topic deletion is enabled.
+    """
+    kinds = ["KafkaUser"]
+    if globalconf.kafka_topic_deletion_enabled:
+        kinds.append("KafkaTopic")
+
+    torn_down = namespace_teardown.torn_down(
+        namespace,
+        [(strimzi.api_version(), kind) for kind in kinds],
+        globalconf.kafka_user_topic_destination_namespace,
+        logger,
     )
-    to_be_deleted = _copy_kafkatopic(body, namespace, name)
-    logger.debug(
-        "Checking if {to_be_deleted.metadata['namespace']}/{to_be_deleted} exists"
+    if torn_down:
+        destination_names.release_namespace(namespace, kinds)
+    if torn_down and globalconf.kafka_topic_deletion_enabled:
+        topic_quota_index.remove_namespace(namespace)
+
+    return torn_down
+
+
+def _has_kafkatopic_settings(namespace):
+    return any(
+        namespace_settings(settings, namespace)
+        for settings in [
+            globalconf.kafkatopic_config_defaults,
+            globalconf.kafkatopic_config_ranges,
+        ]
     )
-    if to_be_deleted.exists():
-        logger.info("Deleting {to_be_deleted.metadata['namespace']}/{to_be_deleted}")
-        to_be_deleted.delete()
 
 
-def _copy_kafkatopic(body, namespace, name):
+def _copy_kafkatopic(body, namespace, name, current=None):
     dst_namespace = globalconf.kafka_user_topic_destination_namespace
     new_obj = _copy_object(body)
     new_obj["metadata"]["namespace"] = dst_namespace
-    KafkaTopic = object_factory(state.api, "kafka.strimzi.io/v1beta1", "KafkaTopic")
+    new_obj["spec"], adjusted = _adjusted_kafkatopic_spec(
+        new_obj["spec"], namespace, current
+    )
+    KafkaTopic = object_factory(state.api, strimzi.api_version(), "KafkaTopic")
     new_kafkatopic = KafkaTopic(state.api, new_obj)
     new_kafkatopic.annotations["knuto.niradynamics.se/source"] = f"{namespace}/{name}"
     new_kafkatopic.annotations["knuto.niradynamics.se/created"] = "true"
+    if _has_kafkatopic_settings(namespace):
+        # Also when empty, as copies are updated with merge patches that keep what
+        # they do not mention
+        new_kafkatopic.annotations[ADJUSTED_ANNOTATION] = codec.dumps(adjusted)
+    new_kafkatopic.labels[SOURCE_NAMESPACE_LABEL] = namespace
 
     return new_kafkatopic
 
 
+def _desired_kafkauser_copy(body, namespace, name, copies):
+    try:
+        check_acl_allowed(
+            logger, namespace, body["spec"]["authorization"].get("acls", [])
+        )
+    except AclNotAllowed:
+        return None
+
+    return _copy_kafkauser(body, namespace, name)
+
+
+def _desired_kafkatopic_copy(body, namespace, name, copies):
+    topic_name = body["spec"].get("topicName", name)
+    if not topic_name.startswith(f"{namespace}-"):
+        return None
+
+    current = copies.get(_destination_name("KafkaTopic", namespace, name))
+    # The scan only reads, and must not change what the topics count against the quota
+    try:
+        _admit_kafkatopic(
+            body,
+            namespace,
+            name,
+            limits=_topic_quota_limits(),
+            check_only=True,
+            current=current,
+        )
+    except QuotaExceeded:
+        return None
+
+    return _copy_kafkatopic(body, namespace, name, current)
+
+
+@kopf.on.startup()
+def start_drift_scanner(logger, **_):
+    if globalconf.drift_scan_interval is None:
+        return
+
+    state.drift_scanner = DriftScanner(
+        [
+            (
+                object_factory(state.api, strimzi.api_version(), "KafkaUser"),
+                _desired_kafkauser_copy,
+            ),
+            (
+                object_factory(state.api, strimzi.api_version(), "KafkaTopic"),
+                _desired_kafkatopic_copy,
+            ),
+        ],
+        _source_namespaces(),
+        globalconf.kafka_user_topic_destination_namespace,
+        logging.getLogger("knuto.drift"),
+        interval=globalconf.drift_scan_interval,
+        page_size=globalconf.drift_scan_page_size,
+        max_api_calls=globalconf.drift_scan_max_api_calls,
+        cpu_budget=globalconf.drift_scan_cpu_budget,
+    )
+    logger.info(f"Scanning for drifted copies every {globalconf.drift_scan_interval}s")
+    state.drift_scanner.start()
+
+
+@kopf.on.startup()
+def start_kafka_user_topic_watch_checker(logger, **_):
+    start_watch_checker(
+        [
+            (strimzi.api_version(), kind, _source_namespaces(), None)
+            for kind in ["KafkaUser", "KafkaTopic"]
+        ],
+        logger,
+    )
+
+
+@kopf.on.startup()
+def start_status_reflector(logger, **_):
+    if not globalconf.status_reflection_enabled:
+        return
+
+    state.status_reflector = StatusReflector(
+        {
+            "KafkaUser": (strimzi.api_version(), "kafkausers"),
+            "KafkaTopic": (strimzi.api_version(), "kafkatopics"),
+        },
+        logging.getLogger("knuto.reflection"),
+        interval=globalconf.status_flush_interval,
+        batch_size=globalconf.status_batch_size,
+    )
+    logger.info(
+        f"Writing the status of the copies to their source objects every "
+        f"{globalconf.status_flush_interval}s"
+    )
+    state.status_reflector.start()
+
+
+@kopf.on.cleanup()
+def stop_drift_scanner(**_):
+    if state.drift_scanner is not None:
+        state.drift_scanner.stop()
+
+
+@kopf.on.cleanup()
+def stop_status_reflector(**_):
+    if state.status_reflector is not None:
+        state.status_reflector.stop()
+
+
 class StoreTopicDestinationNamespace(Action):
     def __call__(self, parser, namespace, values, option_string=None):
         globalconf.kafka_user_topic_destination_namespace = values
@@ -231,6 +696,109 @@ class StoreEnableCrossNamespaceWrite(Action):
         globalconf.cross_namespace_write_enabled = True
 
 
+class StoreTrackReplicationLag(Action):
+    def __init__(self, *args, **kwargs):
+        kwargs["nargs"] = 0
+        super(StoreTrackReplicationLag, self).__init__(*args, **kwargs)
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        globalconf.replication_lag_tracking_enabled = True
+
+
+class StoreStrimziMaxNotReady(Action):
+    def __call__(self, parser, namespace, values, option_string=None):
+        globalconf.strimzi_max_not_ready = values
+        globalconf.watch_copies = True
+
+
+class StoreStrimziPacingMaxDelay(Action):
+    def __call__(self, parser, namespace, values, option_string=None):
+        globalconf.strimzi_pacing_max_delay = values
+
+
+class StoreReflectStatus(Action):
+    def __init__(self, *args, **kwargs):
+        kwargs["nargs"] = 0
+        super(StoreReflectStatus, self).__init__(*args, **kwargs)
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        globalconf.status_reflection_enabled = True
+        globalconf.watch_copies = True
+
+
+class StoreStatusFlushInterval(Action):
+    def __call__(self, parser, namespace, values, option_string=None):
+        globalconf.status_flush_interval = values
+
+
+class StoreStatusBatchSize(Action):
+    def __call__(self, parser, namespace, values, option_string=None):
+        globalconf.status_batch_size = values
+
+
+class StoreKafkaUserQuotaDefault(Action):
+    def __call__(self, parser, namespace, values, option_string=None):
+        quota_namespace, quota, value = values
+        settings = globalconf.kafkauser_quota_defaults.setdefault(quota_namespace, {})
+        settings[quota] = value
+
+
+class StoreKafkaUserQuotaMaximum(Action):
+    def __call__(self, parser, namespace, values, option_string=None):
+        quota_namespace, quota, value = values
+        settings = globalconf.kafkauser_quota_maximums.setdefault(quota_namespace, {})
+        settings[quota] = value
+
+
+class StoreKafkaTopicConfigDefault(Action):
+    def __call__(self, parser, namespace, values, option_string=None):
+        config_namespace, key, value = values
+        settings = globalconf.kafkatopic_config_defaults
+        settings.setdefault(config_namespace, {})[key] = value
+
+
+class StoreKafkaTopicConfigRange(Action):
+    def __call__(self, parser, namespace, values, option_string=None):
+        config_namespace, key, value = values
+        settings = globalconf.kafkatopic_config_ranges
+        settings.setdefault(config_namespace, {})[key] = value
+
+
+class StoreMaxTopics(Action):
+    def __call__(self, parser, namespace, values, option_string=None):
+        globalconf.max_topics = values
+
+
+class StoreMaxTopicPartitions(Action):
+    def __call__(self, parser, namespace, values, option_string=None):
+        globalconf.max_topic_partitions = values
+
+
+class StoreMaxTopicPartitionReplicas(Action):
+    def __call__(self, parser, namespace, values, option_string=None):
+        globalconf.max_topic_partition_replicas = values
+
+
+class StoreDriftScanInterval(Action):
+    def __call__(self, parser, namespace, values, option_string=None):
+        globalconf.drift_scan_interval = values
+
+
+class StoreDriftScanPageSize(Action):
+    def __call__(self, parser, namespace, values, option_string=None):
+        globalconf.drift_scan_page_size = values
+
+
+class StoreDriftScanMaxApiCalls(Action):
+    def __call__(self, parser, namespace, values, option_string=None):
+        globalconf.drift_scan_max_api_calls = values
+
+
+class StoreDriftScanCpuBudget(Action):
+    def __call__(self, parser, namespace, values, option_string=None):
+        globalconf.drift_scan_cpu_budget = values
+
+
 class StoreReadAllowedCrossNamespaceTopics(Action):
     def __call__(self, parser, namespace, values, option_string=None):
         globalconf.read_allowed_non_namespaced_topics = values
@@ -241,12 +809,8 @@ class StoreWriteAllowedNonNamespacedTopics(Action):
         globalconf.write_allowed_non_namespaced_topics = values
 
 
-def main():
-    program_args = ArgumentParser()
-    program_args.add_argument(
-        "--kafka-user-topic-destination-namespace",
-        action=StoreTopicDestinationNamespace,
-    )
+def _kafka_user_topic_arguments():
+    program_args = ArgumentParser(add_help=False)
     program_args.add_argument(
         "--enable-topic-deletion", action=StoreTopicDeletionEnabled
     )
@@ -275,6 +839,128 @@ def main():
         help="List of topics which has not been prefixed with the namespace, "
         "that are allowed to create kafka users with write permissions for.",
     )
+    program_args.add_argument(
+        "--max-topics",
+        type=int,
+        action=StoreMaxTopics,
+        help="Maximum number of KafkaTopics copied from the namespace.",
+    )
+    program_args.add_argument(
+        "--max-topic-partitions",
+        type=int,
+        action=StoreMaxTopicPartitions,
+        help="Maximum total number of partitions of the KafkaTopics copied from the namespace.",
+    )
+    program_args.add_argument(
+        "--max-topic-partition-replicas",
+        type=int,
+        action=StoreMaxTopicPartitionReplicas,
+        help="Maximum total number of partition replicas (partitions times replicas) "
+        "of the KafkaTopics copied from the namespace.",
+    )
+    program_args.add_argument(
+        "--kafkauser-quota-default",
+        type=user_quota_argument,
+        action=StoreKafkaUserQuotaDefault,
+        help="[NAMESPACE/]QUOTA=VALUE, where QUOTA is producerByteRate, "
+        "consumerByteRate or requestPercentage. Copies of KafkaUsers from NAMESPACE, "
+        "or from all namespaces, get this quota if they do not set it.",
+    )
+    program_args.add_argument(
+        "--kafkauser-quota-max",
+        type=user_quota_argument,
+        action=StoreKafkaUserQuotaMaximum,
+        help="[NAMESPACE/]QUOTA=VALUE. Copies of KafkaUsers from NAMESPACE, or from "
+        "all namespaces, get at most this quota, also if they do not set it.",
+    )
+    program_args.add_argument(
+        "--kafkatopic-config-default",
+        type=config_default_argument,
+        action=StoreKafkaTopicConfigDefault,
+        help="[NAMESPACE/]KEY=VALUE, e.g. compression.type=zstd. Copies of KafkaTopics "
+        "from NAMESPACE, or from all namespaces, get this config, or partitions or "
+        "replicas, if they do not set it.",
+    )
+    program_args.add_argument(
+        "--kafkatopic-config-range",
+        type=config_range_argument,
+        action=StoreKafkaTopicConfigRange,
+        help="[NAMESPACE/]KEY=MIN:MAX, e.g. segment.bytes=:1073741824. Copies of "
+        "KafkaTopics from NAMESPACE, or from all namespaces, get the numeric config, "
+        "or partitions or replicas, clamped to this range.",
+    )
+    program_args.add_argument(
+        "--drift-scan-interval",
+        type=float,
+        action=StoreDriftScanInterval,
+        help="Seconds between scans for copies that have been changed in the "
+        "destination namespace, which are then replaced. Disabled if not given.",
+    )
+    program_args.add_argument(
+        "--drift-scan-page-size",
+        type=int,
+        action=StoreDriftScanPageSize,
+        help="Number of objects fetched per request when scanning for drift.",
+    )
+    program_args.add_argument(
+        "--drift-scan-max-api-calls",
+        type=int,
+        action=StoreDriftScanMaxApiCalls,
+        help="Maximum number of API calls, list pages and repairs, per drift scan.",
+    )
+    program_args.add_argument(
+        "--drift-scan-cpu-budget",
+        type=float,
+        action=StoreDriftScanCpuBudget,
+        help="Maximum CPU seconds spent per drift scan.",
+    )
+    program_args.add_argument(
+        "--track-replication-lag",
+        action=StoreTrackReplicationLag,
+        help="Stamp trace annotations on the copies, which knuto-secrets uses to "
+        "measure the lag of each replication stage.",
+    )
+    program_args.add_argument(
+        "--strimzi-max-not-ready",
+        type=int,
+        action=StoreStrimziMaxNotReady,
+        help="Watch the copies in the destination namespace, and hold back new "
+        "copies of a kind while this many copies of it are not ready in Strimzi.",
+    )
+    program_args.add_argument(
+        "--strimzi-pacing-max-delay",
+        type=float,
+        action=StoreStrimziPacingMaxDelay,
+        help="Maximum seconds before a held back copy is tried again.",
+    )
+    program_args.add_argument(
+        "--reflect-status",
+        action=StoreReflectStatus,
+        help="Watch the copies in the destination namespace, and write their "
+        "conditions, username, secret and topicName to the status of their sources.",
+    )
+    program_args.add_argument(
+        "--status-flush-interval",
+        type=float,
+        action=StoreStatusFlushInterval,
+        help="Seconds between writes of the status of source objects.",
+    )
+    program_args.add_argument(
+        "--status-batch-size",
+        type=int,
+        action=StoreStatusBatchSize,
+        help="Maximum number of source objects whose status is written per flush.",
+    )
+
+    return program_args
+
+
+def main():
+    program_args = ArgumentParser(parents=[_kafka_user_topic_arguments()])
+    program_args.add_argument(
+        "--kafka-user-topic-destination-namespace",
+        action=StoreTopicDestinationNamespace,
+    )
 
     return default_main([program_args])
 
@@ -0,0 +1,89 @@
+"""Prometheus metrics for knuto.
+
+prometheus_client is an optional dependency (pip install
+kafka-namespaced-user-topic-operator[metrics]). Without it, all metrics are no-ops and
+--metrics-port only logs a warning.
+"""
+import logging
+
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None
+
+logger = logging.getLogger(__name__)
+
+
+class _NoopMetric:
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, value):
+        pass
+
+    def inc(self, value=1):
+        pass
+
+    def dec(self, value=1):
+        pass
+
+    def set(self, value):
+        pass
+
+
+def histogram(name, documentation, labelnames=(), buckets=None):
+    if prometheus_client is None:
+        return _NoopMetric()
+
+    kwargs = {"buckets": buckets} if buckets is not None else {}
+    return prometheus_client.Histogram(name, documentation, labelnames, **kwargs)
+
+
+def gauge(name, documentation, labelnames=()):
+    if prometheus_client is None:
+        return _NoopMetric()
+
+    return prometheus_client.Gauge(name, documentation, labelnames)
+
+
+def counter(name, documentation, labelnames=()):
+    if prometheus_client is None:
+        return _NoopMetric()
+
+    return prometheus_client.Counter(name, documentation, labelnames)
+
+
+def start_metrics_server(port):
+    if prometheus_client is None:
+        logger.warning(
+            f"prometheus_client is not installed, not serving metrics on port {port}"
+        )
+        return
+
+    logger.info(f"Serving metrics on port {port}")
+    prometheus_client.start_http_server(port)
+
+
+def start_multiprocess_metrics_server(port, directory):
+    """Serve the metrics of the processes that write them to directory"""
+    if prometheus_client is None:
+        logger.warning(
+            f"prometheus_client is not installed, not serving metrics on port {port}"
+        )
+        return
+
+    from prometheus_client import multiprocess
+
+    registry = prometheus_client.CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=directory)
+    logger.info(f"Serving the metrics of all workers on port {port}")
+    prometheus_client.start_http_server(port, registry=registry)
+
+
+def mark_process_dead(pid, directory):
+    if prometheus_client is None:
+        return
+
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(pid, path=directory)
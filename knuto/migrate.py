@@ -0,0 +1,159 @@
+"""knuto-migrate: rewrite all KafkaUsers and KafkaTopics with a new Strimzi API version.
+
+Kubernetes keeps custom resources stored in the version they were last written with, and a
+version can only be removed from a CRD when no objects are stored in it anymore. Every source
+object and every copy is therefore read and written back through the new version, by
+--concurrency workers in parallel. The spec is not changed, so the running operators see no
+change to handle and keep replicating during the migration.
+
+With --checkpoint-file, every rewritten object is recorded, and a migration that is
+interrupted continues where it stopped when it is run again.
+"""
+import logging
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pykube
+from pykube import object_factory
+from pykube.exceptions import HTTPError
+
+from . import strimzi
+from .checkpoint import open_checkpoint
+from .config import globalconf, state
+from .secrets import TopicSourceNamespaceAction
+from .utils import _get_pykube_config, _list_paged
+
+logger = logging.getLogger(__name__)
+
+KINDS = ["KafkaUser", "KafkaTopic"]
+
+
+def _migration_key(obj):
+    return f"{obj.kind}/{obj.namespace}/{obj.name}"
+
+
+def _rewrite(obj):
+    try:
+        obj.update()
+    except HTTPError as e:
+        # Changed since it was listed, which wrote it with the new version as well.
+        # Deleted since it was listed, which leaves nothing to migrate.
+        if e.code not in (404, 409):
+            raise
+
+
+def migrate(namespaces, api_version, logger, *, concurrency, page_size=500):
+    """Rewrite all KafkaUsers and KafkaTopics in namespaces with api_version"""
+    started = time.monotonic()
+
+    to_be_written = []
+    skipped = 0
+    for kind in KINDS:
+        api_object_class = object_factory(state.api, api_version, kind)
+        for namespace in namespaces:
+            for obj in _list_paged(
+                api_object_class.objects(state.api).filter(namespace=namespace),
+                page_size,
+            ):
+                if state.checkpoint is not None and state.checkpoint.is_migrated(
+                    _migration_key(obj), api_version
+                ):
+                    skipped += 1
+                    continue
+                to_be_written.append(obj)
+
+    logger.info(
+        f"Migrating {len(to_be_written)} objects to {api_version} with {concurrency} "
+        f"workers, {skipped} migrated already"
+    )
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {executor.submit(_rewrite, obj): obj for obj in to_be_written}
+        report_every = max(len(futures) // 10, 1)
+        for done, future in enumerate(as_completed(futures), start=1):
+            obj = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                failed += 1
+                logger.error(f"Failed to migrate {obj.kind} {obj.namespace}/{obj}: {e}")
+            else:
+                if state.checkpoint is not None:
+                    state.checkpoint.record_migrated(_migration_key(obj), api_version)
+
+            if done % report_every == 0 or done == len(futures):
+                logger.info(
+                    f"Migrated {done}/{len(futures)} objects "
+                    f"in {time.monotonic() - started:.1f}s"
+                )
+
+    elapsed = time.monotonic() - started
+    logger.info(
+        f"Migration done in {elapsed:.1f}s, {len(to_be_written) - failed} written, "
+        f"{failed} failed"
+    )
+
+    return {
+        "migrated": len(to_be_written) - failed,
+        "skipped": skipped,
+        "failed": failed,
+        "seconds": round(elapsed, 1),
+    }
+
+
+def main():
+    program_args = ArgumentParser()
+    program_args.add_argument("--verbose", "-v", default=False, action="store_true")
+    program_args.add_argument(
+        "--kafka-user-topic-source-namespace",
+        action=TopicSourceNamespaceAction,
+        default=set([]),
+    )
+    program_args.add_argument(
+        "--api-version",
+        help="Strimzi API version to migrate to, e.g. v1beta2. The preferred version "
+        "served by the cluster if not given.",
+    )
+    program_args.add_argument(
+        "--concurrency",
+        type=int,
+        default=16,
+        help="Number of objects written in parallel.",
+    )
+    program_args.add_argument(
+        "--checkpoint-file",
+        help="SQLite file recording the migrated objects, to continue an interrupted "
+        "migration.",
+    )
+    program_args.add_argument(
+        "namespace", help="Namespace the KafkaUsers and KafkaTopics are copied to"
+    )
+
+    args = program_args.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+
+    state.api = pykube.HTTPClient(_get_pykube_config())
+    globalconf.strimzi_version = args.api_version or strimzi.discover_version(
+        state.api
+    )
+    if args.checkpoint_file is not None:
+        open_checkpoint(args.checkpoint_file)
+
+    print(
+        migrate(
+            sorted(globalconf.kafka_user_topic_source_namespaces) + [args.namespace],
+            strimzi.api_version(),
+            logger,
+            concurrency=args.concurrency,
+        )
+    )
+
+    if state.checkpoint is not None:
+        state.checkpoint.close()
+
+
+if __name__ == "__main__":
+    main()
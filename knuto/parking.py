@@ -0,0 +1,62 @@
+import threading
+import time
+
+from . import metrics
+
+parked_events = metrics.gauge(
+    "knuto_parked_events", "Events waiting for an object to be seen by the watch"
+)
+
+
+class ParkingLot:
+    """
+    Events that cannot be handled until some object exists, keyed by the awaited object.
+    The handler of a parked event is still retried by kopf, and whoever sees the awaited
+    object appear, e.g. a watch event handler, can run it before the retry. Parking the
+    same event twice keeps only the latest callback, and events parked for longer than
+    ttl seconds are dropped.
+    """
+
+    def __init__(self, ttl=600.0, clock=time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._parked = {}
+
+    def park(self, awaited, event_key, callback):
+        with self._lock:
+            self._expire()
+            self._parked.setdefault(awaited, {})[event_key] = (self.clock(), callback)
+            parked_events.set(self._count())
+
+    def release(self, awaited):
+        """Remove and return the callbacks waiting for awaited, for the caller to run"""
+        with self._lock:
+            self._expire()
+            callbacks = [
+                callback for _, callback in self._parked.pop(awaited, {}).values()
+            ]
+            parked_events.set(self._count())
+
+        return callbacks
+
+    def _expire(self):
+        oldest = self.clock() - self.ttl
+        for awaited in list(self._parked):
+            events = {
+                event_key: parked
+                for event_key, parked in self._parked[awaited].items()
+                if parked[0] >= oldest
+            }
+            if events:
+                self._parked[awaited] = events
+            else:
+                del self._parked[awaited]
+
+    def _count(self):
+        return sum(len(events) for events in self._parked.values())
+
+    def __len__(self):
+        with self._lock:
+            self._expire()
+            return self._count()
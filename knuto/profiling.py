@@ -0,0 +1,136 @@
+"""On-demand profiling of a running knuto.
+
+Sending SIGUSR2 to knuto starts a sampling profiler for --profile-seconds seconds. When it
+stops, two files are written to --profile-dir:
+
+* knuto-<time>.folded, the sampled stacks of all threads in the collapsed format read by
+  flamegraph.pl and speedscope.
+* knuto-<time>.txt, the number of calls and the wall and CPU time spent in the functions
+  decorated with @profiled while profiling.
+
+Nothing is sampled or timed while the profiler is not running.
+"""
+import functools
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+logger = logging.getLogger(__name__)
+
+
+class SamplingProfiler:
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.active = False
+        self._lock = threading.Lock()
+        self._stacks = Counter()
+        self._timings = defaultdict(lambda: [0, 0.0, 0.0])
+        self._stopped = threading.Event()
+
+    def start(self, seconds, output_dir):
+        with self._lock:
+            if self.active:
+                logger.info("Profiler is already running")
+                return
+            self.active = True
+            self._stacks.clear()
+            self._timings.clear()
+            self._stopped.clear()
+
+        logger.info(f"Profiling for {seconds}s")
+        threading.Thread(
+            target=self._sample,
+            args=(seconds, output_dir),
+            name="knuto-profiler",
+            daemon=True,
+        ).start()
+
+    def _sample(self, seconds, output_dir):
+        own_thread = threading.get_ident()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline and not self._stopped.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(
+                        f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+                    )
+                    frame = frame.f_back
+                self._stacks[";".join(reversed(stack))] += 1
+
+        with self._lock:
+            self.active = False
+
+        self._dump(output_dir)
+
+    def stop(self):
+        self._stopped.set()
+
+    def record(self, name, wall, cpu):
+        with self._lock:
+            timing = self._timings[name]
+            timing[0] += 1
+            timing[1] += wall
+            timing[2] += cpu
+
+    def _dump(self, output_dir):
+        prefix = os.path.join(output_dir, f"knuto-{time.strftime('%Y%m%dT%H%M%S')}")
+
+        with open(f"{prefix}.folded", "w") as f:
+            for stack, count in self._stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        with open(f"{prefix}.txt", "w") as f:
+            f.write(f"{'function':<30} {'calls':>8} {'wall s':>10} {'cpu s':>10}\n")
+            for name, (calls, wall, cpu) in sorted(
+                self._timings.items(), key=lambda item: -item[1][1]
+            ):
+                f.write(f"{name:<30} {calls:>8} {wall:>10.4f} {cpu:>10.4f}\n")
+
+        logger.info(f"Profile written to {prefix}.folded and {prefix}.txt")
+
+
+profiler = SamplingProfiler()
+
+
+def profiled(fn):
+    """Time calls to fn while the profiler is running"""
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not profiler.active:
+            return fn(*args, **kwargs)
+
+        wall_started, cpu_started = time.perf_counter(), time.thread_time()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profiler.record(
+                fn.__name__,
+                time.perf_counter() - wall_started,
+                time.thread_time() - cpu_started,
+            )
+
+    return wrapper
+
+
+def install_signal_handler(seconds, output_dir, signum=signal.SIGUSR2):
+    def start_profiler(signum, frame):
+        # Signal handlers run in the main thread between two bytecodes, possibly while
+        # it holds the lock of the profiler in record(), so start takes it elsewhere
+        threading.Thread(
+            target=profiler.start,
+            args=(seconds, output_dir),
+            name="knuto-profiler-start",
+            daemon=True,
+        ).start()
+
+    signal.signal(signum, start_profiler)
@@ -0,0 +1,150 @@
+import threading
+
+from . import metrics
+
+quota_usage = metrics.gauge(
+    "knuto_topic_quota_usage",
+    "Number of topics, partitions and partition replicas per source namespace",
+    ["namespace", "resource"],
+)
+
+
+class QuotaExceeded(Exception):
+    pass
+
+
+class TopicQuotaIndex:
+    """
+    Number of topics, partitions and partition replicas (partitions times replicas) per
+    source namespace, kept up to date as topics are admitted and deleted, so that a new or
+    resized topic can be checked against the limits without listing all topics.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._topics = {}
+        self._totals = {}
+
+    def admit(self, namespace, name, partitions, replicas, *, limits=None):
+        """
+        Account for the topic namespace/name with the given size, replacing any previous
+        size of it. limits is a mapping of "topics", "partitions" and "replicas" to the
+        maximum for the namespace, where None means no limit. Raises QuotaExceeded,
+        leaving the index unchanged, if the topic would take the namespace over a limit.
+        """
+        usage = {"topics": 1, "partitions": partitions, "replicas": partitions * replicas}
+
+        with self._lock:
+            new_totals = self._new_totals(namespace, name, usage, limits)
+            self._topics[(namespace, name)] = usage
+            self._totals[namespace] = new_totals
+            self._export(namespace)
+
+    def check(self, namespace, name, partitions, replicas, *, limits=None):
+        """Raise QuotaExceeded if admit would, without changing the index"""
+        usage = {"topics": 1, "partitions": partitions, "replicas": partitions * replicas}
+
+        with self._lock:
+            self._new_totals(namespace, name, usage, limits)
+
+    def _new_totals(self, namespace, name, usage, limits):
+        limits = limits or {}
+        previous = self._topics.get((namespace, name))
+        totals = self._totals.get(
+            namespace, {"topics": 0, "partitions": 0, "replicas": 0}
+        )
+
+        new_totals = {}
+        for resource, amount in usage.items():
+            new_totals[resource] = (
+                totals[resource] + amount - (previous or {}).get(resource, 0)
+            )
+            limit = limits.get(resource)
+            if (
+                limit is not None
+                and new_totals[resource] > limit
+                and new_totals[resource] > totals[resource]
+            ):
+                raise QuotaExceeded(
+                    f"Namespace {namespace} would have {new_totals[resource]} "
+                    f"{resource} with topic {name}, limit is {limit}"
+                )
+
+        return new_totals
+
+    def remove(self, namespace, name):
+        with self._lock:
+            previous = self._topics.pop((namespace, name), None)
+            if previous is None:
+                return
+
+            for resource, amount in previous.items():
+                self._totals[namespace][resource] -= amount
+            self._export(namespace)
+
+    def remove_namespace(self, namespace):
+        with self._lock:
+            for key in [key for key in self._topics if key[0] == namespace]:
+                del self._topics[key]
+            if namespace in self._totals:
+                self._totals[namespace] = {"topics": 0, "partitions": 0, "replicas": 0}
+                self._export(namespace)
+
+    def usage(self, namespace):
+        with self._lock:
+            return dict(
+                self._totals.get(
+                    namespace, {"topics": 0, "partitions": 0, "replicas": 0}
+                )
+            )
+
+    def _export(self, namespace):
+        for resource, amount in self._totals[namespace].items():
+            quota_usage.labels(namespace, resource).set(amount)
+
+
+topic_quota_index = TopicQuotaIndex()
+
+
+USER_QUOTAS = ["producerByteRate", "consumerByteRate", "requestPercentage"]
+
+
+def user_quota_argument(text):
+    """Parse an argument of the form [NAMESPACE/]QUOTA=VALUE into
+    (NAMESPACE, QUOTA, VALUE), where NAMESPACE is None if not given"""
+    key, separator, value = text.partition("=")
+    if not separator:
+        raise ValueError(f"{text} is not on the form [NAMESPACE/]QUOTA=VALUE")
+    namespace, _, quota = key.rpartition("/")
+    if quota not in USER_QUOTAS:
+        raise ValueError(f"{quota} is not one of {', '.join(USER_QUOTAS)}")
+    return namespace or None, quota, int(value)
+
+
+def user_quotas(quotas, defaults, maximums):
+    """
+    The spec.quotas of a KafkaUser copy: quotas, with defaults for the quotas not set,
+    and capped to maximums. A quota that is not set is unlimited, so it is set to its
+    maximum if there is one.
+    """
+    result = dict(quotas or {})
+    for quota in USER_QUOTAS:
+        value = result.get(quota, defaults.get(quota))
+        maximum = maximums.get(quota)
+        if maximum is not None and (value is None or value > maximum):
+            value = maximum
+        if value is not None:
+            result[quota] = value
+    return result
+
+
+def capped_user_quotas(quotas, maximums):
+    """The quotas set above their maximum"""
+    quotas = quotas or {}
+    return [
+        quota
+        for quota in USER_QUOTAS
+        if quotas.get(quota) is not None
+        and maximums.get(quota) is not None
+        and quotas[quota] > maximums[quota]
+    ]
@@ -0,0 +1,178 @@
+"""Recording of the watch events knuto handles, for replaying them with knuto.replay.
+
+knuto-record watches the KafkaUsers and KafkaTopics in the source namespaces and the
+Strimzi namespace, and the KafkaUser and cluster CA Secrets in the Strimzi namespace, like
+the operators do. Each watch starts with a listing, recorded as events of type None, and
+continues from its resourceVersion. The events are written as gzipped JSON lines after a
+header line, each with the time since the recording started. The values of Secret data are
+replaced, and managedFields are left out.
+"""
+import base64
+import gzip
+import logging
+import threading
+import time
+from argparse import ArgumentParser
+
+import pykube
+from pykube import Secret, object_factory
+
+from . import codec, strimzi
+from .config import globalconf, state
+from .secrets import CLUSTER_CA_CERT_SUFFIX, TopicSourceNamespaceAction
+from .utils import _get_pykube_config
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+REDACTED = base64.b64encode(b"redacted").decode("ascii")
+
+
+def redact(obj):
+    """obj without Secret data values, managedFields and stringData"""
+    obj = codec.clone(obj)
+    obj.get("metadata", {}).pop("managedFields", None)
+    if obj.get("kind") == "Secret":
+        obj["data"] = {key: REDACTED for key in obj.get("data") or {}}
+        obj.pop("stringData", None)
+    return obj
+
+
+def is_recorded_secret(obj):
+    metadata = obj["metadata"]
+    return (metadata.get("labels") or {}).get(
+        "strimzi.io/kind"
+    ) == "KafkaUser" or metadata["name"].endswith(CLUSTER_CA_CERT_SUFFIX)
+
+
+class EventRecorder:
+    def __init__(self, path, header, clock=time.monotonic):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._file = gzip.open(path, "wt", encoding="utf-8")
+        self._file.write(codec.dumps(dict(header, version=FORMAT_VERSION)) + "\n")
+        self._started = clock()
+        self.recorded = 0
+
+    def record(self, event_type, obj):
+        line = codec.dumps(
+            {
+                "t": round(self.clock() - self._started, 3),
+                "type": event_type,
+                "object": redact(obj),
+            }
+        )
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line + "\n")
+            self.recorded += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+            self._file = None
+
+
+def read_recording(path):
+    """The header and the events of a recording"""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = codec.loads(f.readline())
+        if header.get("version") != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a recording of version {FORMAT_VERSION}")
+        events = [codec.loads(line) for line in f if line.strip()]
+
+    return header, events
+
+
+def _watch(recorder, api_object_class, namespace, accept):
+    query = api_object_class.objects(state.api).filter(namespace=namespace)
+    while True:
+        try:
+            listing = codec.loads(query.execute().content)
+            for obj in listing.get("items") or []:
+                obj.setdefault("apiVersion", api_object_class.version)
+                obj.setdefault("kind", api_object_class.kind)
+                if accept(obj):
+                    recorder.record(None, obj)
+
+            resource_version = listing["metadata"]["resourceVersion"]
+            while True:
+                for event in query.watch(since=resource_version):
+                    resource_version = event.object.metadata["resourceVersion"]
+                    if accept(event.object.obj):
+                        recorder.record(event.type, event.object.obj)
+        except Exception as e:
+            # Listed again, like kopf does when the resourceVersion has expired
+            logger.warning(
+                f"Watching {api_object_class.kind} in {namespace} failed, "
+                f"listing again: {e}"
+            )
+            time.sleep(1)
+
+
+def record(path, source_namespaces, destination_namespace, duration):
+    recorder = EventRecorder(
+        path,
+        {
+            "source_namespaces": sorted(source_namespaces),
+            "destination_namespace": destination_namespace,
+            "api_version": strimzi.api_version(),
+        },
+    )
+    watches = []
+    for kind in ["KafkaUser", "KafkaTopic"]:
+        api_object_class = object_factory(state.api, strimzi.api_version(), kind)
+        for namespace in sorted(source_namespaces) + [destination_namespace]:
+            watches.append((api_object_class, namespace, lambda obj: True))
+    watches.append((Secret, destination_namespace, is_recorded_secret))
+
+    for api_object_class, namespace, accept in watches:
+        threading.Thread(
+            target=_watch,
+            args=(recorder, api_object_class, namespace, accept),
+            name=f"knuto-record-{api_object_class.kind}-{namespace}",
+            daemon=True,
+        ).start()
+
+    time.sleep(duration)
+    recorder.close()
+    return recorder.recorded
+
+
+def main():
+    program_args = ArgumentParser()
+    program_args.add_argument("--verbose", "-v", default=False, action="store_true")
+    program_args.add_argument(
+        "--kafka-user-topic-source-namespace",
+        action=TopicSourceNamespaceAction,
+        default=set([]),
+    )
+    program_args.add_argument(
+        "--duration", type=float, default=600, help="Seconds to record."
+    )
+    program_args.add_argument(
+        "--output", default="knuto-events.jsonl.gz", help="File to record to."
+    )
+    program_args.add_argument(
+        "namespace", help="Namespace the KafkaUsers and KafkaTopics are copied to"
+    )
+
+    args = program_args.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+
+    state.api = pykube.HTTPClient(_get_pykube_config())
+    globalconf.strimzi_version = strimzi.discover_version(state.api)
+
+    recorded = record(
+        args.output,
+        globalconf.kafka_user_topic_source_namespaces,
+        args.namespace,
+        args.duration,
+    )
+    print(f"Recorded {recorded} events to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Reflection of the status Strimzi writes on the copies back to their source objects.
+
+Tenants only see the source objects, so the conditions of each copy, and fields such as the
+username and Secret of a KafkaUser, are written to the status of its source object with a
+merge patch of its status subresource. Strimzi updates the status of a copy often, so the
+patches are not written as the copies change. The latest status of each source object is kept
+until a background thread writes at most --status-batch-size of them every
+--status-flush-interval seconds, and a status that the source object already has is not
+written at all.
+"""
+import threading
+from collections import OrderedDict
+
+from . import codec, metrics
+from .config import state
+
+status_patches = metrics.counter(
+    "knuto_status_patches_total", "Status patches of source objects", ["kind", "result"]
+)
+status_coalesced = metrics.counter(
+    "knuto_status_coalesced_total",
+    "Status changes of copies replaced by a later change before being written",
+    ["kind"],
+)
+status_pending = metrics.gauge(
+    "knuto_status_pending", "Source objects with a status waiting to be written"
+)
+
+REFLECTED_FIELDS = {
+    "KafkaUser": ["conditions", "username", "secret"],
+    "KafkaTopic": ["conditions", "topicName"],
+}
+
+
+def reflected_status(kind, body):
+    """The part of the status of body that is reflected, with None for missing fields"""
+    status = body.get("status") or {}
+    return codec.clone({field: status.get(field) for field in REFLECTED_FIELDS[kind]})
+
+
+class StatusReflector:
+    """endpoints maps each kind to its (api_version, plural)"""
+
+    def __init__(self, endpoints, logger, *, interval, batch_size):
+        self.endpoints = endpoints
+        self.logger = logger
+        self.interval = interval
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._pending = OrderedDict()
+        self._written = {}
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def reflect(self, kind, namespace, name, status):
+        """Write status to the source object namespace/name at the next flush"""
+        key = (kind, namespace, name)
+        with self._lock:
+            if self._written.get(key) == status:
+                self._pending.pop(key, None)
+            else:
+                if key in self._pending:
+                    status_coalesced.labels(kind).inc()
+                # Keeps the place in the queue of a status that is replaced
+                self._pending[key] = status
+            status_pending.set(len(self._pending))
+
+    def observe_source(self, kind, namespace, name, body):
+        """Note the status the source object has, which need not be written again"""
+        key = (kind, namespace, name)
+        status = reflected_status(kind, body)
+        with self._lock:
+            self._written[key] = status
+            if self._pending.get(key) == status:
+                del self._pending[key]
+                status_pending.set(len(self._pending))
+
+    def forget(self, kind, namespace, name):
+        key = (kind, namespace, name)
+        with self._lock:
+            self._written.pop(key, None)
+            self._pending.pop(key, None)
+            status_pending.set(len(self._pending))
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="knuto-status-reflector", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.flush()
+            except Exception as e:
+                self.logger.error(f"Writing the status of source objects failed: {e}")
+
+    def flush(self):
+        """Write the oldest pending statuses, at most batch_size, and return how many"""
+        with self._lock:
+            batch = []
+            while self._pending and len(batch) < self.batch_size:
+                batch.append(self._pending.popitem(last=False))
+            status_pending.set(len(self._pending))
+
+        written = 0
+        for (kind, namespace, name), status in batch:
+            result = self._patch(kind, namespace, name, status)
+            status_patches.labels(kind, result).inc()
+            if result == "written":
+                written += 1
+                with self._lock:
+                    self._written[(kind, namespace, name)] = status
+            elif result == "failed":
+                with self._lock:
+                    # Tried again in the next flush, unless a later status is pending
+                    self._pending.setdefault((kind, namespace, name), status)
+                    status_pending.set(len(self._pending))
+
+        return written
+
+    def _patch(self, kind, namespace, name, status):
+        api_version, plural = self.endpoints[kind]
+        r = state.api.patch(
+            version=api_version,
+            namespace=namespace,
+            url=f"{plural}/{name}/status",
+            headers={"Content-Type": "application/merge-patch+json"},
+            data=codec.dumps({"status": status}),
+        )
+        if r.status_code == 404:
+            self.logger.debug(f"{kind} {namespace}/{name} is gone, status not written")
+            return "gone"
+        if not r.ok:
+            self.logger.warning(
+                f"Writing the status of {kind} {namespace}/{name} failed: "
+                f"{r.status_code} {r.text}"
+            )
+            return "failed"
+        return "written"
@@ -0,0 +1,292 @@
+"""Replay of a recording made by knuto-record against the handlers, as a benchmark.
+
+knuto-replay feeds the recorded events to the handlers of both operators, as they run
+in combined mode, against the in-memory API of knuto.fakeapi. Each event first updates
+the object in the fake API. Then its event handlers are called, and its create, update
+or delete handlers as kopf would call them: create for objects not seen before that kopf
+has not handled yet, update when the spec, labels or annotations change, and delete when
+it is deleted. The events are due at their recorded times divided by --speed, and are
+handled in order on one thread. The report has the throughput, the latency of each
+event from when it was due until its handlers returned, and the API requests the
+handlers made.
+"""
+import logging
+import time
+from argparse import ArgumentParser
+
+from . import codec, kafka_user_topic, secrets
+from .config import globalconf, state
+from .fakeapi import fake_api
+from .recording import read_recording
+
+logger = logging.getLogger(__name__)
+
+KOPF_ANNOTATION_PREFIXES = ("kopf.zalando.org/",)
+
+
+def _strimzi_kafkauser_secret(namespace, labels, **_):
+    return labels.get(
+        "strimzi.io/kind"
+    ) == "KafkaUser" and secrets._in_strimzi_namespace(namespace)
+
+
+def _always(**_):
+    return True
+
+
+# (kind, reason, filter, handler[, field]), in the order kopf registers them. Update
+# handlers with a field are only called when that field changes, and get its old and new
+# value, as from kopf. tests/test_recording.py checks this against kopf's registry.
+HANDLERS = [
+    ("KafkaUser", "event", _always, secrets.index_kafkauser),
+    ("Secret", "event", _strimzi_kafkauser_secret, secrets.observe_kafkauser_secret),
+    ("Secret", "create", _strimzi_kafkauser_secret, secrets.kafka_secret_create),
+    ("Secret", "event", secrets._is_cluster_ca_cert, secrets.index_cluster_ca_cert),
+    (
+        "Secret",
+        "update",
+        secrets._is_cluster_ca_cert,
+        secrets.regenerate_on_cluster_ca_change,
+        ("data",),
+    ),
+    ("Secret", "update", _strimzi_kafkauser_secret, secrets.kafka_secret),
+    (
+        "KafkaUser",
+        "create",
+        kafka_user_topic._in_source_namespace,
+        kafka_user_topic.create_kafkauser,
+    ),
+    (
+        "KafkaUser",
+        "update",
+        kafka_user_topic._in_source_namespace,
+        kafka_user_topic.update_kafkauser,
+    ),
+    (
+        "KafkaUser",
+        "delete",
+        kafka_user_topic._in_source_namespace,
+        kafka_user_topic.delete_kafkauser,
+    ),
+    (
+        "KafkaTopic",
+        "create",
+        kafka_user_topic._in_source_namespace,
+        kafka_user_topic.create_kafkatopic,
+    ),
+    (
+        "KafkaTopic",
+        "update",
+        kafka_user_topic._in_source_namespace,
+        kafka_user_topic.update_kafkatopic,
+    ),
+    (
+        "KafkaTopic",
+        "event",
+        kafka_user_topic._in_source_namespace,
+        kafka_user_topic.index_existing_kafkatopic,
+    ),
+    (
+        "KafkaUser",
+        "event",
+        kafka_user_topic._in_source_namespace,
+        kafka_user_topic.observe_kafkauser,
+    ),
+    (
+        "KafkaUser",
+        "event",
+        kafka_user_topic._is_copy,
+        kafka_user_topic.observe_kafkauser_copy,
+    ),
+    (
+        "KafkaTopic",
+        "event",
+        kafka_user_topic._is_copy,
+        kafka_user_topic.observe_kafkatopic_copy,
+    ),
+    (
+        "KafkaTopic",
+        "delete",
+        kafka_user_topic._in_source_namespace,
+        kafka_user_topic.delete_kafkatopic,
+    ),
+    (
+        "KafkaUser",
+        "update",
+        secrets._in_strimzi_namespace,
+        secrets.render_changed_client_profile,
+        ("metadata", "annotations"),
+    ),
+]
+
+
+def essence(obj):
+    """What kopf compares to tell an update: all but status and kopf's annotations"""
+    metadata = obj.get("metadata", {})
+    return {
+        "labels": metadata.get("labels") or {},
+        "annotations": {
+            key: value
+            for key, value in (metadata.get("annotations") or {}).items()
+            if not key.startswith(KOPF_ANNOTATION_PREFIXES)
+        },
+        "body": {
+            key: value
+            for key, value in obj.items()
+            if key not in ("apiVersion", "kind", "metadata", "status")
+        },
+    }
+
+
+def _field(obj, path):
+    for key in path:
+        obj = (obj or {}).get(key)
+    return obj
+
+
+def _handled_by_kopf(obj):
+    annotations = obj["metadata"].get("annotations") or {}
+    return any(key.startswith(KOPF_ANNOTATION_PREFIXES) for key in annotations)
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+class Replayer:
+    def __init__(self, adapter, handlers=None, *, speed=100.0, clock=time.monotonic):
+        self.adapter = adapter
+        self.handlers = HANDLERS if handlers is None else handlers
+        self.speed = speed
+        self.clock = clock
+        self._essences = {}
+        self._bodies = {}
+        self._previous = None
+        self.errors = 0
+
+    def _reasons(self, event_type, obj):
+        key = (obj["kind"], obj["metadata"].get("namespace"), obj["metadata"]["name"])
+        self._previous = self._bodies.pop(key, None)
+        if event_type == "DELETED":
+            self._essences.pop(key, None)
+            return ["event", "delete"]
+
+        self._bodies[key] = obj
+
+        previous = self._essences.get(key)
+        self._essences[key] = essence(obj)
+        if previous is None:
+            # Objects kopf has handled before the recording are resumed, not created
+            if event_type is None and _handled_by_kopf(obj):
+                return ["event"]
+            return ["event", "create"]
+        if previous != self._essences[key]:
+            return ["event", "update"]
+        return ["event"]
+
+    def handle(self, event_type, obj):
+        if event_type == "DELETED":
+            self.adapter.remove_object(obj)
+        else:
+            self.adapter.put_object(obj)
+
+        metadata = obj["metadata"]
+        kwargs = {
+            "event": {"type": event_type, "object": obj},
+            "body": obj,
+            "meta": metadata,
+            "spec": obj.get("spec", {}),
+            "status": obj.get("status", {}),
+            "namespace": metadata.get("namespace"),
+            "name": metadata["name"],
+            "labels": metadata.get("labels") or {},
+            "annotations": metadata.get("annotations") or {},
+            "logger": logger,
+        }
+        for reason in self._reasons(event_type, obj):
+            for kind, handler_reason, accept, handler, *field in self.handlers:
+                if kind != obj["kind"] or handler_reason != reason:
+                    continue
+                if not accept(**kwargs):
+                    continue
+                changes = {}
+                if reason == "update":
+                    path = field[0] if field else ()
+                    changes = {
+                        "old": _field(self._previous, path),
+                        "new": _field(obj, path),
+                    }
+                    if field and changes["old"] == changes["new"]:
+                        continue
+                try:
+                    handler(reason=reason, **kwargs, **changes)
+                except Exception as e:
+                    self.errors += 1
+                    logger.debug(f"{handler.__name__} failed: {e}")
+
+    def replay(self, events):
+        latencies = []
+        started = self.clock()
+        for event in events:
+            due = started + event["t"] / self.speed
+            delay = due - self.clock()
+            if delay > 0:
+                time.sleep(delay)
+
+            # Each handler gets a body of its own, as from the watch
+            self.handle(event["type"], codec.clone(event["object"]))
+            latencies.append(self.clock() - due)
+
+        elapsed = self.clock() - started
+        return {
+            "events": len(events),
+            "seconds": round(elapsed, 3),
+            "events_per_second": round(len(events) / elapsed, 1) if elapsed else 0.0,
+            "latency_p50_ms": round(_percentile(latencies, 0.5) * 1000, 2),
+            "latency_p99_ms": round(_percentile(latencies, 0.99) * 1000, 2),
+            "latency_max_ms": round(max(latencies, default=0.0) * 1000, 2),
+            "handler_errors": self.errors,
+            "api_calls": {
+                f"{method} {resource}": count
+                for (method, resource), count in sorted(self.adapter.calls.items())
+            },
+        }
+
+
+def main():
+    # The operators take the same arguments as in combined mode
+    program_args = ArgumentParser(
+        parents=[
+            kafka_user_topic._kafka_user_topic_arguments(),
+            secrets._secret_arguments(),
+        ]
+    )
+    program_args.add_argument("--verbose", "-v", default=False, action="store_true")
+    program_args.add_argument(
+        "--speed",
+        type=float,
+        default=100,
+        help="How many times faster than recorded the events are replayed.",
+    )
+    program_args.add_argument("recording", help="File recorded by knuto-record")
+
+    args = program_args.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+
+    header, events = read_recording(args.recording)
+    globalconf.strimzi_version = header["api_version"].split("/")[-1]
+    globalconf.kafka_user_topic_destination_namespace = header["destination_namespace"]
+    globalconf.kafka_user_topic_source_namespaces.update(header["source_namespaces"])
+    state.combined = True
+    state.namespace = header["destination_namespace"]
+    state.api, adapter = fake_api()
+
+    print(Replayer(adapter, speed=args.speed).replay(events))
+
+
+if __name__ == "__main__":
+    main()
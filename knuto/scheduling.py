@@ -0,0 +1,201 @@
+"""Priority scheduling of the handlers.
+
+kopf runs synchronous handlers in the executor of its settings, in the order they arrive.
+With --handler-threads, the handlers decorated with @prioritized run at most that many
+at once. The others wait in a queue by the namespace of their object and the reason they
+were called for, given by the namespace, reason and event keyword arguments kopf calls
+them with:
+
+* Calls with a lower priority number always run first. Watch events, creations and
+  deletions come first, then updates and resumes. Operator handlers such as probes are
+  not queued. --handler-priority REASON=N overrides the priority of a reason.
+* Calls of the same priority are shared between namespaces by weighted fair queuing.
+  A namespace with --namespace-weight NS=W gets W times the share of a namespace with the
+  default weight of 1, however many calls the other namespaces have queued.
+
+kopf's executor is given QUEUED_HANDLER_THREADS threads more than --handler-threads, for
+the queued calls to wait on.
+"""
+import contextlib
+import functools
+import threading
+import time
+from collections import deque
+
+import kopf
+
+from . import metrics
+from .config import globalconf
+
+handler_wait = metrics.histogram(
+    "knuto_handler_wait_seconds",
+    "Time handler calls have been queued before running",
+    ["namespace", "priority"],
+    buckets=(0.01, 0.1, 0.5, 1, 5, 15, 60, 300),
+)
+queued_handlers = metrics.gauge(
+    "knuto_queued_handlers", "Handler calls waiting to run", ["namespace"]
+)
+
+DEFAULT_PRIORITIES = {
+    "event": 1,
+    "create": 1,
+    "delete": 1,
+    "update": 2,
+    "resume": 2,
+}
+# Threads of kopf's executor beyond --handler-threads, for queued handler calls
+QUEUED_HANDLER_THREADS = 200
+
+
+def key_value(text, value_type):
+    """Parse an argument of the form KEY=VALUE"""
+    key, separator, value = text.partition("=")
+    if not separator:
+        raise ValueError(f"{text} is not on the form KEY=VALUE")
+    return key, value_type(value)
+
+
+class FairQueue:
+    """
+    Queue of items by priority and namespace. pop() returns an item of the lowest priority
+    number queued, and shares the items of one priority between namespaces in proportion to
+    their weights, using the virtual finish time of each namespace.
+    """
+
+    def __init__(self, weights=None):
+        self.weights = weights or {}
+        self._queues = {}
+        self._finish = {}
+        self._virtual_time = 0.0
+        self._length = 0
+
+    def push(self, priority, namespace, item):
+        queues = self._queues.setdefault(priority, {})
+        if namespace not in queues:
+            # A namespace that has been idle starts at the current virtual time, rather
+            # than with the credit of the time it was idle
+            queues[namespace] = deque()
+            self._finish[namespace] = max(
+                self._finish.get(namespace, 0.0), self._virtual_time
+            )
+        queues[namespace].append(item)
+        self._length += 1
+
+    def pop(self):
+        if not self._length:
+            raise IndexError("pop from an empty FairQueue")
+
+        priority = min(self._queues)
+        queues = self._queues[priority]
+        namespace = min(queues, key=lambda ns: (self._finish[ns], str(ns)))
+
+        item = queues[namespace].popleft()
+        self._virtual_time = self._finish[namespace]
+        self._finish[namespace] += 1.0 / self.weights.get(namespace, 1.0)
+
+        if not queues[namespace]:
+            del queues[namespace]
+            if not queues:
+                del self._queues[priority]
+        self._length -= 1
+
+        return item
+
+    def __len__(self):
+        return self._length
+
+
+class PriorityGate:
+    """
+    Lets at most slots handler calls run at once, or all of them if slots is None. The
+    calls that wait are let through by priority, and by weighted fair queuing between
+    the namespaces of one priority. A call made by a thread that already has a slot runs
+    in that slot, rather than waiting for a slot of its own.
+    """
+
+    def __init__(self, slots=None, *, weights=None, priorities=None):
+        self.configure(slots, weights=weights, priorities=priorities)
+        self._lock = threading.Lock()
+        self._running = 0
+        self._admitted = threading.local()
+
+    def configure(self, slots, *, weights=None, priorities=None):
+        self.slots = slots
+        self.priorities = dict(DEFAULT_PRIORITIES, **(priorities or {}))
+        self._queue = FairQueue(weights)
+
+    def priority(self, reason):
+        return self.priorities.get(reason, max(self.priorities.values()))
+
+    @contextlib.contextmanager
+    def slot(self, namespace, reason):
+        if self.slots is None or getattr(self._admitted, "slot", False):
+            yield
+            return
+
+        priority = self.priority(reason)
+        queued = time.monotonic()
+        admitted = threading.Event()
+        with self._lock:
+            if self._running < self.slots:
+                self._running += 1
+                admitted.set()
+            else:
+                self._queue.push(priority, namespace, (namespace, admitted))
+                queued_handlers.labels(namespace or "").inc()
+
+        admitted.wait()
+        handler_wait.labels(namespace or "", str(priority)).observe(
+            time.monotonic() - queued
+        )
+        self._admitted.slot = True
+        try:
+            yield
+        finally:
+            self._admitted.slot = False
+            self._release()
+
+    def _release(self):
+        with self._lock:
+            if not self._queue:
+                self._running -= 1
+                return
+            # The slot passes to the next call
+            namespace, admitted = self._queue.pop()
+            queued_handlers.labels(namespace or "").dec()
+            admitted.set()
+
+
+handler_gate = PriorityGate()
+
+
+def prioritized(handler):
+    """Run a kopf handler in a slot of handler_gate"""
+
+    @functools.wraps(handler)
+    def wrapper(*args, **kwargs):
+        reason = kwargs.get("reason")
+        if reason is None and "event" in kwargs:
+            reason = "event"
+        with handler_gate.slot(kwargs.get("namespace"), reason):
+            return handler(*args, **kwargs)
+
+    return wrapper
+
+
+@kopf.on.startup()
+def configure_scheduling(settings, logger, **_):
+    if globalconf.handler_threads is None:
+        return
+
+    logger.info(
+        f"Scheduling handlers on {globalconf.handler_threads} threads by priority "
+        f"and namespace weight"
+    )
+    handler_gate.configure(
+        globalconf.handler_threads,
+        weights=globalconf.namespace_weights,
+        priorities=globalconf.handler_priorities,
+    )
+    settings.execution.max_workers = globalconf.handler_threads + QUEUED_HANDLER_THREADS
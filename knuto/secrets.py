@@ -1,16 +1,142 @@
 import base64
+import functools
+import logging
+import threading
+import time
 from argparse import ArgumentParser, Action, ArgumentError
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from copy import deepcopy
 
 import kopf
+import pykube
 from pykube import Secret, object_factory
-
+from pykube.exceptions import HTTPError
+
+from . import strimzi, tracing
+from .cache import SOURCE_ANNOTATION, kafkauser_index
+from .clientprofiles import (
+    PROFILE_ANNOTATION,
+    profile_name,
+    profile_setting_argument,
+    profile_settings,
+    render,
+)
 from .config import globalconf, state
-from .utils import _copy_object, _update_or_create, default_main
+from .parking import ParkingLot
+from .profiling import profiled
+from .scheduling import key_value, prioritized
+from .tls import keystore_cache
+from .utils import _copy_object, _get_pykube_config, _update_or_create, default_main
+from .watchhealth import start_watch_checker, watch_health
+
+logger = logging.getLogger(__name__)
+
+# Secret events waiting for a KafkaUser, keyed by (namespace, name) of the KafkaUser
+waiting_for_kafkauser = ParkingLot()
+# Seconds until kopf retries a secret event whose KafkaUser has not been seen
+PARKED_RETRY_DELAY = 60
+
+CLUSTER_CA_CERT_SUFFIX = "-cluster-ca-cert"
+
+# Data of the cluster CA certificate Secrets, keyed by (namespace, cluster)
+cluster_ca_certs = {}
+# Seconds until kopf retries regenerating the secrets after a cluster CA change
+CLUSTER_CA_RETRY_DELAY = 30
+
+
+class KafkaUserNotFound(Exception):
+    def __init__(self, namespace, name):
+        super(KafkaUserNotFound, self).__init__(f"KafkaUser {namespace}/{name} not found")
+        self.namespace = namespace
+        self.name = name
+
+
+def _in_strimzi_namespace(namespace, **_):
+    return namespace == state.namespace
+
+
+@kopf.on.event(strimzi.GROUP, "kafkausers")
+@prioritized
+def index_kafkauser(event, body, **kwargs):
+    kafkauser_index.apply(event["type"], body)
+    watch_health.observe("KafkaUser", event["type"], body)
+
+    if event["type"] != "DELETED":
+        _resume_waiting_for(body["metadata"]["namespace"], body["metadata"]["name"])
+
+
+@kopf.on.event(
+    "", "v1", "secrets", labels={"strimzi.io/kind": "KafkaUser"}, when=_in_strimzi_namespace
+)
+@prioritized
+def observe_kafkauser_secret(event, body, **kwargs):
+    watch_health.observe("Secret", event["type"], body)
+
+
+@kopf.on.startup()
+def start_secrets_watch_checker(logger, **kwargs):
+    start_watch_checker(
+        [
+            (strimzi.api_version(), "KafkaUser", [state.namespace], None),
+            ("v1", "Secret", [state.namespace], {"strimzi.io/kind": "KafkaUser"}),
+        ],
+        logger,
+    )
 
-SOURCE_ANNOTATION = "knuto.niradynamics.se/source"
+
+def _resume_waiting_for(namespace, name):
+    for resume in waiting_for_kafkauser.release((namespace, name)):
+        threading.Thread(
+            target=resume, name=f"knuto-resume-{namespace}-{name}", daemon=True
+        ).start()
+
+
+def _park_when_kafkauser_missing(handler):
+    """Retry secret events whose KafkaUser has not been seen yet, and park them until
+    the KafkaUser watch sees it, to run them then rather than after kopf's backoff"""
+
+    @functools.wraps(handler)
+    def wrapper(body, namespace, name, logger, **kwargs):
+        try:
+            return handler(body, namespace, name, logger, **kwargs)
+        except KafkaUserNotFound as e:
+            logger.info(f"Waiting for KafkaUser {e.namespace}/{e.name} to appear")
+            parked_body = deepcopy(dict(body))
+
+            def resume():
+                try:
+                    handler(parked_body, namespace, name, logger)
+                except Exception as resume_error:
+                    # kopf still retries the event
+                    logger.info(
+                        f"Handling parked secret {namespace}/{name} failed, leaving it "
+                        f"to be retried: {resume_error}"
+                    )
+
+            waiting_for_kafkauser.park(
+                (e.namespace, e.name), (handler.__name__, namespace, name), resume
+            )
+            # The KafkaUser might have been indexed after the lookup failed
+            if kafkauser_index.get(e.namespace, e.name) is not None:
+                _resume_waiting_for(e.namespace, e.name)
+
+            raise kopf.TemporaryError(
+                f"Waiting for KafkaUser {e.namespace}/{e.name}",
+                delay=PARKED_RETRY_DELAY,
+            )
+
+    return wrapper
 
 
-@kopf.on.create("", "v1", "secrets", labels={"strimzi.io/kind": "KafkaUser"})
+@kopf.on.create(
+    "",
+    "v1",
+    "secrets",
+    labels={"strimzi.io/kind": "KafkaUser"},
+    when=_in_strimzi_namespace,
+)
+@prioritized
+@_park_when_kafkauser_missing
 def kafka_secret_create(body, namespace, name, logger, **kwargs):
     new_obj = _copy_object(body)
 
@@ -34,22 +160,108 @@ def kafka_secret_create(body, namespace, name, logger, **kwargs):
         f"Creating {new_secret.metadata['namespace']}/{new_secret} with a kafka-client.properties with SCRAM-SHA-256 configuration"
         % new_secret.metadata
     )
+    tracing.stamp_delivery(new_secret)
     _update_or_create(new_secret)
+    tracing.observe_delivery(body, new_secret)
 
     return {"copied_to": f"{new_secret.metadata['namespace']}/{new_secret}"}
 
 
+@kopf.on.update(
+    strimzi.GROUP,
+    "kafkausers",
+    when=_in_strimzi_namespace,
+    field="metadata.annotations",
+)
+@prioritized
+def render_changed_client_profile(old, new, namespace, name, logger, **kwargs):
+    """Strimzi does not change the Secret when only an annotation of its KafkaUser does,
+    so the kafka-config secret is rendered again when the client profile changes"""
+    if (old or {}).get(PROFILE_ANNOTATION) == (new or {}).get(PROFILE_ANNOTATION):
+        return
+
+    secret = (
+        Secret.objects(state.api).filter(namespace=namespace).get_or_none(name=name)
+    )
+    if secret is None:
+        # Rendered with the new profile when Strimzi creates it
+        return
+
+    logger.info(f"Client profile of KafkaUser {namespace}/{name} changed")
+    return _render_kafka_secret(secret.obj, namespace, name, logger)
+
+
 def _load_kafkauser(namespace, name):
-    KafkaUser = object_factory(state.api, "kafka.strimzi.io/v1beta1", "KafkaUser")
+    """Look up a KafkaUser in the watch-fed index, falling back to the API for users that
+    have not been seen by the watch yet. Raises KafkaUserNotFound if it does not exist."""
+    KafkaUser = object_factory(state.api, strimzi.api_version(), "KafkaUser")
+
+    indexed = kafkauser_index.get(namespace, name)
+    if indexed is not None:
+        return KafkaUser(state.api, indexed)
 
     kafkauser = KafkaUser(
         state.api, {"metadata": {"namespace": namespace, "name": name}}
     )
-    kafkauser.reload()
+    try:
+        kafkauser.reload()
+    except HTTPError as e:
+        if e.code == 404:
+            raise KafkaUserNotFound(namespace, name)
+        raise
 
     return kafkauser
 
 
+def _is_cluster_ca_cert(namespace, name, **_):
+    return namespace == state.namespace and name.endswith(CLUSTER_CA_CERT_SUFFIX)
+
+
+@kopf.on.event("", "v1", "secrets", when=_is_cluster_ca_cert)
+@prioritized
+def index_cluster_ca_cert(event, body, namespace, name, **kwargs):
+    cluster = name[: -len(CLUSTER_CA_CERT_SUFFIX)]
+    if event["type"] == "DELETED":
+        cluster_ca_certs.pop((namespace, cluster), None)
+        return
+
+    cluster_ca_certs[(namespace, cluster)] = dict(body.get("data") or {})
+
+
+@kopf.on.update("", "v1", "secrets", when=_is_cluster_ca_cert, field="data")
+@prioritized
+def regenerate_on_cluster_ca_change(body, namespace, name, logger, **kwargs):
+    """The truststores of all TLS users change with the cluster CA. Retried by kopf until
+    all kafka-config secrets have been regenerated."""
+    cluster = name[: -len(CLUSTER_CA_CERT_SUFFIX)]
+    cluster_ca_certs[(namespace, cluster)] = dict(body.get("data") or {})
+
+    logger.info(f"Cluster CA of {cluster} has changed, regenerating secrets")
+    result = regenerate_kafka_config_secrets(namespace, logger)
+    if result["failed"]:
+        raise kopf.TemporaryError(
+            f"{result['failed']} kafka-config secrets could not be regenerated",
+            delay=CLUSTER_CA_RETRY_DELAY,
+        )
+
+    return result
+
+
+def _load_cluster_ca(namespace, cluster):
+    """The data of the cluster CA certificate Secret of cluster, from the watch-fed index
+    or else the API"""
+    data = cluster_ca_certs.get((namespace, cluster))
+    if data is not None:
+        return data
+
+    secret = Secret(
+        state.api,
+        {"metadata": {"namespace": namespace, "name": cluster + CLUSTER_CA_CERT_SUFFIX}},
+    )
+    secret.reload()
+    return secret.obj.get("data") or {}
+
+
 def _source_namespace_for_secret(namespace, name, logger):
     """Load the KafkaUser in the namespace handled by strimzi that corresponds to the newly created/updated
     secret, and check its annotations to find the namespace it was originally created in"""
@@ -67,8 +279,22 @@ def _source_namespace_for_secret(namespace, name, logger):
     return source_namespace
 
 
-@kopf.on.update("", "v1", "secrets", labels={"strimzi.io/kind": "KafkaUser"})
+@kopf.on.update(
+    "",
+    "v1",
+    "secrets",
+    labels={"strimzi.io/kind": "KafkaUser"},
+    when=_in_strimzi_namespace,
+)
+@prioritized
 def kafka_secret(body, namespace, name, logger, **kwargs):
+    return _render_kafka_secret(body, namespace, name, logger)
+
+
+@_park_when_kafkauser_missing
+def _render_kafka_secret(body, namespace, name, logger, **kwargs):
+    """The kafka-config Secret of the Strimzi Secret body, updated. Not @prioritized, as
+    it runs in the slot of the handler that calls it."""
     new_obj = _copy_object(body)
 
     source_namespace = _source_namespace_for_secret(namespace, name, logger)
@@ -82,7 +308,9 @@ def kafka_secret(body, namespace, name, logger, **kwargs):
         f"Updating {new_secret.metadata['namespace']}/{new_secret} with a kafka-client.properties with SCRAM-SHA-256 configuration"
         % new_secret.metadata
     )
+    tracing.stamp_delivery(new_secret)
     _update_or_create(new_secret)
+    tracing.observe_delivery(body, new_secret)
 
     return {"updated": f"{new_secret.metadata['namespace']}/{new_secret}"}
 
@@ -92,30 +320,49 @@ def _should_copy(name, namespace, source_namespace, obj, logger):
         return False
 
     if not source_namespace in globalconf.kafka_user_topic_source_namespaces:
-        logger.info(
+        # Routine with --workers, where the other namespaces are served by other workers
+        logger.debug(
             f"Skipping as Secret's source namespace {{source_namespace}} is not in our list of destination namespaces"
         )
         return False
 
-    if "password" in obj["data"]:
-        return True
-    else:
+    secret_type = _secret_type(obj["data"])
+    if secret_type is None:
         logger.warning(
             f"Unable to work on secret {namespace}/{name}, unrecognized secret type"
         )
+        return False
+    if secret_type not in globalconf.secret_type_to_hostname_map:
+        logger.warning(
+            f"Unable to work on secret {namespace}/{name}, no bootstrap server given "
+            f"for secret type {secret_type} with --secret-type-to-bootstrap-server"
+        )
+        return False
+
+    return True
 
-    return False
 
+def _secret_type(data):
+    if "password" in data:
+        return "scram-sha-512"
+    if "user.crt" in data:
+        return "tls"
+    return None
 
-def _create_new_secret(name, strimzi_namespace, destination_namespace, secret_copy):
+
+@profiled
+def _create_new_secret(
+    name, strimzi_namespace, destination_namespace, secret_copy, *, annotations=None
+):
+    """
+    The kafka-config Secret of the Strimzi Secret name. annotations are those of its
+    KafkaUser in strimzi_namespace, looked up in the index if not given.
+    """
 
     dst_name = name[len(destination_namespace) + 1 :]
 
-    # Slightly silly, but we'll only reach this point if _should_copy already said it's there
-    # Later on, we'll handle more types, so this is future extension point.
-    secret_type = None
-    if "password" in secret_copy["data"]:
-        secret_type = "scram-sha-512"
+    # We'll only reach this point if _should_copy already recognized the secret type
+    secret_type = _secret_type(secret_copy["data"])
 
     broker_bootstrap_servers = globalconf.secret_type_to_hostname_map[secret_type]
 
@@ -127,24 +374,192 @@ sasl.jaas.config=org.apache.kafka.common.security.scram.ScramLoginModule require
 username="{name}" \
 password="{password}";
 bootstrap.servers={broker_bootstrap_servers}
-""".encode(
-            "ascii"
+"""
+    elif secret_type == "tls":
+        cluster = secret_copy["metadata"].get("labels", {}).get("strimzi.io/cluster")
+        if cluster is None:
+            raise kopf.PermanentError(
+                f"Secret {strimzi_namespace}/{name} has no strimzi.io/cluster label, "
+                f"so its cluster CA is not known"
+            )
+        cluster_ca = _load_cluster_ca(strimzi_namespace, cluster)
+        secret_copy["data"].update(
+            keystore_cache.client_data(secret_copy["data"], cluster_ca)
+        )
+        keystore_password = base64.b64decode(
+            secret_copy["data"]["user.password"]
+        ).decode("utf-8")
+        truststore_password = base64.b64decode(
+            secret_copy["data"]["truststore.password"]
+        ).decode("utf-8")
+        mount_path = globalconf.tls_secret_mount_path
+        kafka_client_properties = f"""security.protocol=SSL
+ssl.keystore.type=PKCS12
+ssl.keystore.location={mount_path}/user.p12
+ssl.keystore.password={keystore_password}
+ssl.truststore.type=PKCS12
+ssl.truststore.location={mount_path}/truststore.p12
+ssl.truststore.password={truststore_password}
+bootstrap.servers={broker_bootstrap_servers}
+"""
+    else:
+        return None
+
+    kafka_client_properties += _client_profile_properties(
+        name, strimzi_namespace, destination_namespace, annotations
+    )
+
+    new_secret = Secret(state.api, secret_copy)
+    new_secret.obj["data"]["kafka-client.properties"] = base64.b64encode(
+        kafka_client_properties.encode("ascii")
+    ).decode("ascii")
+
+    # Deleting to ensure we don't react on the secret we're creating
+    del new_secret.labels["strimzi.io/kind"]
+
+    new_secret.annotations["knuto.niradynamics.se/source"] = f"{strimzi_namespace}/{name}"
+    new_secret.metadata["name"] = f"{dst_name}-kafka-config"
+    new_secret.metadata["namespace"] = destination_namespace
+
+    return new_secret
+
+
+def _client_profile_properties(
+    name, strimzi_namespace, destination_namespace, annotations
+):
+    if annotations is None:
+        indexed = kafkauser_index.get(strimzi_namespace, name)
+        annotations = indexed["metadata"]["annotations"] if indexed is not None else {}
+
+    profile = profile_name(
+        annotations, destination_namespace, globalconf.namespace_client_profiles
+    )
+    if profile is None:
+        return ""
+
+    settings = profile_settings(profile, globalconf.client_profiles)
+    if settings is None:
+        logger.warning(
+            f"KafkaUser {strimzi_namespace}/{name} has the unknown client profile "
+            f"{profile}, rendering no profile"
         )
-        new_secret = Secret(state.api, secret_copy)
-        new_secret.obj["data"]["kafka-client.properties"] = base64.b64encode(
-            kafka_client_properties
-        ).decode("ascii")
+        return ""
+
+    return render(profile, settings)
+
+
+@kopf.on.startup()
+def regenerate_on_startup(logger, **kwargs):
+    if not globalconf.regenerate_secrets_on_startup:
+        return
+
+    regenerate_kafka_config_secrets(state.namespace, logger)
+
+
+def regenerate_kafka_config_secrets(strimzi_namespace, logger, *, force=False):
+    """Re-render the kafka-config Secret of every Strimzi KafkaUser secret in strimzi_namespace.
+
+    Everything needed is fetched with one LIST per kind and namespace up front, and only
+    destination Secrets whose rendered data differ from what is stored are written (all of
+    them if force is set). Destination Secrets that do not exist yet are left to
+    kafka_secret_create, as they also need to be adopted by their KafkaUser."""
+    started = time.monotonic()
+
+    KafkaUser = object_factory(state.api, strimzi.api_version(), "KafkaUser")
+    kafkausers = {
+        kafkauser.name: kafkauser
+        for kafkauser in KafkaUser.objects(state.api).filter(
+            namespace=strimzi_namespace
+        )
+    }
+    strimzi_secrets = list(
+        Secret.objects(state.api).filter(
+            namespace=strimzi_namespace, selector={"strimzi.io/kind": "KafkaUser"}
+        )
+    )
+
+    existing_secrets = {}
+    for source_namespace in globalconf.kafka_user_topic_source_namespaces:
+        for secret in Secret.objects(state.api).filter(namespace=source_namespace):
+            existing_secrets[(source_namespace, secret.name)] = secret
+
+    to_be_written = []
+    missing = 0
+    for strimzi_secret in strimzi_secrets:
+        kafkauser = kafkausers.get(strimzi_secret.name)
+        if kafkauser is None or SOURCE_ANNOTATION not in kafkauser.annotations:
+            continue
+
+        source_namespace = kafkauser.annotations[SOURCE_ANNOTATION].split("/")[0]
+        if not _should_copy(
+            strimzi_secret.name,
+            strimzi_namespace,
+            source_namespace,
+            strimzi_secret.obj,
+            logger,
+        ):
+            continue
+
+        try:
+            new_secret = _create_new_secret(
+                strimzi_secret.name,
+                strimzi_namespace,
+                source_namespace,
+                _copy_object(strimzi_secret.obj),
+                annotations=kafkauser.annotations,
+            )
+        except kopf.PermanentError as e:
+            logger.warning(f"Not regenerating {strimzi_secret.name}: {e}")
+            continue
+        existing = existing_secrets.get((source_namespace, new_secret.name))
+        if existing is None:
+            missing += 1
+            continue
 
-        # Deleting to ensure we don't react on the secret we're creating
-        del new_secret.labels["strimzi.io/kind"]
+        if not force and existing.obj.get("data") == new_secret.obj["data"]:
+            continue
 
-        new_secret.annotations[
-            "knuto.niradynamics.se/source"
-        ] = f"{strimzi_namespace}/{name}"
-        new_secret.metadata["name"] = f"{dst_name}-kafka-config"
-        new_secret.metadata["namespace"] = destination_namespace
+        to_be_written.append(new_secret)
 
-        return new_secret
+    logger.info(
+        f"Regenerating {len(to_be_written)} of {len(strimzi_secrets)} kafka-config secrets "
+        f"with {globalconf.regenerate_concurrency} workers, {missing} not created yet"
+    )
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=globalconf.regenerate_concurrency) as executor:
+        futures = {
+            executor.submit(new_secret.update): new_secret
+            for new_secret in to_be_written
+        }
+        report_every = max(len(futures) // 10, 1)
+        for done, future in enumerate(as_completed(futures), start=1):
+            new_secret = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                failed += 1
+                logger.error(
+                    f"Failed to regenerate {new_secret.namespace}/{new_secret}: {e}"
+                )
+
+            if done % report_every == 0 or done == len(futures):
+                logger.info(
+                    f"Regenerated {done}/{len(futures)} kafka-config secrets "
+                    f"in {time.monotonic() - started:.1f}s"
+                )
+
+    elapsed = time.monotonic() - started
+    logger.info(
+        f"Regeneration done in {elapsed:.1f}s, {len(to_be_written) - failed} written, {failed} failed"
+    )
+
+    return {
+        "regenerated": len(to_be_written) - failed,
+        "failed": failed,
+        "missing": missing,
+        "seconds": round(elapsed, 1),
+    }
 
 
 class BootstrapServerArgumentAction(Action):
@@ -157,13 +572,44 @@ class BootstrapServerArgumentAction(Action):
         globalconf.secret_type_to_hostname_map[secret_type] = server_addr
 
 
+class StoreTlsSecretMountPath(Action):
+    def __call__(self, parser, namespace, values, option_string=None):
+        globalconf.tls_secret_mount_path = values
+
+
 class TopicSourceNamespaceAction(Action):
     def __call__(self, parser, namespace, values, option_string=None):
         globalconf.kafka_user_topic_source_namespaces.add(values)
 
 
-def main():
-    program_args = ArgumentParser()
+class StoreClientProfileSetting(Action):
+    def __call__(self, parser, namespace, values, option_string=None):
+        profile, key, value = values
+        globalconf.client_profiles.setdefault(profile, {})[key] = value
+
+
+class StoreNamespaceClientProfile(Action):
+    def __call__(self, parser, namespace, values, option_string=None):
+        source_namespace, profile = values
+        globalconf.namespace_client_profiles[source_namespace] = profile
+
+
+class StoreRegenerateSecretsOnStartup(Action):
+    def __init__(self, *args, **kwargs):
+        kwargs["nargs"] = 0
+        super(StoreRegenerateSecretsOnStartup, self).__init__(*args, **kwargs)
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        globalconf.regenerate_secrets_on_startup = True
+
+
+class StoreRegenerateConcurrency(Action):
+    def __call__(self, parser, namespace, values, option_string=None):
+        globalconf.regenerate_concurrency = values
+
+
+def _secret_arguments():
+    program_args = ArgumentParser(add_help=False)
     program_args.add_argument(
         "--secret-type-to-bootstrap-server",
         action=BootstrapServerArgumentAction,
@@ -174,8 +620,78 @@ def main():
         action=TopicSourceNamespaceAction,
         default=set([]),
     )
+    program_args.add_argument(
+        "--tls-secret-mount-path",
+        action=StoreTlsSecretMountPath,
+        help="Where clients mount the kafka-config secret of TLS users, for the keystore "
+        "and truststore locations in kafka-client.properties.",
+    )
+    program_args.add_argument(
+        "--client-profile",
+        type=profile_setting_argument,
+        action=StoreClientProfileSetting,
+        help="PROFILE/KEY=VALUE, a Kafka client setting of the tuning profile PROFILE, "
+        "added to or replacing those of the built-in profiles.",
+    )
+    program_args.add_argument(
+        "--namespace-client-profile",
+        type=lambda text: key_value(text, str),
+        action=StoreNamespaceClientProfile,
+        help="NAMESPACE=PROFILE, the tuning profile rendered into "
+        "kafka-client.properties for the KafkaUsers of NAMESPACE that do not name one "
+        f"in their {PROFILE_ANNOTATION} annotation.",
+    )
+    program_args.add_argument(
+        "--regenerate-concurrency",
+        type=int,
+        action=StoreRegenerateConcurrency,
+        help="Number of kafka-config secrets written in parallel when regenerating.",
+    )
+
+    return program_args
+
+
+def _regenerate_on_startup_arguments():
+    program_args = ArgumentParser(add_help=False)
+    program_args.add_argument(
+        "--regenerate-secrets-on-startup",
+        action=StoreRegenerateSecretsOnStartup,
+        help="Re-render all kafka-config secrets whose content is outdated, e.g. after "
+        "the bootstrap server of a secret type has changed, before handling events.",
+    )
+
+    return program_args
+
+
+def main():
+    return default_main(
+        [_secret_arguments(), _regenerate_on_startup_arguments()],
+        watch_source_namespaces=True,
+    )
+
+
+def regenerate_main():
+    program_args = ArgumentParser(parents=[_secret_arguments()])
+    program_args.add_argument("--verbose", "-v", default=False, action="store_true")
+    program_args.add_argument(
+        "--force",
+        default=False,
+        action="store_true",
+        help="Write all kafka-config secrets, not only the outdated ones.",
+    )
+    program_args.add_argument(
+        "namespace", help="Namespace in which Strimzi creates KafkaUser secrets"
+    )
+
+    args = program_args.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+    print(f"globalconf: {globalconf.current_values()}")
+
+    state.api = pykube.HTTPClient(_get_pykube_config())
+    globalconf.strimzi_version = strimzi.discover_version(state.api)
 
-    return default_main([program_args])
+    print(regenerate_kafka_config_secrets(args.namespace, logger, force=args.force))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,245 @@
+"""knuto-status: report how far the KafkaUsers and KafkaTopics are replicated.
+
+One paged LIST per kind, across all namespaces, fetches the KafkaUsers, the KafkaTopics
+and the Secrets labelled with a Strimzi cluster, the latter as metadata only. They are
+joined in memory by the knuto.niradynamics.se/source annotation: each source object with
+its copy in the Strimzi namespace, each KafkaUser copy with the Secret Strimzi writes
+for it, and that Secret with the kafka-config Secret knuto-secrets writes in the source
+namespace. The report has per source namespace how many objects have each link, the
+missing links, and the copies and kafka-config Secrets whose source is gone.
+"""
+import logging
+import sys
+import time
+from argparse import ArgumentParser
+from collections import defaultdict
+
+import pykube
+from pykube import Secret, object_factory
+
+from . import codec, strimzi
+from .backpressure import is_ready
+from .cache import SOURCE_ANNOTATION
+from .config import globalconf, state
+from .secrets import TopicSourceNamespaceAction
+from .utils import _get_pykube_config, _list_paged
+
+logger = logging.getLogger(__name__)
+
+METADATA_ONLY = (
+    "application/json;as=PartialObjectMetadataList;g=meta.k8s.io;v=v1,application/json"
+)
+REFUSALS = ["acl_not_allowed", "policy_violation", "quota_exceeded", "name_collision"]
+
+
+def _list_all(api_object_class, page_size, *, selector=None, headers=None):
+    query = api_object_class.objects(state.api).filter(namespace=pykube.all)
+    if selector is not None:
+        query = query.filter(selector=selector)
+    return [obj.obj for obj in _list_paged(query, page_size, headers=headers)]
+
+
+def _key(obj):
+    return f"{obj['metadata']['namespace']}/{obj['metadata']['name']}"
+
+
+def _source(obj):
+    return (obj["metadata"].get("annotations") or {}).get(SOURCE_ANNOTATION)
+
+
+def _refusal(obj):
+    """Why the handlers did not copy obj, as recorded in its status by kopf"""
+    for result in (obj.get("status") or {}).values():
+        if isinstance(result, dict):
+            for refusal in REFUSALS:
+                if refusal in result:
+                    return f"{refusal}: {result[refusal]}"
+    return None
+
+
+def _new_namespace_report():
+    return {
+        "KafkaUser": {"sources": 0, "copied": 0, "ready": 0, "secret": 0, "config": 0},
+        "KafkaTopic": {"sources": 0, "copied": 0, "ready": 0},
+        "missing": [],
+    }
+
+
+def replication_report(
+    kafkausers, kafkatopics, secrets, destination_namespace, source_namespaces=None
+):
+    """
+    Join the listed objects into a report per source namespace. source_namespaces limits
+    the report to those namespaces, all but destination_namespace if None.
+    """
+
+    def is_source_namespace(namespace):
+        if namespace == destination_namespace:
+            return False
+        return not source_namespaces or namespace in source_namespaces
+
+    strimzi_secrets = set()
+    config_secrets = {}
+    for secret in secrets:
+        metadata = secret["metadata"]
+        if metadata["namespace"] == destination_namespace:
+            if (metadata.get("labels") or {}).get("strimzi.io/kind") == "KafkaUser":
+                strimzi_secrets.add(metadata["name"])
+        elif _source(secret) is not None and is_source_namespace(
+            metadata["namespace"]
+        ):
+            config_secrets[_source(secret)] = secret
+
+    namespaces = defaultdict(_new_namespace_report)
+    orphans = []
+    for kind, objects in [("KafkaUser", kafkausers), ("KafkaTopic", kafkatopics)]:
+        copies = {}
+        for obj in objects:
+            if obj["metadata"]["namespace"] == destination_namespace:
+                source = _source(obj)
+                if source is not None:
+                    copies[source] = obj
+
+        for obj in objects:
+            namespace = obj["metadata"]["namespace"]
+            if not is_source_namespace(namespace):
+                continue
+
+            report = namespaces[namespace]
+            counts = report[kind]
+            counts["sources"] += 1
+            copy = copies.pop(_key(obj), None)
+            if copy is None:
+                reason = _refusal(obj)
+                report["missing"].append(
+                    f"{kind} {_key(obj)}: no copy"
+                    + (f" ({reason})" if reason is not None else "")
+                )
+                continue
+
+            counts["copied"] += 1
+            if is_ready(copy):
+                counts["ready"] += 1
+            else:
+                report["missing"].append(f"{kind} {_key(obj)}: copy not ready")
+            if kind != "KafkaUser":
+                continue
+
+            copy_name = copy["metadata"]["name"]
+            if copy_name not in strimzi_secrets:
+                report["missing"].append(
+                    f"KafkaUser {_key(obj)}: "
+                    f"no Secret {destination_namespace}/{copy_name}"
+                )
+                continue
+            counts["secret"] += 1
+            if f"{destination_namespace}/{copy_name}" not in config_secrets:
+                report["missing"].append(
+                    f"KafkaUser {_key(obj)}: no kafka-config Secret in {namespace}"
+                )
+                continue
+            counts["config"] += 1
+
+        orphans += [
+            f"{kind} {_key(copy)}: source {source} is gone"
+            for source, copy in sorted(copies.items())
+            if is_source_namespace(source.partition("/")[0])
+        ]
+
+    orphans += [
+        f"Secret {_key(secret)}: source {source} is gone"
+        for source, secret in sorted(config_secrets.items())
+        if source.partition("/")[2] not in strimzi_secrets
+    ]
+
+    return {
+        "namespaces": {
+            namespace: namespaces[namespace] for namespace in sorted(namespaces)
+        },
+        "orphans": orphans,
+    }
+
+
+def collect(destination_namespace, source_namespaces=None, *, page_size=500):
+    """List the objects with one paged LIST per kind and join them"""
+    return replication_report(
+        _list_all(
+            object_factory(state.api, strimzi.api_version(), "KafkaUser"), page_size
+        ),
+        _list_all(
+            object_factory(state.api, strimzi.api_version(), "KafkaTopic"), page_size
+        ),
+        # Secret data is not needed, and is most of the size of a Secret
+        _list_all(
+            Secret,
+            page_size,
+            selector="strimzi.io/cluster",
+            headers={"Accept": METADATA_ONLY},
+        ),
+        destination_namespace,
+        source_namespaces,
+    )
+
+
+def format_report(report):
+    lines = []
+    for namespace, namespace_report in report["namespaces"].items():
+        users = namespace_report["KafkaUser"]
+        topics = namespace_report["KafkaTopic"]
+        health = "ok" if not namespace_report["missing"] else "degraded"
+        lines.append(
+            f"{namespace}: {health}, "
+            f"KafkaUsers {users['copied']}/{users['sources']} copied, "
+            f"{users['ready']} ready, {users['secret']} with Secret, "
+            f"{users['config']} with kafka-config; "
+            f"KafkaTopics {topics['copied']}/{topics['sources']} copied, "
+            f"{topics['ready']} ready"
+        )
+        lines += [f"  missing {missing}" for missing in namespace_report["missing"]]
+    lines += [f"orphan {orphan}" for orphan in report["orphans"]]
+    return "\n".join(lines)
+
+
+def main():
+    program_args = ArgumentParser()
+    program_args.add_argument("--verbose", "-v", default=False, action="store_true")
+    program_args.add_argument(
+        "--kafka-user-topic-source-namespace",
+        action=TopicSourceNamespaceAction,
+        default=set([]),
+        help="Report on this source namespace only. All namespaces if not given.",
+    )
+    program_args.add_argument(
+        "--page-size", type=int, default=500, help="Objects fetched per request."
+    )
+    program_args.add_argument(
+        "--json", default=False, action="store_true", help="Print the report as JSON."
+    )
+    program_args.add_argument(
+        "namespace", help="Namespace the KafkaUsers and KafkaTopics are copied to"
+    )
+
+    args = program_args.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+
+    started = time.monotonic()
+    state.api = pykube.HTTPClient(_get_pykube_config())
+    globalconf.strimzi_version = strimzi.discover_version(state.api)
+    report = collect(
+        args.namespace,
+        globalconf.kafka_user_topic_source_namespaces,
+        page_size=args.page_size,
+    )
+    logger.info(f"Collected the report in {time.monotonic() - started:.1f}s")
+
+    print(codec.dumps(report) if args.json else format_report(report))
+    unhealthy = report["orphans"] or any(
+        namespace_report["missing"]
+        for namespace_report in report["namespaces"].values()
+    )
+    sys.exit(1 if unhealthy else 0)
+
+
+if __name__ == "__main__":
+    main()
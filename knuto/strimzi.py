@@ -0,0 +1,31 @@
+"""The API version of the Strimzi resources.
+
+Newer Strimzi releases serve kafka.strimzi.io/v1beta2 and drop v1beta1. The handlers are
+registered without a version, so kopf serves the preferred version of the kafka.strimzi.io
+group, and the same version is discovered at startup for the objects knuto reads and writes
+itself.
+"""
+import logging
+
+from .config import globalconf
+
+logger = logging.getLogger(__name__)
+
+GROUP = "kafka.strimzi.io"
+
+
+def discover_version(api):
+    """The preferred version of the Strimzi API group, or the configured one if not served"""
+    r = api.get(version=GROUP, base="/apis")
+    if not r.ok:
+        logger.warning(
+            f"Could not discover the version of {GROUP} ({r.status_code}), "
+            f"using {globalconf.strimzi_version}"
+        )
+        return globalconf.strimzi_version
+
+    return r.json()["preferredVersion"]["version"]
+
+
+def api_version():
+    return f"{GROUP}/{globalconf.strimzi_version}"
@@ -0,0 +1,192 @@
+"""Running the handlers of knuto in several worker processes.
+
+One kopf process runs its handlers on a single core. With `knuto --workers N`, the source
+namespaces are split between N worker processes instead, each running `knuto` with its share of
+the namespaces and its own event loop. Each worker also watches the Strimzi namespace, and only
+handles the Secrets of KafkaUsers from its own namespaces.
+
+The supervisor serves the metrics of all workers on --metrics-port, through the multiprocess
+mode of prometheus_client, and the liveness endpoint, which is healthy while all workers are.
+When a worker exits, the others are stopped as well, so that the pod is restarted.
+"""
+import http.server
+import logging
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from argparse import ArgumentParser
+from urllib.parse import urlparse
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+MULTIPROCESS_DIRECTORY_VARIABLES = [
+    "PROMETHEUS_MULTIPROC_DIR",
+    "prometheus_multiproc_dir",
+]
+
+
+def _workers_arguments():
+    program_args = ArgumentParser(add_help=False, allow_abbrev=False)
+    program_args.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Split the source namespaces between this many worker processes.",
+    )
+
+    return program_args
+
+
+def _supervisor_arguments():
+    program_args = ArgumentParser(
+        parents=[_workers_arguments()], add_help=False, allow_abbrev=False
+    )
+    program_args.add_argument("--metrics-port", type=int)
+    program_args.add_argument("--liveness-endpoint")
+    program_args.add_argument(
+        "--kafka-user-topic-source-namespace", action="append", default=[]
+    )
+
+    return program_args
+
+
+def split_namespaces(namespaces, workers):
+    """The namespaces of each worker, at most workers of them, dealt out in sorted order"""
+    shares = [sorted(namespaces)[i::workers] for i in range(workers)]
+    return [share for share in shares if share]
+
+
+def worker_liveness_endpoint(liveness_endpoint, index):
+    url = urlparse(liveness_endpoint)
+    return f"http://127.0.0.1:{url.port + 1 + index}{url.path}"
+
+
+def worker_arguments(remaining_args, namespaces, liveness_endpoint=None):
+    """The arguments of a worker, options first as remaining_args may end with -- NS"""
+    args = []
+    for namespace in namespaces:
+        args += ["--kafka-user-topic-source-namespace", namespace]
+    if liveness_endpoint is not None:
+        args += ["--liveness-endpoint", liveness_endpoint]
+    return args + list(remaining_args)
+
+
+class Supervisor:
+    def __init__(
+        self, shares, remaining_args, *, liveness_endpoint=None, metrics_port=None
+    ):
+        self.shares = shares
+        self.remaining_args = remaining_args
+        self.liveness_endpoint = liveness_endpoint
+        self.metrics_port = metrics_port
+        self.metrics_directory = tempfile.mkdtemp(prefix="knuto-metrics-")
+        self.processes = []
+
+    def _worker_endpoints(self):
+        if self.liveness_endpoint is None:
+            return [None] * len(self.shares)
+        return [
+            worker_liveness_endpoint(self.liveness_endpoint, index)
+            for index in range(len(self.shares))
+        ]
+
+    def start(self):
+        env = dict(os.environ)
+        for variable in MULTIPROCESS_DIRECTORY_VARIABLES:
+            env[variable] = self.metrics_directory
+
+        for namespaces, endpoint in zip(self.shares, self._worker_endpoints()):
+            logger.info(f"Starting a worker for {', '.join(namespaces)}")
+            self.processes.append(
+                subprocess.Popen(
+                    [sys.executable, "-m", "knuto.combined"]
+                    + worker_arguments(self.remaining_args, namespaces, endpoint),
+                    env=env,
+                )
+            )
+
+        if self.metrics_port is not None:
+            metrics.start_multiprocess_metrics_server(
+                self.metrics_port, self.metrics_directory
+            )
+        if self.liveness_endpoint is not None:
+            self._serve_liveness()
+
+    def unhealthy_workers(self):
+        unhealthy = []
+        for process, endpoint in zip(self.processes, self._worker_endpoints()):
+            if process.poll() is not None:
+                unhealthy.append(f"worker {process.pid} exited")
+                continue
+            try:
+                with urllib.request.urlopen(endpoint, timeout=5):
+                    pass
+            except (urllib.error.URLError, OSError) as e:
+                unhealthy.append(f"worker {process.pid}: {e}")
+        return unhealthy
+
+    def _serve_liveness(self):
+        supervisor = self
+
+        class LivenessHandler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                unhealthy = supervisor.unhealthy_workers()
+                self.send_response(500 if unhealthy else 200)
+                self.send_header("Content-Type", "text/plain")
+                self.end_headers()
+                self.wfile.write("\n".join(unhealthy or ["ok"]).encode("utf-8"))
+
+            def log_message(self, format, *args):
+                pass
+
+        url = urlparse(self.liveness_endpoint)
+        server = http.server.ThreadingHTTPServer(
+            (url.hostname or "0.0.0.0", url.port), LivenessHandler
+        )
+        threading.Thread(
+            target=server.serve_forever, name="knuto-liveness", daemon=True
+        ).start()
+
+    def stop(self, signum=signal.SIGTERM):
+        for process in self.processes:
+            if process.poll() is None:
+                process.send_signal(signum)
+
+    def wait(self):
+        """Wait until a worker exits, stop the others, and return its exit code"""
+        while True:
+            for process in self.processes:
+                returncode = process.poll()
+                if returncode is not None:
+                    logger.error(f"Worker {process.pid} exited with {returncode}")
+                    self.stop()
+                    for other in self.processes:
+                        other.wait()
+                        metrics.mark_process_dead(other.pid, self.metrics_directory)
+                    return returncode
+            time.sleep(1)
+
+
+def run_supervisor(args, remaining_args):
+    logging.basicConfig(level=logging.INFO)
+
+    shares = split_namespaces(args.kafka_user_topic_source_namespace, args.workers)
+    supervisor = Supervisor(
+        shares,
+        remaining_args,
+        liveness_endpoint=args.liveness_endpoint,
+        metrics_port=args.metrics_port,
+    )
+    signal.signal(signal.SIGTERM, lambda signum, frame: supervisor.stop(signum))
+    signal.signal(signal.SIGINT, lambda signum, frame: supervisor.stop(signum))
+
+    supervisor.start()
+    sys.exit(supervisor.wait())
@@ -0,0 +1,99 @@
+"""Removal of all copies from a source namespace that is being deleted.
+
+Every copy is labelled with the namespace it was copied from. When the first delete handler
+runs for an object in a namespace that is terminating, all copies from that namespace are
+deleted with one deletecollection request per kind, and the delete handlers of the other
+objects in the namespace have nothing left to do. Copies written before the label was added
+are found by their source annotation and deleted one by one.
+"""
+import threading
+import time
+
+from pykube import Namespace, object_factory
+from pykube.exceptions import ObjectDoesNotExist
+
+from .cache import SOURCE_ANNOTATION
+from .config import state
+from .utils import _list_paged
+
+SOURCE_NAMESPACE_LABEL = "knuto.niradynamics.se/source-namespace"
+
+
+class NamespaceTeardown:
+    def __init__(self, recheck_after=10):
+        self.recheck_after = recheck_after
+        self._lock = threading.Lock()
+        self._torn_down = set()
+        self._active = {}
+
+    def _is_terminating(self, namespace):
+        checked = self._active.get(namespace)
+        if checked is not None and time.monotonic() - checked < self.recheck_after:
+            return False
+
+        try:
+            ns = Namespace.objects(state.api).get_by_name(namespace)
+        except ObjectDoesNotExist:
+            return True
+
+        if ns.obj.get("status", {}).get("phase") == "Terminating" or ns.metadata.get(
+            "deletionTimestamp"
+        ):
+            return True
+
+        self._active[namespace] = time.monotonic()
+        return False
+
+    def torn_down(self, namespace, kinds, destination_namespace, logger):
+        """
+        True if namespace is being deleted and all copies of kinds, a list of
+        (api_version, kind), from it have been deleted, either now or by an earlier call.
+        """
+        with self._lock:
+            if namespace in self._torn_down:
+                return True
+
+            if not self._is_terminating(namespace):
+                return False
+
+            for api_version, kind in kinds:
+                logger.info(
+                    f"Namespace {namespace} is terminating, deleting all {kind} copies "
+                    f"from it in {destination_namespace}"
+                )
+                delete_copies(
+                    object_factory(state.api, api_version, kind),
+                    destination_namespace,
+                    namespace,
+                )
+
+            self._torn_down.add(namespace)
+
+            return True
+
+    def forget(self, namespace):
+        """Let a namespace that is created again be torn down again"""
+        with self._lock:
+            self._torn_down.discard(namespace)
+
+
+def delete_copies(api_object_class, destination_namespace, source_namespace):
+    r = state.api.delete(
+        version=api_object_class.version,
+        namespace=destination_namespace,
+        url=api_object_class.endpoint,
+        params={"labelSelector": f"{SOURCE_NAMESPACE_LABEL}={source_namespace}"},
+    )
+    state.api.raise_for_status(r)
+
+    # Copies written before they were labelled are found by their source annotation
+    source_prefix = f"{source_namespace}/"
+    for copy in _list_paged(
+        api_object_class.objects(state.api).filter(namespace=destination_namespace),
+        500,
+    ):
+        if copy.annotations.get(SOURCE_ANNOTATION, "").startswith(source_prefix):
+            copy.delete()
+
+
+namespace_teardown = NamespaceTeardown()
@@ -0,0 +1,120 @@
+"""Keystores and truststores for TLS-authenticated KafkaUsers.
+
+Strimzi puts the user certificate and key of a TLS KafkaUser in its Secret, together with a
+PKCS12 keystore (user.p12 and user.password), and the cluster CA in the Secret
+<cluster>-cluster-ca-cert, with a PKCS12 truststore (ca.p12 and ca.password). The stores are
+reused as they are. Only for Secrets without user.p12 is a keystore built from user.crt and
+user.key, which needs cryptography (the "tls" extra).
+
+Everything rendered for a user is cached by the fingerprint of its certificate, key and
+cluster CA, so that the frequent update events of Secrets do not rebuild keystores, and a
+new keystore is only built when a certificate is rotated.
+"""
+import base64
+import hashlib
+import secrets
+import threading
+from collections import OrderedDict
+
+try:
+    from cryptography import x509
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.serialization import pkcs12
+except ImportError:  # pragma: no cover - depends on the installed extras
+    pkcs12 = None
+
+from . import metrics
+
+keystore_builds = metrics.counter(
+    "knuto_tls_keystore_builds_total", "Client keystores rendered, by cache result", ["result"]
+)
+
+
+class KeystoreUnavailable(Exception):
+    pass
+
+
+def fingerprint(user_data, cluster_ca_data):
+    digest = hashlib.sha256()
+    for value in [
+        user_data.get("user.crt"),
+        user_data.get("user.key"),
+        user_data.get("user.p12"),
+        cluster_ca_data.get("ca.crt"),
+        cluster_ca_data.get("ca.p12"),
+    ]:
+        digest.update((value or "").encode("ascii"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _build_keystore(user_data):
+    if pkcs12 is None:
+        raise KeystoreUnavailable(
+            "Secret has no user.p12, and cryptography is not installed to build one"
+        )
+
+    certificate = x509.load_pem_x509_certificate(
+        base64.b64decode(user_data["user.crt"])
+    )
+    key = serialization.load_pem_private_key(
+        base64.b64decode(user_data["user.key"]), password=None
+    )
+    password = secrets.token_urlsafe(24)
+    keystore = pkcs12.serialize_key_and_certificates(
+        b"user",
+        key,
+        certificate,
+        None,
+        serialization.BestAvailableEncryption(password.encode("ascii")),
+    )
+
+    return (
+        base64.b64encode(keystore).decode("ascii"),
+        base64.b64encode(password.encode("ascii")).decode("ascii"),
+    )
+
+
+class KeystoreCache:
+    """Rendered keystore and truststore data by fingerprint, keeping the most recent"""
+
+    def __init__(self, max_size=4096):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def client_data(self, user_data, cluster_ca_data):
+        """
+        The Secret data entries, base64 encoded, of the keystore (user.p12 and
+        user.password) and truststore (truststore.p12, truststore.password and
+        cluster-ca.crt) of a user.
+        """
+        key = fingerprint(user_data, cluster_ca_data)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                keystore_builds.labels("hit").inc()
+                return dict(self._entries[key])
+
+        if "user.p12" in user_data:
+            keystore = (user_data["user.p12"], user_data["user.password"])
+        else:
+            keystore = _build_keystore(user_data)
+        keystore_builds.labels("miss").inc()
+
+        data = {
+            "user.p12": keystore[0],
+            "user.password": keystore[1],
+            "truststore.p12": cluster_ca_data["ca.p12"],
+            "truststore.password": cluster_ca_data["ca.password"],
+            "cluster-ca.crt": cluster_ca_data["ca.crt"],
+        }
+        with self._lock:
+            self._entries[key] = data
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+        return dict(data)
+
+
+keystore_cache = KeystoreCache()
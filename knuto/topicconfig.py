@@ -0,0 +1,117 @@
+"""Per-namespace defaults and ranges for the spec of KafkaTopic copies.
+
+With --kafkatopic-config-default, the copies get the config values their source does not
+set, e.g. compression.type=zstd. With --kafkatopic-config-range, numeric config values,
+and partitions and replicas, outside the range are clamped to it, except that partitions
+are never clamped below those of a copy that already exists, as Kafka cannot remove
+partitions. Both take an optional NAMESPACE/ prefix, and the settings of a namespace
+override those for all namespaces. What was changed is recorded on the copy in the
+knuto.niradynamics.se/adjusted annotation.
+"""
+ADJUSTED_ANNOTATION = "knuto.niradynamics.se/adjusted"
+SPEC_FIELDS = ["partitions", "replicas"]
+
+
+def _value(text):
+    try:
+        return int(text)
+    except ValueError:
+        return text
+
+
+def _namespaced_key_value(text, form):
+    key, separator, value = text.partition("=")
+    namespace, _, key = key.rpartition("/")
+    if not separator or not key:
+        raise ValueError(f"{text} is not on the form {form}")
+    return namespace or None, key, value
+
+
+def config_default_argument(text):
+    """Parse [NAMESPACE/]KEY=VALUE into (NAMESPACE, KEY, VALUE), with VALUE an int if it
+    is one"""
+    namespace, key, value = _namespaced_key_value(text, "[NAMESPACE/]KEY=VALUE")
+    return namespace, key, _value(value)
+
+
+def config_range_argument(text):
+    """Parse [NAMESPACE/]KEY=MIN:MAX into (NAMESPACE, KEY, (MIN, MAX)), where either
+    bound may be left out"""
+    namespace, key, value = _namespaced_key_value(text, "[NAMESPACE/]KEY=MIN:MAX")
+    minimum, separator, maximum = value.partition(":")
+    if not separator or not (minimum or maximum):
+        raise ValueError(f"{value} is not on the form MIN:MAX, MIN: or :MAX")
+    minimum = int(minimum) if minimum else None
+    maximum = int(maximum) if maximum else None
+    if minimum is not None and maximum is not None and minimum > maximum:
+        raise ValueError(f"{value} has a minimum above its maximum")
+    return namespace, key, (minimum, maximum)
+
+
+def namespace_settings(settings, namespace):
+    """The settings of namespace, over those for all namespaces"""
+    return dict(settings.get(None, {}), **settings.get(namespace, {}))
+
+
+def _clamp(value, minimum, maximum):
+    if isinstance(value, bool):
+        return value
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        return value
+
+    if minimum is not None and number < minimum:
+        return minimum
+    if maximum is not None and number > maximum:
+        return maximum
+    return value
+
+
+def partitions_maximum(ranges, current_partitions):
+    """
+    The maximum of the partitions range, but never below current_partitions, the
+    partitions of a copy that already exists, as Kafka cannot remove partitions
+    """
+    _, maximum = ranges.get("partitions", (None, None))
+    if maximum is None or current_partitions is None:
+        return maximum
+    return max(maximum, current_partitions)
+
+
+def adjust_spec(spec, defaults, ranges, *, current_partitions=None):
+    """
+    The spec of a KafkaTopic copy, with defaults for what spec does not set and the
+    values outside ranges clamped, and the changes made. The changes map each changed
+    key to its value in spec ("from", None if not set) and in the copy ("to"). The keys
+    are those of spec.config, and partitions and replicas for the fields of spec.
+    current_partitions are the partitions of the copy if it exists, which partitions
+    are not clamped below.
+    """
+    spec = dict(spec)
+    config = dict(spec.get("config") or {})
+    changes = {}
+
+    def target(key):
+        return spec if key in SPEC_FIELDS else config
+
+    for key, value in defaults.items():
+        if key not in target(key):
+            target(key)[key] = value
+            changes[key] = {"from": None, "to": value}
+
+    for key, (minimum, maximum) in ranges.items():
+        if key not in target(key):
+            continue
+        if key == "partitions":
+            maximum = partitions_maximum(ranges, current_partitions)
+        value = target(key)[key]
+        clamped = _clamp(value, minimum, maximum)
+        if clamped != value:
+            target(key)[key] = clamped
+            original = changes.get(key, {"from": value})["from"]
+            changes[key] = {"from": original, "to": clamped}
+
+    if config:
+        spec["config"] = config
+    return spec, changes
@@ -0,0 +1,208 @@
+"""Replication lag tracking from a source KafkaUser/KafkaTopic to the delivered kafka-config Secret.
+
+knuto-kafka-user-topic stamps a trace id and the source and copy timestamps on the copies it
+writes. For KafkaUsers whose spec changes, the same annotations are put in spec.template.secret,
+so that Strimzi carries them over to the user Secret, where knuto-secrets picks them up and
+stamps the delivery. Each trace is observed once.
+The lag of each stage is exported as a histogram, and as OpenTelemetry spans if
+opentelemetry-api is installed.
+
+The stages span two knuto processes and Strimzi, so the lags are only as exact as the clocks of
+the nodes are in sync.
+"""
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from . import codec, metrics
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+TRACE_ID_ANNOTATION = "knuto.niradynamics.se/trace-id"
+SOURCE_TIMESTAMP_ANNOTATION = "knuto.niradynamics.se/source-timestamp"
+COPIED_TIMESTAMP_ANNOTATION = "knuto.niradynamics.se/copied-timestamp"
+DELIVERED_TIMESTAMP_ANNOTATION = "knuto.niradynamics.se/delivered-timestamp"
+
+TRACE_ANNOTATIONS = [
+    TRACE_ID_ANNOTATION,
+    SOURCE_TIMESTAMP_ANNOTATION,
+    COPIED_TIMESTAMP_ANNOTATION,
+    DELIVERED_TIMESTAMP_ANNOTATION,
+]
+
+# How many trace ids of delivered Secrets are remembered, to observe each delivery once
+MAX_DELIVERED_TRACES = 10000
+
+replication_lag = metrics.histogram(
+    "knuto_replication_lag_seconds",
+    "Time spent in each replication stage: copy (source to Strimzi namespace), "
+    "strimzi (copy to Strimzi secret), secret (Strimzi secret to kafka-config secret) "
+    "and total.",
+    ["kind", "stage"],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+
+
+def _parse_timestamp(timestamp):
+    return (
+        datetime.strptime(timestamp, "%Y-%m-%dT%H:%M:%SZ")
+        .replace(tzinfo=timezone.utc)
+        .timestamp()
+    )
+
+
+def last_write_time(metadata):
+    """Best guess of when an object was last written, as seconds since the epoch"""
+    timestamps = [
+        _parse_timestamp(entry["time"])
+        for entry in metadata.get("managedFields") or []
+        if entry.get("time")
+    ]
+    if metadata.get("creationTimestamp"):
+        timestamps.append(_parse_timestamp(metadata["creationTimestamp"]))
+
+    return max(timestamps) if timestamps else time.time()
+
+
+def without_trace_annotations(obj):
+    """A clone of obj without the trace annotations, in its metadata and, for
+    KafkaUsers, in spec.template.secret.metadata"""
+    obj = codec.clone(obj)
+    secret_metadata = (
+        obj.get("spec", {}).get("template", {}).get("secret", {}).get("metadata", {})
+    )
+    for metadata in [obj.get("metadata", {}), secret_metadata]:
+        annotations = metadata.get("annotations") or {}
+        for annotation in TRACE_ANNOTATIONS:
+            annotations.pop(annotation, None)
+
+    return obj
+
+
+def _without_empty_mappings(value):
+    if not isinstance(value, dict):
+        return value
+
+    pruned = {key: _without_empty_mappings(item) for key, item in value.items()}
+    return {key: item for key, item in pruned.items() if item != {}}
+
+
+def untraced_spec(obj):
+    """The spec of obj, without the trace annotations and the mappings left empty"""
+    return _without_empty_mappings(without_trace_annotations(obj).get("spec", {}))
+
+
+def _secret_template_annotations(obj):
+    return (
+        obj.get("spec", {})
+        .get("template", {})
+        .get("secret", {})
+        .get("metadata", {})
+        .get("annotations", {})
+    )
+
+
+def stamp_copy(source_body, copy, current=None):
+    """
+    Stamp the trace annotations on copy, and for KafkaUsers in spec.template.secret.
+    As Strimzi rewrites the user Secret whenever the spec changes, a KafkaUser with the
+    same spec as current, the copy in the cluster, keeps the stamps of current's spec.
+    """
+    trace_id = uuid.uuid4().hex
+    source_timestamp = last_write_time(source_body["metadata"])
+    copied_timestamp = time.time()
+
+    annotations = {
+        TRACE_ID_ANNOTATION: trace_id,
+        SOURCE_TIMESTAMP_ANNOTATION: f"{source_timestamp:.3f}",
+        COPIED_TIMESTAMP_ANNOTATION: f"{copied_timestamp:.3f}",
+    }
+    copy.annotations.update(annotations)
+
+    if copy.kind == "KafkaUser":
+        secret_annotations = annotations
+        if current is not None and untraced_spec(current.obj) == untraced_spec(
+            copy.obj
+        ):
+            current_annotations = _secret_template_annotations(current.obj)
+            secret_annotations = {
+                key: value
+                for key, value in current_annotations.items()
+                if key in TRACE_ANNOTATIONS
+            }
+
+        if secret_annotations:
+            template = copy.obj["spec"].setdefault("template", {})
+            secret = template.setdefault("secret", {})
+            secret_metadata = secret.setdefault("metadata", {})
+            secret_metadata.setdefault("annotations", {}).update(secret_annotations)
+
+    _observe(copy.kind, "copy", trace_id, source_timestamp, copied_timestamp)
+
+
+def stamp_delivery(new_secret):
+    if TRACE_ID_ANNOTATION in new_secret.annotations:
+        new_secret.annotations[DELIVERED_TIMESTAMP_ANNOTATION] = f"{time.time():.3f}"
+
+
+_delivered_traces = OrderedDict()
+_delivered_traces_lock = threading.Lock()
+
+
+def _first_delivery(trace_id):
+    """True the first time trace_id is delivered, as Strimzi may update the Secret again
+    without a new trace"""
+    with _delivered_traces_lock:
+        if trace_id in _delivered_traces:
+            return False
+
+        _delivered_traces[trace_id] = True
+        if len(_delivered_traces) > MAX_DELIVERED_TRACES:
+            _delivered_traces.popitem(last=False)
+        return True
+
+
+def observe_delivery(strimzi_secret_body, new_secret):
+    annotations = new_secret.annotations
+    if DELIVERED_TIMESTAMP_ANNOTATION not in annotations:
+        return
+
+    trace_id = annotations[TRACE_ID_ANNOTATION]
+    if not _first_delivery(trace_id):
+        return
+
+    source_timestamp = float(annotations[SOURCE_TIMESTAMP_ANNOTATION])
+    copied_timestamp = float(annotations[COPIED_TIMESTAMP_ANNOTATION])
+    strimzi_timestamp = last_write_time(strimzi_secret_body["metadata"])
+    delivered_timestamp = time.time()
+
+    _observe("KafkaUser", "strimzi", trace_id, copied_timestamp, strimzi_timestamp)
+    _observe("KafkaUser", "secret", trace_id, strimzi_timestamp, delivered_timestamp)
+    _observe("KafkaUser", "total", trace_id, source_timestamp, delivered_timestamp)
+
+
+def _observe(kind, stage, trace_id, start, end):
+    replication_lag.labels(kind, stage).observe(max(end - start, 0))
+
+    if otel_trace is None:
+        return
+
+    parent = otel_trace.SpanContext(
+        trace_id=int(trace_id, 16),
+        span_id=random.getrandbits(64),
+        is_remote=True,
+        trace_flags=otel_trace.TraceFlags(otel_trace.TraceFlags.SAMPLED),
+    )
+    span = otel_trace.get_tracer(__name__).start_span(
+        f"knuto.{stage}",
+        context=otel_trace.set_span_in_context(otel_trace.NonRecordingSpan(parent)),
+        start_time=int(start * 1e9),
+        attributes={"knuto.kind": kind, "knuto.stage": stage},
+    )
+    span.end(end_time=int(end * 1e9))
@@ -2,7 +2,7 @@ import argparse
 import asyncio
 import inspect
 import os
-from copy import deepcopy
+import tempfile
 from typing import Mapping
 
 import pykube
@@ -10,18 +10,24 @@ import kopf
 
 import logging
 
+from . import codec, metrics, strimzi
+from .contenthash import CONTENT_HASH_ANNOTATION, stamp_content_hash
 from .config import globalconf, state
+from .events import EVENT_LEVELS
+from .profiling import install_signal_handler, profiled
+from .scheduling import key_value
 
 logger = logging.getLogger(__name__)
 
 
+@profiled
 def _copy_object(obj: Mapping):
     """
     Performs a deep copy of a Mapping.
     Converts to a basic dict to avoid problems with kopf Body mapping type.
     Pykube expects json-serializable types, i.e. basic types.
     """
-    new_obj = deepcopy(dict(obj))
+    new_obj = codec.clone(obj)
     for key in [
         "resourceVersion",
         "selfLink",
@@ -37,32 +43,159 @@ def _copy_object(obj: Mapping):
     return new_obj
 
 
-def run_kopf(namespace):
+def run_kopf(namespaces, liveness_endpoint=None):
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
 
-    loop.run_until_complete(kopf.operator(standalone=True, namespace=namespace))
+    loop.run_until_complete(
+        kopf.operator(
+            standalone=True,
+            namespaces=namespaces,
+            liveness_endpoint=liveness_endpoint,
+        )
+    )
 
 
 script_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
 
 
 # This script dir is used from multiple functions
-def default_main(program_argparsers):
+def default_main(program_argparsers, *, watch_source_namespaces=False, combined=False):
+    """
+    Parse the arguments and run the handlers imported by the caller. With combined, both
+    the secrets and the KafkaUser/KafkaTopic handlers run, namespace is the Strimzi
+    namespace the copies are written to, and the source namespaces are watched as well.
+    """
     argparser = argparse.ArgumentParser(parents=program_argparsers, add_help=False)
     argparser.add_argument("--verbose", "-v", default=False, action="store_true")
+    argparser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Serve Prometheus metrics on this port (requires prometheus_client).",
+    )
+    argparser.add_argument(
+        "--skip-unchanged-writes",
+        default=False,
+        action="store_true",
+        help="Annotate written objects with a hash of their content, and skip writing "
+        "an object that has the hash of what would be written in the cluster.",
+    )
+    argparser.add_argument(
+        "--profile-seconds",
+        type=float,
+        default=30,
+        help="For how long to profile when SIGUSR2 is received.",
+    )
+    argparser.add_argument(
+        "--profile-dir",
+        default=tempfile.gettempdir(),
+        help="Directory to write profiles to.",
+    )
+    argparser.add_argument(
+        "--liveness-endpoint",
+        help="Serve the health of knuto and its watches at this URL, "
+        "e.g. http://0.0.0.0:8080/healthz.",
+    )
+    argparser.add_argument(
+        "--watch-timeout",
+        type=int,
+        help="Have the API server close each watch after this many seconds, after which "
+        "it is resumed from the last seen resourceVersion.",
+    )
+    argparser.add_argument(
+        "--watch-check-interval",
+        type=int,
+        help="Every this many seconds, list the watched objects to check that the "
+        "watches have not missed any changes.",
+    )
+    argparser.add_argument(
+        "--watch-stale-after",
+        type=int,
+        default=300,
+        help="Consider a watch stale when it has missed a change for this many seconds.",
+    )
+    argparser.add_argument(
+        "--handler-threads",
+        type=int,
+        help="Run the handlers on this many threads, by priority and namespace weight.",
+    )
+    argparser.add_argument(
+        "--namespace-weight",
+        type=lambda text: key_value(text, float),
+        action="append",
+        default=[],
+        help="NAMESPACE=WEIGHT, the share of the handler threads given to objects in "
+        "NAMESPACE relative to other namespaces (default 1). Requires --handler-threads.",
+    )
+    argparser.add_argument(
+        "--handler-priority",
+        type=lambda text: key_value(text, int),
+        action="append",
+        default=[],
+        help="REASON=PRIORITY, where REASON is create, update, delete, resume or event. "
+        "Handlers with lower priorities run first. Requires --handler-threads.",
+    )
+    argparser.add_argument(
+        "--event-window",
+        type=float,
+        help="Post at most one Kubernetes Event per object and log level every this "
+        "many seconds.",
+    )
+    argparser.add_argument(
+        "--events-per-namespace",
+        type=int,
+        help="Post at most this many Kubernetes Events per namespace every "
+        "--event-window seconds.",
+    )
+    argparser.add_argument(
+        "--event-level",
+        choices=sorted(EVENT_LEVELS),
+        help="Lowest level of log messages posted as Kubernetes Events.",
+    )
     argparser.add_argument("namespace", help="Namespace to watch for changes")
 
     args = argparser.parse_args()
+    globalconf.metrics_port = args.metrics_port
+    globalconf.skip_unchanged_writes = args.skip_unchanged_writes
+    globalconf.watch_timeout = args.watch_timeout
+    globalconf.watch_check_interval = args.watch_check_interval
+    globalconf.watch_stale_after = args.watch_stale_after
+    globalconf.handler_threads = args.handler_threads
+    globalconf.event_window = args.event_window
+    globalconf.events_per_namespace = args.events_per_namespace
+    globalconf.event_level = args.event_level
+    globalconf.namespace_weights = dict(args.namespace_weight)
+    globalconf.handler_priorities = dict(args.handler_priority)
 
     kopf.configure(verbose=args.verbose)
 
     print(f"globalconf: {globalconf.current_values()}")
 
+    if globalconf.metrics_port is not None:
+        metrics.start_metrics_server(globalconf.metrics_port)
+
+    install_signal_handler(args.profile_seconds, args.profile_dir)
+
     kopf.login_via_pykube(logger=logger)
     state.api = pykube.HTTPClient(_get_pykube_config())
+    globalconf.strimzi_version = strimzi.discover_version(state.api)
+    logger.info(f"Using {strimzi.api_version()}")
+    state.namespace = args.namespace
+    if combined:
+        state.combined = True
+        globalconf.kafka_user_topic_destination_namespace = args.namespace
+        watch_source_namespaces = True
+
+    namespaces = [args.namespace]
+    if watch_source_namespaces:
+        namespaces += sorted(globalconf.kafka_user_topic_source_namespaces)
+    if (
+        globalconf.watch_copies
+        and globalconf.kafka_user_topic_destination_namespace not in namespaces
+    ):
+        namespaces.append(globalconf.kafka_user_topic_destination_namespace)
 
-    run_kopf(args.namespace)
+    run_kopf(namespaces, liveness_endpoint=args.liveness_endpoint)
 
 
 def _get_pykube_config():
@@ -76,8 +209,69 @@ def _get_pykube_config():
     return config
 
 
+def _list_paged(query, page_size, *, on_page=None, headers=None):
+    """
+    Iterate over the objects matched by a pykube query, fetching at most page_size objects
+    per request. on_page is called before each request.
+    """
+    for objects, _ in _list_pages(query, page_size, on_page=on_page, headers=headers):
+        yield from objects
+
+
+def _list_pages(query, page_size, *, token=None, on_page=None, headers=None):
+    """
+    Iterate over the pages of objects matched by a pykube query, as (objects, token)
+    where token continues the listing after the page, or is None after the last page.
+    The listing starts from token if given. on_page is called before each request.
+    """
+    kwargs = {} if headers is None else {"headers": headers}
+    while True:
+        params = {"limit": page_size}
+        if token is not None:
+            params["continue"] = token
+        if on_page is not None:
+            on_page()
+
+        response = codec.loads(query.execute(params=params, **kwargs).content)
+        objects = []
+        for obj in response.get("items") or []:
+            obj.setdefault("apiVersion", query.api_obj_class.version)
+            obj.setdefault("kind", query.api_obj_class.kind)
+            objects.append(query.api_obj_class(query.api, obj))
+
+        token = response.get("metadata", {}).get("continue") or None
+        yield objects, token
+        if token is None:
+            return
+
+
+def _content_hash_of(response):
+    return (response.json()["metadata"].get("annotations") or {}).get(
+        CONTENT_HASH_ANNOTATION
+    )
+
+
+def _stamp_content_hash(obj):
+    """With --skip-unchanged-writes, annotate obj with the hash of its content, and return
+    the hash"""
+    if not globalconf.skip_unchanged_writes:
+        return None
+    return stamp_content_hash(obj)
+
+
+@profiled
 def _update_or_create(obj):
-    if obj.exists():
+    digest = _stamp_content_hash(obj)
+
+    live = obj.api.get(**obj.api_kwargs())
+    if live.status_code not in {200, 404}:
+        obj.api.raise_for_status(live)
+
+    if live.ok and digest is not None and _content_hash_of(live) == digest:
+        logger.info("Object %s unchanged since last written" % repr(obj))
+        return
+
+    if live.ok:
         logger.info("Update object %s" % repr(obj))
         obj.update()
     else:
@@ -0,0 +1,179 @@
+"""Health of the watch streams.
+
+kopf resumes a watch from the last seen resourceVersion when the connection is closed, and
+only lists again if that version is too old. --watch-timeout makes the API server close
+each watch after that many seconds, and knuto gives up on a stream that has not been closed
+a minute after that, so a stalled stream is resumed rather than waited on forever.
+
+To notice a stream that has silently stopped delivering events, the watch event handlers
+record the resourceVersion of every object they see. Every --watch-check-interval seconds,
+the watched objects are listed, and an object whose resourceVersion has not been seen
+although it was written more than --watch-stale-after seconds ago marks the watch as stale.
+A stale watch makes the probe of the liveness endpoint fail, and the pod is restarted.
+"""
+import threading
+import time
+
+import kopf
+from pykube import object_factory
+
+from . import metrics
+from .config import globalconf, state
+from .tracing import last_write_time
+from .utils import _list_paged
+
+stale_watches = metrics.gauge(
+    "knuto_stale_watches", "Watched kinds that have missed events", ["kind"]
+)
+
+
+class WatchHealth:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._last_event = {}
+        self._stale = {}
+
+    def observe(self, kind, event_type, body):
+        metadata = body["metadata"]
+        key = (kind, metadata["namespace"], metadata["name"])
+
+        with self._lock:
+            self._last_event[kind] = time.time()
+            if event_type == "DELETED":
+                self._versions.pop(key, None)
+            else:
+                self._versions[key] = metadata.get("resourceVersion")
+
+    def check(self, kind, objects, stale_after):
+        """
+        Compare freshly listed objects of kind with what the watch has delivered, and
+        return the namespace/name of objects the watch has missed for more than stale_after
+        seconds.
+        """
+        now = time.time()
+        missed = []
+        with self._lock:
+            for obj in objects:
+                metadata = obj.obj["metadata"]
+                key = (kind, metadata["namespace"], metadata["name"])
+                if self._versions.get(key) == metadata.get("resourceVersion"):
+                    continue
+                if now - last_write_time(metadata) > stale_after:
+                    missed.append(f"{metadata['namespace']}/{metadata['name']}")
+
+            self._stale[kind] = missed
+        stale_watches.labels(kind).set(1 if missed else 0)
+
+        return missed
+
+    def report(self):
+        with self._lock:
+            now = time.time()
+            return {
+                kind: {
+                    "seconds_since_last_event": round(now - last_event, 1),
+                    "missed": len(self._stale.get(kind, [])),
+                }
+                for kind, last_event in self._last_event.items()
+            }
+
+    def stale_kinds(self):
+        with self._lock:
+            return [kind for kind, missed in self._stale.items() if missed]
+
+
+watch_health = WatchHealth()
+
+
+class WatchChecker:
+    """kinds is a list of (api_version, kind, namespaces, selector) to list and check"""
+
+    def __init__(self, kinds, logger, *, interval, stale_after, page_size=500):
+        self.kinds = kinds
+        self.logger = logger
+        self.interval = interval
+        self.stale_after = stale_after
+        self.page_size = page_size
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="knuto-watch-checker", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                self.logger.error(f"Checking the watches failed: {e}")
+
+    def check(self):
+        listed = {}
+        for api_version, kind, namespaces, selector in self.kinds:
+            api_object_class = object_factory(state.api, api_version, kind)
+            objects = listed.setdefault(kind, [])
+            for namespace in namespaces:
+                query = api_object_class.objects(state.api).filter(
+                    namespace=namespace, selector=selector
+                )
+                objects.extend(_list_paged(query, self.page_size))
+
+        for kind, objects in listed.items():
+            missed = watch_health.check(kind, objects, self.stale_after)
+            if missed:
+                self.logger.error(
+                    f"The {kind} watch has missed changes of {', '.join(missed[:10])}"
+                )
+
+
+def start_watch_checker(kinds, logger):
+    if globalconf.watch_check_interval is None:
+        return
+
+    if state.watch_checker is not None:
+        # Both handler sets are running in one process
+        state.watch_checker.kinds.extend(kinds)
+        return
+
+    state.watch_checker = WatchChecker(
+        kinds,
+        logger,
+        interval=globalconf.watch_check_interval,
+        stale_after=globalconf.watch_stale_after,
+    )
+    logger.info(f"Checking the watches every {globalconf.watch_check_interval}s")
+    state.watch_checker.start()
+
+
+@kopf.on.startup()
+def configure_watching(settings, **_):
+    if globalconf.watch_timeout is None:
+        return
+
+    settings.watching.server_timeout = globalconf.watch_timeout
+    settings.watching.client_timeout = globalconf.watch_timeout + 60
+    settings.watching.connect_timeout = 30
+
+
+@kopf.on.cleanup()
+def stop_watch_checker(**_):
+    if state.watch_checker is not None:
+        state.watch_checker.stop()
+
+
+@kopf.on.probe(id="watches")
+def watches_probe(**_):
+    stale = watch_health.stale_kinds()
+    if stale:
+        raise kopf.PermanentError(f"Watches have missed events: {', '.join(stale)}")
+
+    return watch_health.report()
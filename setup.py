@@ -94,10 +94,7 @@ setup(
         # These classifiers are *not* checked by 'pip install'. See instead
         # 'python_requires' below.
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.5",
-        "Programming Language :: Python :: 3.6",
-        "Programming Language :: Python :: 3.7",
-        "Programming Language :: Python :: 3.8",
+        "Programming Language :: Python :: 3.11",
     ],
     # This field adds keywords for your project which will appear on the
     # project page. What does your project relate to?
@@ -119,14 +116,14 @@ setup(
     # and refuse to install the project if the version does not match. If you
     # do not support Python 2, you can simplify this to '>=3.5' or similar, see
     # https://packaging.python.org/guides/distributing-packages-using-setuptools/#python-requires
-    python_requires=">3.5, <4",
+    python_requires=">=3.11, <4",
     # This field lists other packages that your project depends on to run.
     # Any package you put here will be installed by pip when your project is
     # installed, so they must be valid existing projects.
     #
     # For an analysis of "install_requires" vs pip's requirements files see:
     # https://packaging.python.org/en/latest/requirements.html
-    install_requires=["kopf==1.29.2", "pyhocon", "pykube-ng"],  # Optional
+    install_requires=["kopf==1.45.1", "pyhocon", "pykube-ng"],  # Optional
     # List additional groups of dependencies here (e.g. development
     # dependencies). Users will be able to install these using the "extras"
     # syntax, for example:
@@ -135,7 +132,12 @@ setup(
     #
     # Similar to `install_requires` above, these must be valid existing
     # projects.
-    extras_require={},  # Optional
+    extras_require={
+        "metrics": ["prometheus_client"],
+        "tracing": ["opentelemetry-api"],
+        "fastjson": ["orjson"],
+        "tls": ["cryptography"],
+    },  # Optional
     # If there are data files included in your packages that need to be
     # installed, specify them here.
     #
@@ -154,8 +156,14 @@ setup(
     # executes the function `main` from this package when invoked:
     entry_points={  # Optional
         "console_scripts": [
+            "knuto=knuto.combined:main",
             "knuto-kafka-user-topic=knuto.kafka_user_topic:main",
             "knuto-secrets=knuto.secrets:main",
+            "knuto-regenerate-secrets=knuto.secrets:regenerate_main",
+            "knuto-migrate=knuto.migrate:main",
+            "knuto-record=knuto.recording:main",
+            "knuto-replay=knuto.replay:main",
+            "knuto-status=knuto.status:main",
         ],
     },
     # List additional URLs that are relevant to your project as a dict.
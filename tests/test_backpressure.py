@@ -0,0 +1,56 @@
+from unittest import TestCase
+
+import kopf
+
+from knuto.backpressure import ReadinessTracker, is_ready
+
+
+def _copy(name, ready, generation=1, observed_generation=1):
+    return {
+        "metadata": {"namespace": "kafka", "name": name, "generation": generation},
+        "status": {
+            "observedGeneration": observed_generation,
+            "conditions": [{"type": "Ready", "status": "True" if ready else "False"}],
+        },
+    }
+
+
+class Test_is_ready(TestCase):
+    def test_ready_condition_of_current_generation(self):
+        self.assertTrue(is_ready(_copy("dev-user", True)))
+        self.assertFalse(is_ready(_copy("dev-user", False)))
+        self.assertFalse(is_ready(_copy("dev-user", True, generation=2)))
+        self.assertFalse(is_ready({"metadata": {"generation": 1}}))
+
+
+class Test_ReadinessTracker(TestCase):
+    def test_counts_copies_until_ready_or_deleted(self):
+        now = [100.0]
+        tracker = ReadinessTracker(clock=lambda: now[0])
+
+        tracker.observe("KafkaUser", "ADDED", _copy("dev-a", False))
+        tracker.observe("KafkaUser", "ADDED", _copy("dev-b", False))
+        tracker.observe("KafkaTopic", None, _copy("dev-topic", True))
+        self.assertEqual(tracker.not_ready("KafkaUser"), 2)
+        self.assertEqual(tracker.not_ready("KafkaTopic"), 0)
+
+        tracker.observe("KafkaUser", "MODIFIED", _copy("dev-a", True))
+        tracker.observe("KafkaUser", "DELETED", _copy("dev-b", False))
+        self.assertEqual(tracker.not_ready("KafkaUser"), 0)
+
+    def test_pace_delays_grow_with_not_ready_copies(self):
+        tracker = ReadinessTracker()
+        tracker.pace("KafkaUser", limit=2, max_delay=30)
+
+        for i in range(4):
+            tracker.observe("KafkaUser", "ADDED", _copy(f"dev-{i}", False))
+
+        with self.assertRaises(kopf.TemporaryError) as raised:
+            tracker.pace("KafkaUser", limit=2, max_delay=30)
+        self.assertEqual(raised.exception.delay, 10.0)
+
+        with self.assertRaises(kopf.TemporaryError) as raised:
+            tracker.pace("KafkaUser", limit=1, max_delay=15)
+        self.assertEqual(raised.exception.delay, 15)
+
+        tracker.pace("KafkaTopic", limit=2, max_delay=30)
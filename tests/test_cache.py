@@ -0,0 +1,94 @@
+from unittest import TestCase
+
+from knuto.cache import (
+    DestinationNameCollision,
+    DestinationNameIndex,
+    KafkaUserIndex,
+)
+
+
+def _kafkauser(namespace, name, source=None):
+    annotations = {"knuto.niradynamics.se/source": source} if source else {}
+    return {
+        "apiVersion": "kafka.strimzi.io/v1beta1",
+        "kind": "KafkaUser",
+        "metadata": {
+            "namespace": namespace,
+            "name": name,
+            "uid": f"uid-{name}",
+            "annotations": annotations,
+        },
+        "spec": {"authorization": {"acls": []}},
+    }
+
+
+class Test_KafkaUserIndex(TestCase):
+    def test_lookup_by_name_and_source(self):
+        index = KafkaUserIndex()
+        index.apply(None, _kafkauser("kafka", "ns-test", "ns/test"))
+        index.apply("ADDED", _kafkauser("ns", "test"))
+
+        self.assertEqual(index.get("kafka", "ns-test")["metadata"]["uid"], "uid-ns-test")
+        self.assertNotIn("spec", index.get("kafka", "ns-test"))
+        self.assertEqual(
+            [u["metadata"]["name"] for u in index.by_source("ns/test")], ["ns-test"]
+        )
+        self.assertIsNone(index.get("kafka", "other"))
+
+    def test_modified_and_deleted(self):
+        index = KafkaUserIndex()
+        index.apply("ADDED", _kafkauser("kafka", "ns-test", "ns/test"))
+        index.apply("MODIFIED", _kafkauser("kafka", "ns-test", "ns/renamed"))
+
+        self.assertEqual(index.by_source("ns/test"), [])
+        self.assertEqual(len(index.by_source("ns/renamed")), 1)
+
+        index.apply("DELETED", _kafkauser("kafka", "ns-test", "ns/renamed"))
+
+        self.assertIsNone(index.get("kafka", "ns-test"))
+        self.assertEqual(index.by_source("ns/renamed"), [])
+
+    def test_returned_entries_are_copies(self):
+        index = KafkaUserIndex()
+        index.apply("ADDED", _kafkauser("kafka", "ns-test", "ns/test"))
+
+        index.get("kafka", "ns-test")["metadata"]["annotations"].clear()
+
+        self.assertEqual(len(index.by_source("ns/test")), 1)
+
+
+class Test_DestinationNameIndex(TestCase):
+    def test_namespace_prefix_collision(self):
+        index = DestinationNameIndex()
+        index.claim("KafkaUser", "a-b-c", "a-b/c")
+        index.claim("KafkaUser", "a-b-c", "a-b/c")
+
+        with self.assertRaises(DestinationNameCollision):
+            index.claim("KafkaUser", "a-b-c", "a/b-c")
+        index.claim("KafkaTopic", "a-b-c", "a/b-c")
+        self.assertEqual(index.owner("KafkaUser", "a-b-c"), "a-b/c")
+
+        index.release("KafkaUser", "a-b/c")
+        index.claim("KafkaUser", "a-b-c", "a/b-c")
+        self.assertEqual(index.owner("KafkaUser", "a-b-c"), "a/b-c")
+
+    def test_copies_own_their_name(self):
+        index = DestinationNameIndex()
+        index.claim("KafkaUser", "a-b-c", "a/b-c")
+        index.apply_copy("KafkaUser", None, _kafkauser("kafka", "a-b-c", "a-b/c"))
+        self.assertEqual(index.owner("KafkaUser", "a-b-c"), "a-b/c")
+
+        index.apply_copy("KafkaUser", "DELETED", _kafkauser("kafka", "a-b-c", "a-b/c"))
+        self.assertIsNone(index.owner("KafkaUser", "a-b-c"))
+
+    def test_release_namespace(self):
+        index = DestinationNameIndex()
+        index.claim("KafkaUser", "a-b-c", "a-b/c")
+        index.claim("KafkaTopic", "a-b-topic", "a-b/a-b-topic")
+        index.claim("KafkaUser", "a-user", "a/user")
+
+        index.release_namespace("a-b", ["KafkaUser"])
+
+        self.assertIsNone(index.owner("KafkaUser", "a-b-c"))
+        self.assertEqual(index.owner("KafkaTopic", "a-b-topic"), "a-b/a-b-topic")
+        self.assertEqual(index.owner("KafkaUser", "a-user"), "a/user")
@@ -0,0 +1,52 @@
+import pytest
+
+from knuto.clientprofiles import (
+    PROFILE_ANNOTATION,
+    profile_name,
+    profile_setting_argument,
+    profile_settings,
+    render,
+)
+
+
+def test_arguments():
+    assert profile_setting_argument("bulk-ingest/linger.ms=200") == (
+        "bulk-ingest",
+        "linger.ms",
+        "200",
+    )
+    for text in ["linger.ms=200", "bulk-ingest/linger.ms", "/linger.ms=1"]:
+        with pytest.raises(ValueError):
+            profile_setting_argument(text)
+
+
+def test_settings_knuto_renders_can_not_be_part_of_a_profile():
+    for key in ["bootstrap.servers", "security.protocol", "sasl.mechanism", "ssl.x"]:
+        with pytest.raises(ValueError):
+            profile_setting_argument(f"mine/{key}=x")
+
+
+def test_custom_settings_over_built_in_ones():
+    custom = {"bulk-ingest": {"linger.ms": "200"}, "mine": {"acks": "all"}}
+
+    assert profile_settings("bulk-ingest", custom)["linger.ms"] == "200"
+    assert profile_settings("bulk-ingest", custom)["compression.type"] == "zstd"
+    assert profile_settings("mine", custom) == {"acks": "all"}
+    assert profile_settings("unknown", custom) is None
+
+
+def test_annotation_over_namespace_profile():
+    namespace_profiles = {"dev": "low-latency-consumer"}
+
+    assert profile_name({}, "dev", namespace_profiles) == "low-latency-consumer"
+    assert profile_name(None, "prod", namespace_profiles) is None
+    assert (
+        profile_name({PROFILE_ANNOTATION: "bulk-ingest"}, "dev", namespace_profiles)
+        == "bulk-ingest"
+    )
+
+
+def test_render():
+    assert render("mine", {"acks": "all", "linger.ms": "5"}) == (
+        "# Client profile mine\nacks=all\nlinger.ms=5\n"
+    )
@@ -0,0 +1,26 @@
+from unittest import TestCase
+
+from knuto import codec
+
+
+class Test_clone(TestCase):
+    def test_clone_is_deep(self):
+        obj = {"spec": {"acls": [{"operation": "Read"}]}}
+
+        cloned = codec.clone(obj)
+        cloned["spec"]["acls"][0]["operation"] = "Write"
+
+        self.assertEqual(obj["spec"]["acls"][0]["operation"], "Read")
+
+    def test_non_json_values_are_copied(self):
+        obj = {"data": {"password": b"cGFzcw=="}}
+
+        self.assertEqual(codec.clone(obj), obj)
+
+
+class Test_dumps(TestCase):
+    def test_round_trip(self):
+        obj = {"metadata": {"name": "ns-test", "labels": {"a": "ö"}}, "items": [1, 2.5]}
+
+        self.assertEqual(codec.loads(codec.dumps(obj)), obj)
+        self.assertEqual(codec.loads(codec.dumps(obj).encode("utf-8")), obj)
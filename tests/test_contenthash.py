@@ -0,0 +1,85 @@
+from unittest import TestCase
+from mock import patch, MagicMock
+
+from pykube import Secret
+
+from knuto.contenthash import CONTENT_HASH_ANNOTATION, content_hash
+from knuto.fakeapi import fake_api
+from knuto.tracing import COPIED_TIMESTAMP_ANNOTATION
+from knuto.utils import _update_or_create
+
+
+def _secret(annotations=None, password="cGFzcw==", api=None):
+    return Secret(
+        MagicMock() if api is None else api,
+        {
+            "apiVersion": "v1",
+            "kind": "Secret",
+            "metadata": {
+                "namespace": "ns",
+                "name": "test-kafka-config",
+                "annotations": dict(annotations or {}),
+            },
+            "data": {"password": password},
+        },
+    )
+
+
+class Test_content_hash(TestCase):
+    def test_trace_annotations_are_ignored(self):
+        self.assertEqual(
+            content_hash(_secret().obj),
+            content_hash(_secret({COPIED_TIMESTAMP_ANNOTATION: "1.0"}).obj),
+        )
+        self.assertEqual(
+            content_hash(_secret().obj),
+            content_hash(_secret({CONTENT_HASH_ANNOTATION: "digest"}).obj),
+        )
+        self.assertNotEqual(
+            content_hash(_secret().obj), content_hash(_secret(password="b3RoZXI=").obj)
+        )
+
+    def test_trace_annotations_in_the_secret_template_are_ignored(self):
+        def kafkauser(annotations):
+            return {
+                "metadata": {"namespace": "kafka", "name": "dev-app"},
+                "spec": {
+                    "template": {"secret": {"metadata": {"annotations": annotations}}}
+                },
+            }
+
+        self.assertEqual(
+            content_hash(kafkauser({})),
+            content_hash(kafkauser({COPIED_TIMESTAMP_ANNOTATION: "1.0"})),
+        )
+
+
+@patch("knuto.utils.globalconf.skip_unchanged_writes", True)
+class Test_update_or_create(TestCase):
+    def test_unchanged_object_is_not_written_again(self):
+        api, adapter = fake_api()
+
+        _update_or_create(_secret(api=api))
+        _update_or_create(_secret(api=api))
+
+        self.assertEqual(adapter.calls[("POST", "secrets")], 1)
+        self.assertEqual(adapter.calls[("PATCH", "secrets")], 0)
+
+    def test_deleted_or_edited_object_is_written_again(self):
+        api, adapter = fake_api()
+
+        _update_or_create(_secret(api=api))
+        edited = adapter.get_object("Secret", "ns", "test-kafka-config")
+        edited["data"]["password"] = "ZWRpdGVk"
+        edited["metadata"]["annotations"].pop(CONTENT_HASH_ANNOTATION)
+        adapter.put_object(edited)
+        _update_or_create(_secret(api=api))
+        self.assertEqual(adapter.calls[("PATCH", "secrets")], 1)
+
+        adapter.remove_object(edited)
+        _update_or_create(_secret(api=api))
+        self.assertEqual(adapter.calls[("POST", "secrets")], 2)
+        self.assertEqual(
+            adapter.get_object("Secret", "ns", "test-kafka-config")["data"],
+            {"password": "cGFzcw=="},
+        )
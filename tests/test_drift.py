@@ -0,0 +1,182 @@
+from unittest import TestCase
+from mock import patch, MagicMock
+
+from pykube.exceptions import HTTPError
+from pykube.objects import NamespacedAPIObject
+
+from knuto.drift import DriftScanner, _replace, _spec_projection
+from knuto.fakeapi import fake_api
+from knuto.tracing import TRACE_ID_ANNOTATION
+from knuto.utils import _update_or_create
+
+
+class KafkaTopic(NamespacedAPIObject):
+    version = "kafka.strimzi.io/v1beta1"
+    endpoint = "kafkatopics"
+    kind = "KafkaTopic"
+
+
+def _topic(namespace, name, partitions, source=None):
+    annotations = {"knuto.niradynamics.se/source": source} if source else {}
+    return KafkaTopic(
+        MagicMock(),
+        {
+            "metadata": {
+                "namespace": namespace,
+                "name": name,
+                "annotations": annotations,
+            },
+            "spec": {"partitions": partitions, "replicas": 1},
+        },
+    )
+
+
+def _desired_copy(body, namespace, name, copies):
+    if name == "ns-rejected":
+        return None
+    return _topic("kafka", name, body["spec"]["partitions"], f"{namespace}/{name}")
+
+
+class Test_spec_projection(TestCase):
+    def test_trace_annotations_are_ignored(self):
+        traced = {
+            "spec": {
+                "acls": [],
+                "template": {
+                    "secret": {"metadata": {"annotations": {TRACE_ID_ANNOTATION: "x"}}}
+                },
+            }
+        }
+
+        self.assertEqual(_spec_projection(traced), _spec_projection({"spec": {"acls": []}}))
+
+
+class Test_DriftScanner(TestCase):
+    def _scanner(self, **kwargs):
+        return DriftScanner(
+            [(KafkaTopic, _desired_copy)],
+            ["ns"],
+            "kafka",
+            MagicMock(),
+            interval=60,
+            **kwargs,
+        )
+
+    def _listing(self, sources, copies):
+        def _list_paged(query, page_size, on_page=None):
+            on_page()
+            return copies
+
+        def _list_pages(query, page_size, token=None, on_page=None):
+            start = int(token or 0)
+            while True:
+                on_page()
+                end = start + page_size
+                token = str(end) if end < len(sources) else None
+                yield sources[start:end], token
+                if token is None:
+                    return
+                start = end
+
+        return _list_paged, _list_pages
+
+    @patch("knuto.drift.state")
+    @patch("knuto.drift._replace")
+    @patch("knuto.drift._list_pages")
+    @patch("knuto.drift._list_paged")
+    def test_only_drifted_copies_are_replaced(
+        self, _list_paged, _list_pages, _replace, state
+    ):
+        _list_paged.side_effect, _list_pages.side_effect = self._listing(
+            sources=[
+                _topic("ns", "ns-same", 3),
+                _topic("ns", "ns-drifted", 3),
+                _topic("ns", "ns-rejected", 3),
+                _topic("ns", "ns-not-copied", 3),
+            ],
+            copies=[
+                _topic("kafka", "ns-same", 3, "ns/ns-same"),
+                _topic("kafka", "ns-drifted", 12, "ns/ns-drifted"),
+                _topic("kafka", "ns-rejected", 12, "ns/ns-rejected"),
+                _topic("kafka", "other-ns-drifted", 12, "other/other-ns-drifted"),
+            ],
+        )
+
+        self.assertEqual(self._scanner().scan(), 1)
+
+        _replace.assert_called_once()
+        desired, current = _replace.call_args.args
+        self.assertEqual(desired.name, "ns-drifted")
+        self.assertEqual(desired.obj["spec"]["partitions"], 3)
+        self.assertEqual(current.obj["spec"]["partitions"], 12)
+
+    @patch("knuto.drift.state")
+    @patch("knuto.drift._replace")
+    @patch("knuto.drift._list_pages")
+    @patch("knuto.drift._list_paged")
+    def test_next_scan_continues_where_budget_ran_out(
+        self, _list_paged, _list_pages, _replace, state
+    ):
+        _list_paged.side_effect, _list_pages.side_effect = self._listing(
+            sources=[_topic("ns", f"ns-{i}", 3) for i in range(5)],
+            copies=[_topic("kafka", f"ns-{i}", 1, f"ns/ns-{i}") for i in range(5)],
+        )
+        scanner = self._scanner(max_api_calls=4, page_size=2)
+
+        # Each scan lists the copies, and a page of two sources to repair
+        self.assertEqual([scanner.scan() for _ in range(3)], [2, 2, 1])
+        self.assertEqual(
+            [call.args[0].name for call in _replace.call_args_list],
+            [f"ns-{i}" for i in range(5)],
+        )
+        self.assertIsNone(scanner._position)
+
+    @patch("knuto.drift.state")
+    @patch("knuto.drift._replace")
+    @patch("knuto.drift._list_pages")
+    @patch("knuto.drift._list_paged")
+    def test_expired_position_starts_over(
+        self, _list_paged, _list_pages, _replace, state
+    ):
+        _list_paged.side_effect, _ = self._listing(sources=[], copies=[])
+        _list_pages.side_effect = HTTPError(410, "Expired")
+        scanner = self._scanner()
+        scanner._position = (0, 0, "expired")
+
+        self.assertEqual(scanner.scan(), 0)
+        self.assertIsNone(scanner._position)
+
+
+class Test_replace(TestCase):
+    @patch("knuto.utils.globalconf.skip_unchanged_writes", True)
+    @patch("knuto.drift.state")
+    def test_repaired_copy_is_not_written_again(self, state):
+        api, adapter = fake_api()
+        state.api = api
+
+        def copy(partitions):
+            return KafkaTopic(
+                api,
+                {
+                    "apiVersion": "kafka.strimzi.io/v1beta1",
+                    "kind": "KafkaTopic",
+                    "metadata": {
+                        "namespace": "kafka",
+                        "name": "ns-a",
+                        "annotations": {"knuto.niradynamics.se/source": "ns/ns-a"},
+                    },
+                    "spec": {"partitions": partitions, "replicas": 1},
+                },
+            )
+
+        adapter.put_object(copy(1).obj)
+        drifted = adapter.get_object("KafkaTopic", "kafka", "ns-a")
+
+        _replace(copy(3), KafkaTopic(api, drifted))
+        _update_or_create(copy(3))
+
+        self.assertEqual(adapter.calls[("PUT", "kafkatopics")], 1)
+        self.assertEqual(adapter.calls[("PATCH", "kafkatopics")], 0)
+        self.assertEqual(
+            adapter.get_object("KafkaTopic", "kafka", "ns-a")["spec"]["partitions"], 3
+        )
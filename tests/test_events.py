@@ -0,0 +1,94 @@
+import logging
+from unittest import TestCase
+from mock import patch, MagicMock
+
+from knuto.events import (
+    AggregatedFormatter,
+    EventAggregator,
+    _event_posters,
+    configure_event_posting,
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _record(name, namespace="dev", level=logging.INFO, msg="Update object"):
+    record = logging.LogRecord("kopf.objects", level, __file__, 1, msg, None, None)
+    record.k8s_ref = {"kind": "KafkaTopic", "namespace": namespace, "name": name}
+    return record
+
+
+class Test_EventAggregator(TestCase):
+    def test_one_event_per_object_and_level_per_window(self):
+        clock = Clock()
+        aggregator = EventAggregator(60, clock=clock)
+
+        self.assertTrue(aggregator.filter(_record("a")))
+        self.assertFalse(aggregator.filter(_record("a")))
+        self.assertFalse(aggregator.filter(_record("a")))
+        self.assertTrue(aggregator.filter(_record("a", level=logging.WARNING)))
+        self.assertTrue(aggregator.filter(_record("b")))
+
+        clock.now = 61
+        record = _record("a")
+        self.assertTrue(aggregator.filter(record))
+        self.assertEqual(
+            AggregatedFormatter(None).format(record),
+            "Update object (2 similar messages not posted)",
+        )
+
+    def test_events_per_namespace_are_capped(self):
+        clock = Clock()
+        aggregator = EventAggregator(60, per_namespace_limit=2, clock=clock)
+
+        posted = [aggregator.filter(_record(f"topic-{i}")) for i in range(5)]
+        self.assertEqual(posted, [True, True, False, False, False])
+        self.assertTrue(aggregator.filter(_record("topic-0", namespace="production")))
+
+        clock.now = 61
+        self.assertTrue(aggregator.filter(_record("topic-4")))
+
+    def test_records_without_object_pass(self):
+        record = logging.LogRecord("kopf", logging.INFO, __file__, 1, "msg", None, None)
+
+        self.assertTrue(EventAggregator(60).filter(record))
+
+
+class Test_configure_event_posting(TestCase):
+    @patch("knuto.events.globalconf")
+    def test_poster_is_found(self, globalconf):
+        globalconf.event_level = None
+        globalconf.event_window = 60
+        globalconf.events_per_namespace = None
+        logger = MagicMock()
+        posters = _event_posters()
+        formatters = [poster.formatter for poster in posters]
+
+        configure_event_posting(MagicMock(), logger)
+
+        # The kopf installed has the poster this relies on
+        logger.warning.assert_not_called()
+        for poster, formatter in zip(posters, formatters):
+            poster.filters = [
+                f for f in poster.filters if not isinstance(f, EventAggregator)
+            ]
+            poster.setFormatter(formatter)
+
+    @patch("knuto.events._event_posters")
+    @patch("knuto.events.globalconf")
+    def test_missing_poster_is_warned_about(self, globalconf, _event_posters):
+        globalconf.event_level = None
+        globalconf.event_window = 60
+        globalconf.events_per_namespace = None
+        _event_posters.return_value = []
+        logger = MagicMock()
+
+        configure_event_posting(MagicMock(), logger)
+
+        logger.warning.assert_called_once()
@@ -1,7 +1,24 @@
+import json
+
 from mock import patch, MagicMock
 import pytest
 
-from knuto.kafka_user_topic import check_acl_allowed, AclNotAllowed
+from knuto.config import state
+from knuto.fakeapi import fake_api
+from knuto.kafka_user_topic import (
+    check_acl_allowed,
+    _copy_kafkatopic,
+    _copy_kafkauser,
+    create_kafkatopic,
+    create_kafkauser,
+    delete_kafkauser,
+    AclNotAllowed,
+    _in_source_namespace,
+    _is_copy,
+    _source_namespaces,
+)
+from knuto.cache import DestinationNameIndex
+from knuto.quota import TopicQuotaIndex
 
 
 TEST_SOURCE_NS = "test-source-ns"
@@ -63,3 +80,184 @@ def _get_acls(operation, topic):
             "operation": operation,
         }
     ]
+
+
+@patch("knuto.kafka_user_topic._update_or_create")
+@patch("knuto.kafka_user_topic.topic_quota_index", new_callable=TopicQuotaIndex)
+@patch("knuto.kafka_user_topic.globalconf")
+def test_kafkatopic_over_quota_is_not_copied(
+    globalconf, topic_quota_index, _update_or_create, monkeypatch
+):
+    api, _ = fake_api()
+    monkeypatch.setattr(state, "api", api)
+    logger = MagicMock()
+    globalconf.kafka_user_topic_destination_namespace = "kafka"
+    globalconf.max_topics = None
+    globalconf.max_topic_partitions = 10
+    globalconf.max_topic_partition_replicas = None
+    topic_quota_index.admit(TEST_SOURCE_NS, "existing", 8, 1)
+
+    body = {
+        "metadata": {"namespace": TEST_SOURCE_NS, "name": f"{TEST_SOURCE_NS}-new"},
+        "spec": {"partitions": 3, "replicas": 1},
+    }
+
+    ret = create_kafkatopic(body, TEST_SOURCE_NS, f"{TEST_SOURCE_NS}-new", logger)
+
+    assert "quota_exceeded" in ret
+    _update_or_create.assert_not_called()
+    assert topic_quota_index.usage(TEST_SOURCE_NS)["partitions"] == 8
+
+
+@patch("knuto.kafka_user_topic.state")
+@patch("knuto.kafka_user_topic.globalconf")
+def test_combined_mode_handles_source_namespaces_only(globalconf, state):
+    globalconf.kafka_user_topic_destination_namespace = "kafka"
+    globalconf.kafka_user_topic_source_namespaces = set(["dev", "production"])
+    state.combined = True
+    state.namespace = "kafka"
+
+    assert _in_source_namespace("production")
+    assert not _in_source_namespace("kafka")
+    assert _source_namespaces() == ["dev", "production"]
+
+
+@patch("knuto.kafka_user_topic.globalconf")
+def test_copies_are_told_apart_by_source_annotation(globalconf):
+    globalconf.kafka_user_topic_destination_namespace = "kafka"
+
+    assert _is_copy("kafka", {"knuto.niradynamics.se/source": "dev/user"})
+    assert not _is_copy("kafka", {})
+    assert not _is_copy("dev", {"knuto.niradynamics.se/source": "dev/user"})
+
+
+@patch("knuto.kafka_user_topic._update_or_create")
+@patch("knuto.kafka_user_topic.destination_names", new_callable=DestinationNameIndex)
+@patch("knuto.kafka_user_topic.globalconf")
+def test_colliding_kafkatopic_is_not_copied(
+    globalconf, destination_names, _update_or_create, monkeypatch
+):
+    api, _ = fake_api()
+    monkeypatch.setattr(state, "api", api)
+    globalconf.kafka_user_topic_destination_namespace = "kafka"
+    globalconf.strimzi_max_not_ready = None
+    logger = MagicMock()
+    destination_names.claim("KafkaTopic", "shared", "other/shared")
+    body = {
+        "metadata": {"namespace": TEST_SOURCE_NS, "name": "shared"},
+        "spec": {"topicName": f"{TEST_SOURCE_NS}-shared"},
+    }
+
+    ret = create_kafkatopic(body, TEST_SOURCE_NS, "shared", logger)
+
+    assert ret == {
+        "name_collision": f"{TEST_SOURCE_NS}/shared would be copied to KafkaTopic "
+        "shared, which is the copy of other/shared"
+    }
+    _update_or_create.assert_not_called()
+
+
+def _kafkauser(namespace, name):
+    return {
+        "apiVersion": "kafka.strimzi.io/v1beta2",
+        "kind": "KafkaUser",
+        "metadata": {"namespace": namespace, "name": name},
+        "spec": {"authorization": {"acls": []}},
+    }
+
+
+@patch("knuto.kafka_user_topic.globalconf")
+def test_collision_with_source_handled_by_another_process(globalconf, monkeypatch):
+    api, adapter = fake_api()
+    monkeypatch.setattr(state, "api", api)
+    globalconf.kafka_user_topic_destination_namespace = "kafka"
+    globalconf.strimzi_max_not_ready = None
+    globalconf.replication_lag_tracking_enabled = False
+    globalconf.kafka_topic_deletion_enabled = False
+    globalconf.kafkauser_quota_defaults = {}
+    globalconf.kafkauser_quota_maximums = {}
+    logger = MagicMock()
+
+    # Each source namespace has its own knuto-kafka-user-topic, with an index of its own
+    with patch("knuto.kafka_user_topic.destination_names", DestinationNameIndex()):
+        create_kafkauser(_kafkauser("a-b", "c"), "a-b", "c", logger)
+
+    with patch("knuto.kafka_user_topic.destination_names", DestinationNameIndex()):
+        create_kafkauser(_kafkauser("a", "b-c"), "a", "b-c", logger)
+        assert delete_kafkauser(_kafkauser("a", "b-c"), "a", "b-c", logger) == {
+            "not_deleting": "Copy belongs to a-b/c"
+        }
+
+    copy = adapter.get_object("KafkaUser", "kafka", "a-b-c")
+    assert copy["metadata"]["annotations"]["knuto.niradynamics.se/source"] == "a-b/c"
+
+    with patch("knuto.kafka_user_topic.destination_names", DestinationNameIndex()):
+        delete_kafkauser(_kafkauser("a-b", "c"), "a-b", "c", logger)
+    assert adapter.get_object("KafkaUser", "kafka", "a-b-c") is None
+
+
+@patch("knuto.kafka_user_topic.globalconf")
+def test_kafkauser_copy_gets_namespace_quotas(globalconf, monkeypatch):
+    api, _ = fake_api()
+    monkeypatch.setattr(state, "api", api)
+    globalconf.kafka_user_topic_destination_namespace = "kafka"
+    globalconf.kafkauser_quota_defaults = {None: {"producerByteRate": 1000}}
+    globalconf.kafkauser_quota_maximums = {
+        None: {"producerByteRate": 5000},
+        "dev": {"producerByteRate": 2000},
+    }
+    body = {
+        "metadata": {"namespace": "dev", "name": "app"},
+        "spec": {"authorization": {"acls": []}, "quotas": {"producerByteRate": 3000}},
+    }
+
+    assert _copy_kafkauser(body, "dev", "app").obj["spec"]["quotas"] == {
+        "producerByteRate": 2000
+    }
+    del body["spec"]["quotas"]
+    assert _copy_kafkauser(body, "production", "app").obj["spec"]["quotas"] == {
+        "producerByteRate": 1000
+    }
+
+
+@patch("knuto.kafka_user_topic.globalconf")
+def test_kafkatopic_copy_is_annotated_with_adjustments(globalconf, monkeypatch):
+    api, _ = fake_api()
+    monkeypatch.setattr(state, "api", api)
+    globalconf.kafka_user_topic_destination_namespace = "kafka"
+    globalconf.kafkatopic_config_defaults = {None: {"compression.type": "zstd"}}
+    globalconf.kafkatopic_config_ranges = {"dev": {"partitions": (1, 12)}}
+    body = {
+        "metadata": {"namespace": "dev", "name": "dev-topic"},
+        "spec": {"partitions": 24, "config": {"compression.type": "lz4"}},
+    }
+
+    copy = _copy_kafkatopic(body, "dev", "dev-topic")
+
+    assert copy.obj["spec"] == {"partitions": 12, "config": {"compression.type": "lz4"}}
+    assert json.loads(copy.annotations["knuto.niradynamics.se/adjusted"]) == {
+        "partitions": {"from": 24, "to": 12}
+    }
+
+    globalconf.kafkatopic_config_defaults = {}
+    globalconf.kafkatopic_config_ranges = {}
+    copy = _copy_kafkatopic(body, "dev", "dev-topic")
+    assert "knuto.niradynamics.se/adjusted" not in copy.annotations
+
+
+@patch("knuto.kafka_user_topic.globalconf")
+def test_kafkatopic_copy_keeps_partitions_above_maximum(globalconf, monkeypatch):
+    api, _ = fake_api()
+    monkeypatch.setattr(state, "api", api)
+    globalconf.kafka_user_topic_destination_namespace = "kafka"
+    globalconf.kafkatopic_config_defaults = {}
+    globalconf.kafkatopic_config_ranges = {"dev": {"partitions": (1, 12)}}
+    body = {
+        "metadata": {"namespace": "dev", "name": "dev-topic"},
+        "spec": {"partitions": 24},
+    }
+    current = MagicMock(obj={"spec": {"partitions": 24}})
+
+    copy = _copy_kafkatopic(body, "dev", "dev-topic", current)
+
+    assert copy.obj["spec"] == {"partitions": 24}
@@ -0,0 +1,105 @@
+import os
+import tempfile
+from unittest import TestCase
+from mock import patch, MagicMock
+
+from pykube.exceptions import HTTPError
+from pykube.objects import NamespacedAPIObject
+
+from knuto.checkpoint import CheckpointStore
+from knuto.migrate import migrate
+from knuto.strimzi import discover_version
+
+
+class KafkaUser(NamespacedAPIObject):
+    version = "kafka.strimzi.io/v1beta2"
+    endpoint = "kafkausers"
+    kind = "KafkaUser"
+
+
+class KafkaTopic(NamespacedAPIObject):
+    version = "kafka.strimzi.io/v1beta2"
+    endpoint = "kafkatopics"
+    kind = "KafkaTopic"
+
+
+def _topics(namespace, names):
+    topics = [
+        KafkaTopic(MagicMock(), {"metadata": {"namespace": namespace, "name": name}})
+        for name in names
+    ]
+    for topic in topics:
+        topic.update = MagicMock()
+    return topics
+
+
+def _listing(topics):
+    return lambda query, page_size: iter(
+        topics if query.api_obj_class is KafkaTopic else []
+    )
+
+
+@patch("knuto.migrate._list_paged")
+@patch(
+    "knuto.migrate.object_factory",
+    side_effect=lambda api, version, kind: {"KafkaUser": KafkaUser}.get(
+        kind, KafkaTopic
+    ),
+)
+@patch("knuto.migrate.state")
+class Test_migrate(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "checkpoint.sqlite")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_rewrites_all_objects_once(self, state, object_factory, _list_paged):
+        state.checkpoint = CheckpointStore(self.path)
+        topics = _topics("dev", ["a", "b", "gone"])
+        topics[2].update.side_effect = HTTPError(404, "not found")
+        _list_paged.side_effect = _listing(topics)
+
+        result = migrate(
+            ["dev"], "kafka.strimzi.io/v1beta2", MagicMock(), concurrency=2
+        )
+        self.assertEqual(result["migrated"], 3)
+        self.assertEqual(result["failed"], 0)
+
+        # Continuing an interrupted migration skips what has been written
+        result = migrate(
+            ["dev"], "kafka.strimzi.io/v1beta2", MagicMock(), concurrency=2
+        )
+        self.assertEqual(result["migrated"], 0)
+        self.assertEqual(result["skipped"], 3)
+        state.checkpoint.close()
+
+    def test_failed_objects_are_not_recorded(self, state, object_factory, _list_paged):
+        state.checkpoint = CheckpointStore(self.path)
+        topics = _topics("dev", ["a"])
+        topics[0].update.side_effect = HTTPError(422, "invalid")
+        _list_paged.side_effect = _listing(topics)
+
+        result = migrate(
+            ["dev"], "kafka.strimzi.io/v1beta2", MagicMock(), concurrency=1
+        )
+
+        self.assertEqual(result["failed"], 1)
+        self.assertFalse(
+            state.checkpoint.is_migrated("KafkaTopic/dev/a", "kafka.strimzi.io/v1beta2")
+        )
+        state.checkpoint.close()
+
+
+def test_discover_version_uses_preferred_version():
+    api = MagicMock()
+    api.get.return_value.json.return_value = {
+        "preferredVersion": {
+            "groupVersion": "kafka.strimzi.io/v1beta2",
+            "version": "v1beta2",
+        }
+    }
+
+    assert discover_version(api) == "v1beta2"
+    api.get.assert_called_once_with(version="kafka.strimzi.io", base="/apis")
@@ -0,0 +1,33 @@
+from unittest import TestCase
+from mock import MagicMock
+
+from knuto.parking import ParkingLot
+
+
+class Test_ParkingLot(TestCase):
+    def test_release_returns_latest_callback_per_event(self):
+        lot = ParkingLot()
+        first, second, other = MagicMock(), MagicMock(), MagicMock()
+
+        lot.park(("kafka", "ns-test"), "event", first)
+        lot.park(("kafka", "ns-test"), "event", second)
+        lot.park(("kafka", "ns-other"), "event", other)
+
+        self.assertEqual(len(lot), 2)
+        self.assertEqual(lot.release(("kafka", "ns-test")), [second])
+        self.assertEqual(lot.release(("kafka", "ns-test")), [])
+        self.assertEqual(len(lot), 1)
+
+    def test_events_parked_longer_than_ttl_are_dropped(self):
+        now = [0.0]
+        lot = ParkingLot(ttl=60, clock=lambda: now[0])
+        old, new = MagicMock(), MagicMock()
+
+        lot.park(("kafka", "ns-old"), "event", old)
+        now[0] = 50.0
+        lot.park(("kafka", "ns-new"), "event", new)
+        now[0] = 100.0
+
+        self.assertEqual(len(lot), 1)
+        self.assertEqual(lot.release(("kafka", "ns-old")), [])
+        self.assertEqual(lot.release(("kafka", "ns-new")), [new])
@@ -0,0 +1,60 @@
+import os
+import signal
+import tempfile
+import time
+from unittest import TestCase
+
+from knuto.profiling import install_signal_handler, profiled, profiler
+
+
+@profiled
+def _busy():
+    sum(range(10000))
+
+
+class Test_SamplingProfiler(TestCase):
+    def test_profiled_functions_are_only_timed_while_profiling(self):
+        _busy()
+        self.assertEqual(len(profiler._timings), 0)
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            profiler.start(10, output_dir)
+            for _ in range(3):
+                _busy()
+                time.sleep(0.01)
+            self.assertEqual(profiler._timings["_busy"][0], 3)
+
+            profiler.stop()
+            for _ in range(100):
+                if not profiler.active and len(os.listdir(output_dir)) == 2:
+                    break
+                time.sleep(0.05)
+
+            files = sorted(os.listdir(output_dir))
+            self.assertEqual([os.path.splitext(f)[1] for f in files], [".folded", ".txt"])
+            with open(os.path.join(output_dir, files[0])) as f:
+                self.assertTrue(all(line.rsplit(" ", 1)[1].strip().isdigit() for line in f))
+            with open(os.path.join(output_dir, files[1])) as f:
+                self.assertIn("_busy", f.read())
+
+    def test_signal_while_recording_does_not_deadlock(self):
+        previous = signal.getsignal(signal.SIGUSR2)
+        with tempfile.TemporaryDirectory() as output_dir:
+            install_signal_handler(10, output_dir)
+            try:
+                # As if the signal arrived while record() held the lock
+                with profiler._lock:
+                    os.kill(os.getpid(), signal.SIGUSR2)
+                    time.sleep(0.01)
+                for _ in range(100):
+                    if profiler.active:
+                        break
+                    time.sleep(0.01)
+                self.assertTrue(profiler.active)
+            finally:
+                signal.signal(signal.SIGUSR2, previous)
+                profiler.stop()
+                for _ in range(100):
+                    if not profiler.active:
+                        break
+                    time.sleep(0.05)
@@ -0,0 +1,103 @@
+from unittest import TestCase
+
+import pytest
+
+from knuto.quota import (
+    QuotaExceeded,
+    TopicQuotaIndex,
+    capped_user_quotas,
+    user_quota_argument,
+    user_quotas,
+)
+
+
+class Test_TopicQuotaIndex(TestCase):
+    def test_create_resize_and_delete(self):
+        index = TopicQuotaIndex()
+
+        index.admit("ns", "ns-a", 3, 2)
+        index.admit("ns", "ns-b", 1, 3)
+        self.assertEqual(
+            index.usage("ns"), {"topics": 2, "partitions": 4, "replicas": 9}
+        )
+
+        index.admit("ns", "ns-a", 6, 2)
+        self.assertEqual(
+            index.usage("ns"), {"topics": 2, "partitions": 7, "replicas": 15}
+        )
+
+        index.remove("ns", "ns-b")
+        index.remove("ns", "ns-unknown")
+        self.assertEqual(
+            index.usage("ns"), {"topics": 1, "partitions": 6, "replicas": 12}
+        )
+        self.assertEqual(
+            index.usage("other"), {"topics": 0, "partitions": 0, "replicas": 0}
+        )
+
+    def test_limits(self):
+        index = TopicQuotaIndex()
+        limits = {"topics": 2, "partitions": 10, "replicas": None}
+
+        index.admit("ns", "ns-a", 8, 3, limits=limits)
+
+        with pytest.raises(QuotaExceeded):
+            index.admit("ns", "ns-b", 3, 1, limits=limits)
+        self.assertEqual(index.usage("ns")["topics"], 1)
+
+        index.admit("ns", "ns-b", 2, 1, limits=limits)
+        with pytest.raises(QuotaExceeded):
+            index.admit("ns", "ns-c", 0, 1, limits=limits)
+
+        # Shrinking a topic is allowed even if the limit has been lowered below usage
+        index.admit("ns", "ns-a", 7, 3, limits={"partitions": 5})
+        self.assertEqual(index.usage("ns")["partitions"], 9)
+
+
+    def test_check_does_not_change_usage(self):
+        index = TopicQuotaIndex()
+        index.admit("ns", "ns-a", 8, 1)
+
+        index.check("ns", "ns-b", 2, 1, limits={"partitions": 10})
+        with pytest.raises(QuotaExceeded):
+            index.check("ns", "ns-b", 3, 1, limits={"partitions": 10})
+        self.assertEqual(
+            index.usage("ns"), {"topics": 1, "partitions": 8, "replicas": 8}
+        )
+
+
+def test_user_quota_argument():
+    assert user_quota_argument("producerByteRate=1048576") == (
+        None,
+        "producerByteRate",
+        1048576,
+    )
+    assert user_quota_argument("dev/requestPercentage=50") == (
+        "dev",
+        "requestPercentage",
+        50,
+    )
+    with pytest.raises(ValueError):
+        user_quota_argument("dev/producerByteRate")
+    with pytest.raises(ValueError):
+        user_quota_argument("fetchByteRate=1")
+
+
+def test_user_quotas_defaults_and_maximums():
+    defaults = {"producerByteRate": 1000, "requestPercentage": 20}
+    maximums = {"producerByteRate": 5000, "consumerByteRate": 8000}
+
+    assert user_quotas(None, defaults, maximums) == {
+        "producerByteRate": 1000,
+        "consumerByteRate": 8000,
+        "requestPercentage": 20,
+    }
+    quotas = {"producerByteRate": 9000, "consumerByteRate": 2000, "other": 1}
+    assert user_quotas(quotas, defaults, maximums) == {
+        "producerByteRate": 5000,
+        "consumerByteRate": 2000,
+        "requestPercentage": 20,
+        "other": 1,
+    }
+    assert capped_user_quotas(quotas, maximums) == ["producerByteRate"]
+    assert user_quotas(None, {}, {}) == {}
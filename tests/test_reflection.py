@@ -0,0 +1,83 @@
+from unittest import TestCase
+from mock import patch, MagicMock
+
+from knuto.reflection import StatusReflector, reflected_status
+
+ENDPOINTS = {"KafkaTopic": ("kafka.strimzi.io/v1beta1", "kafkatopics")}
+
+
+def _status(ready):
+    return {
+        "conditions": [{"type": "Ready", "status": "True" if ready else "False"}],
+        "topicName": "dev-topic",
+    }
+
+
+def _reflector(batch_size=10):
+    return StatusReflector(ENDPOINTS, MagicMock(), interval=1, batch_size=batch_size)
+
+
+@patch("knuto.reflection.state")
+class Test_StatusReflector(TestCase):
+    def test_changes_are_coalesced_into_one_patch(self, state):
+        state.api.patch.return_value = MagicMock(status_code=200, ok=True)
+        reflector = _reflector()
+
+        reflector.reflect("KafkaTopic", "dev", "topic", _status(False))
+        reflector.reflect("KafkaTopic", "dev", "topic", _status(True))
+
+        self.assertEqual(reflector.flush(), 1)
+        state.api.patch.assert_called_once_with(
+            version="kafka.strimzi.io/v1beta1",
+            namespace="dev",
+            url="kafkatopics/topic/status",
+            headers={"Content-Type": "application/merge-patch+json"},
+            data='{"status":{"conditions":[{"type":"Ready","status":"True"}],'
+            '"topicName":"dev-topic"}}',
+        )
+
+        # Written already
+        reflector.reflect("KafkaTopic", "dev", "topic", _status(True))
+        self.assertEqual(reflector.flush(), 0)
+
+    def test_status_the_source_has_is_not_written(self, state):
+        reflector = _reflector()
+
+        reflector.reflect("KafkaTopic", "dev", "topic", _status(True))
+        reflector.observe_source(
+            "KafkaTopic", "dev", "topic", {"status": _status(True)}
+        )
+
+        self.assertEqual(reflector.flush(), 0)
+        state.api.patch.assert_not_called()
+
+    def test_flush_writes_at_most_batch_size_oldest_first(self, state):
+        state.api.patch.return_value = MagicMock(status_code=200, ok=True)
+        reflector = _reflector(batch_size=2)
+        for name in ["a", "b", "c"]:
+            reflector.reflect("KafkaTopic", "dev", name, _status(False))
+        reflector.reflect("KafkaTopic", "dev", "a", _status(True))
+
+        self.assertEqual(reflector.flush(), 2)
+        self.assertEqual(
+            [c.kwargs["url"] for c in state.api.patch.call_args_list],
+            ["kafkatopics/a/status", "kafkatopics/b/status"],
+        )
+        self.assertEqual(reflector.flush(), 1)
+
+    def test_failed_patches_are_retried(self, state):
+        state.api.patch.return_value = MagicMock(status_code=500, ok=False)
+        reflector = _reflector()
+        reflector.reflect("KafkaTopic", "dev", "topic", _status(True))
+
+        self.assertEqual(reflector.flush(), 0)
+        state.api.patch.return_value = MagicMock(status_code=200, ok=True)
+        self.assertEqual(reflector.flush(), 1)
+
+
+def test_reflected_status_has_none_for_missing_fields():
+    assert reflected_status("KafkaUser", {"status": {"username": "CN=dev-user"}}) == {
+        "conditions": None,
+        "username": "CN=dev-user",
+        "secret": None,
+    }
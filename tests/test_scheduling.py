@@ -0,0 +1,138 @@
+import threading
+import time
+from unittest import TestCase
+
+from mock import patch
+
+from knuto.scheduling import FairQueue, PriorityGate, key_value, prioritized
+
+
+class Test_FairQueue(TestCase):
+    def test_lower_priority_number_first(self):
+        queue = FairQueue()
+        queue.push(2, "dev", "update")
+        queue.push(1, "dev", "create")
+
+        self.assertEqual([queue.pop(), queue.pop()], ["create", "update"])
+
+    def test_namespaces_share_by_weight(self):
+        queue = FairQueue({"production": 2})
+        for i in range(100):
+            queue.push(1, "dev", f"dev-{i}")
+        for i in range(4):
+            queue.push(1, "production", f"production-{i}")
+
+        first = [queue.pop() for _ in range(6)]
+
+        self.assertEqual(sum(item.startswith("production") for item in first), 4)
+        self.assertEqual(len(queue), 100 - 2)
+
+    def test_idle_namespace_gets_no_credit(self):
+        queue = FairQueue()
+        for i in range(10):
+            queue.push(1, "dev", f"dev-{i}")
+        for _ in range(10):
+            queue.pop()
+
+        queue.push(1, "dev", "dev-late")
+        queue.push(1, "production", "production-0")
+        queue.push(1, "production", "production-1")
+
+        # production does not get ahead by the ten items dev had while it was idle
+        self.assertEqual(
+            [queue.pop() for _ in range(3)], ["production-0", "dev-late", "production-1"]
+        )
+
+
+class Test_PriorityGate(TestCase):
+    def test_creates_in_production_run_before_queued_updates(self):
+        gate = PriorityGate(1)
+        started = threading.Event()
+        release = threading.Event()
+        order = []
+
+        @prioritized
+        def handler(name, **kwargs):
+            if name == "blocker":
+                started.set()
+                release.wait()
+            order.append(name)
+
+        def call(name, namespace, reason):
+            thread = threading.Thread(
+                target=handler,
+                args=(name,),
+                kwargs={"namespace": namespace, "reason": reason},
+            )
+            thread.start()
+            return thread
+
+        with patch("knuto.scheduling.handler_gate", gate):
+            threads = [call("blocker", "dev", "update")]
+            started.wait()
+            for name, namespace, reason in [
+                ("dev-0", "dev", "update"),
+                ("dev-1", "dev", "update"),
+                ("production", "production", "create"),
+            ]:
+                threads.append(call(name, namespace, reason))
+                while len(gate._queue) < len(threads) - 1:
+                    time.sleep(0.001)
+            release.set()
+            for thread in threads:
+                thread.join(timeout=5)
+
+        self.assertEqual(order, ["blocker", "production", "dev-0", "dev-1"])
+
+    def test_event_handlers_have_event_priority(self):
+        gate = PriorityGate(1, priorities={"event": 0})
+
+        self.assertEqual(gate.priority("event"), 0)
+        self.assertEqual(gate.priority("update"), 2)
+        self.assertEqual(gate.priority("unknown"), 2)
+
+    def test_slot_is_released_when_handler_fails(self):
+        gate = PriorityGate(1)
+
+        @prioritized
+        def fail(**kwargs):
+            raise ValueError("failed")
+
+        with patch("knuto.scheduling.handler_gate", gate):
+            for _ in range(2):
+                with self.assertRaises(ValueError):
+                    fail(namespace="dev", event={"type": None})
+
+        self.assertEqual(gate._running, 0)
+
+    def test_nested_call_runs_in_the_slot_of_its_thread(self):
+        gate = PriorityGate(1)
+
+        @prioritized
+        def inner(**kwargs):
+            return "inner"
+
+        @prioritized
+        def outer(**kwargs):
+            return inner(namespace="dev", reason="update")
+
+        with patch("knuto.scheduling.handler_gate", gate):
+            thread = threading.Thread(
+                target=outer, kwargs={"namespace": "dev", "reason": "update"}
+            )
+            thread.start()
+            thread.join(timeout=5)
+
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(gate._running, 0)
+
+    def test_not_limited_without_slots(self):
+        @prioritized
+        def handler(**kwargs):
+            return kwargs["namespace"]
+
+        self.assertEqual(handler(namespace="dev", reason="create"), "dev")
+
+
+def test_key_value():
+    assert key_value("production=2.5", float) == ("production", 2.5)
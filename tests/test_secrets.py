@@ -2,13 +2,28 @@ from unittest import TestCase
 from mock import patch, MagicMock
 
 import base64
+import threading
+
+import kopf
+
+from pykube import Secret as RealSecret
 
 from knuto.secrets import (
+    KafkaUserNotFound,
+    _create_new_secret,
+    _load_kafkauser,
     _should_copy,
     kafka_secret_create,
     kafka_secret,
     _source_namespace_for_secret,
+    index_kafkauser,
+    regenerate_kafka_config_secrets,
+    regenerate_on_cluster_ca_change,
+    render_changed_client_profile,
+    waiting_for_kafkauser,
 )
+from knuto.scheduling import PriorityGate
+from knuto.utils import _copy_object
 
 
 class Test_should_copy(TestCase):
@@ -19,6 +34,7 @@ class Test_should_copy(TestCase):
         globalconf.kafka_user_topic_source_namespaces = set(
             ["latest", "ingestion-latest"]
         )
+        globalconf.secret_type_to_hostname_map = {"scram-sha-512": "broker:9092"}
 
         self.assertTrue(
             _should_copy(
@@ -76,6 +92,24 @@ class Test_should_copy(TestCase):
             )
         )
 
+    @patch("knuto.secrets.globalconf")
+    def test_secret_type_without_bootstrap_server(self, globalconf):
+        logger = MagicMock()
+
+        globalconf.kafka_user_topic_source_namespaces = set(["ingestion-latest"])
+        globalconf.secret_type_to_hostname_map = {"scram-sha-512": "broker:9092"}
+
+        self.assertFalse(
+            _should_copy(
+                "ingestion-latest-something",
+                "kafka",
+                "ingestion-latest",
+                {"data": {"user.crt": "crt"}},
+                logger,
+            )
+        )
+        logger.warning.assert_called_once()
+
 
 class Test_kafka_secret_create(TestCase):
     @patch("knuto.secrets._update_or_create")
@@ -132,6 +166,116 @@ class Test_kafka_secret_create(TestCase):
         self.assertEqual(ret, {"copied_to": "ns-with-dash/test-kafka-config"})
 
 
+class Test_client_profile(TestCase):
+    def _properties(self, annotations):
+        secret_obj = {
+            "metadata": {
+                "namespace": "kafka",
+                "name": "ns-test",
+                "labels": {"strimzi.io/kind": "KafkaUser"},
+            },
+            "data": {"password": base64.b64encode(b"pass").decode("ascii")},
+        }
+        new_secret = _create_new_secret(
+            "ns-test", "kafka", "ns", secret_obj, annotations=annotations
+        )
+        return base64.b64decode(
+            new_secret.obj["data"]["kafka-client.properties"]
+        ).decode("ascii")
+
+    @patch("knuto.secrets.globalconf")
+    def test_profile_rendered_after_credentials(self, globalconf):
+        globalconf.secret_type_to_hostname_map = {"scram-sha-512": "broker:9092"}
+        globalconf.client_profiles = {"low-latency-consumer": {"max.poll.records": "1"}}
+        globalconf.namespace_client_profiles = {"ns": "high-throughput-producer"}
+
+        properties = self._properties({})
+        self.assertIn("bootstrap.servers=broker:9092\n", properties)
+        self.assertIn("# Client profile high-throughput-producer\n", properties)
+        self.assertIn("linger.ms=20\n", properties)
+
+        properties = self._properties(
+            {"knuto.niradynamics.se/client-profile": "low-latency-consumer"}
+        )
+        self.assertIn("max.poll.records=1\n", properties)
+        self.assertNotIn("linger.ms", properties)
+
+    @patch("knuto.secrets.globalconf")
+    def test_unknown_profile_is_not_rendered(self, globalconf):
+        globalconf.secret_type_to_hostname_map = {"scram-sha-512": "broker:9092"}
+        globalconf.client_profiles = {}
+        globalconf.namespace_client_profiles = {}
+
+        properties = self._properties(
+            {"knuto.niradynamics.se/client-profile": "no-such-profile"}
+        )
+        self.assertNotIn("# Client profile", properties)
+        self.assertIn("bootstrap.servers=broker:9092\n", properties)
+
+
+class Test_render_changed_client_profile(TestCase):
+    @patch("knuto.secrets._render_kafka_secret")
+    @patch("knuto.secrets.Secret")
+    def test_rendered_again_when_profile_changes(self, Secret, kafka_secret):
+        profile = "knuto.niradynamics.se/client-profile"
+        get_or_none = Secret.objects.return_value.filter.return_value.get_or_none
+        get_or_none.return_value = MagicMock(obj={"metadata": {"name": "ns-test"}})
+
+        render_changed_client_profile(
+            {profile: "bulk-ingest", "other": "a"},
+            {profile: "bulk-ingest", "other": "b"},
+            "kafka",
+            "ns-test",
+            MagicMock(),
+        )
+        kafka_secret.assert_not_called()
+
+        render_changed_client_profile(
+            {}, {profile: "bulk-ingest"}, "kafka", "ns-test", MagicMock()
+        )
+        kafka_secret.assert_called_once()
+
+    @patch("knuto.secrets.globalconf")
+    @patch("knuto.secrets._update_or_create")
+    @patch("knuto.secrets._should_copy")
+    @patch("knuto.secrets._source_namespace_for_secret")
+    @patch("knuto.secrets.Secret")
+    def test_rendered_with_one_handler_thread(
+        self, Secret, _source_namespace_for_secret, _should_copy, _update_or_create, _
+    ):
+        _should_copy.return_value = True
+        _source_namespace_for_secret.return_value = "ns"
+        get_or_none = Secret.objects.return_value.filter.return_value.get_or_none
+        get_or_none.return_value = MagicMock(
+            obj={
+                "metadata": {"namespace": "kafka", "name": "ns-test"},
+                "data": {"password": base64.b64encode("pass".encode("utf-8"))},
+            }
+        )
+        results = []
+
+        def handle():
+            results.append(
+                render_changed_client_profile(
+                    old={},
+                    new={"knuto.niradynamics.se/client-profile": "bulk-ingest"},
+                    namespace="kafka",
+                    name="ns-test",
+                    logger=MagicMock(),
+                    reason="update",
+                )
+            )
+
+        with patch("knuto.scheduling.handler_gate", PriorityGate(1)):
+            thread = threading.Thread(target=handle, daemon=True)
+            thread.start()
+            thread.join(timeout=5)
+
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(len(results), 1)
+        _update_or_create.assert_called_once()
+
+
 class Test_kafka_secret(TestCase):
     @patch("knuto.secrets.globalconf")
     @patch("knuto.secrets._update_or_create")
@@ -184,3 +328,155 @@ class Test_Source_Namespace_For_Secret(TestCase):
         ret = _source_namespace_for_secret("kafka", "ns-with-dash-test", logger)
 
         self.assertEqual(ret, None)
+
+
+class Test_regenerate_kafka_config_secrets(TestCase):
+    @patch("knuto.secrets.object_factory")
+    @patch("knuto.secrets.Secret")
+    @patch("knuto.secrets.globalconf")
+    def test_only_outdated_secrets_are_written(
+        self, globalconf, Secret, object_factory
+    ):
+        logger = MagicMock()
+        globalconf.kafka_user_topic_source_namespaces = set(["ns"])
+        globalconf.secret_type_to_hostname_map = {"scram-sha-512": "new-broker:9092"}
+        globalconf.regenerate_concurrency = 2
+
+        kafkausers = []
+        strimzi_secrets = []
+        for name in ["ns-outdated", "ns-current", "ns-missing"]:
+            kafkauser = MagicMock(annotations={"knuto.niradynamics.se/source": "ns/x"})
+            kafkauser.name = name
+            kafkausers.append(kafkauser)
+
+            strimzi_secret = MagicMock()
+            strimzi_secret.name = name
+            strimzi_secret.obj = {
+                "metadata": {
+                    "namespace": "kafka",
+                    "name": name,
+                    "labels": {"strimzi.io/kind": "KafkaUser"},
+                },
+                "data": {"password": base64.b64encode(b"pass").decode("ascii")},
+            }
+            strimzi_secrets.append(strimzi_secret)
+        object_factory.return_value.objects.return_value.filter.return_value = (
+            kafkausers
+        )
+
+        # Secrets rendered by _create_new_secret are real pykube Secrets
+        Secret.side_effect = RealSecret
+        current_data = _create_new_secret(
+            "ns-current", "kafka", "ns", _copy_object(strimzi_secrets[1].obj)
+        ).obj["data"]
+
+        outdated = MagicMock(obj={"data": {"kafka-client.properties": "old"}})
+        outdated.name = "outdated-kafka-config"
+        current = MagicMock(obj={"data": current_data})
+        current.name = "current-kafka-config"
+
+        Secret.objects.return_value.filter.side_effect = [
+            strimzi_secrets,
+            [outdated, current],
+        ]
+
+        with patch.object(RealSecret, "update") as update:
+            ret = regenerate_kafka_config_secrets("kafka", logger)
+
+        update.assert_called_once()
+        self.assertEqual(ret["regenerated"], 1)
+        self.assertEqual(ret["failed"], 0)
+        self.assertEqual(ret["missing"], 1)
+
+
+class Test_regenerate_on_cluster_ca_change(TestCase):
+    @patch("knuto.secrets.regenerate_kafka_config_secrets")
+    def test_retried_until_all_secrets_regenerated(self, regenerate):
+        body = {"data": {"ca.crt": "bmV3"}}
+        regenerate.return_value = {"regenerated": 1, "failed": 1, "missing": 0}
+
+        with self.assertRaises(kopf.TemporaryError):
+            regenerate_on_cluster_ca_change(
+                body, "kafka", "production-cluster-ca-cert", MagicMock()
+            )
+
+        regenerate.return_value = {"regenerated": 1, "failed": 0, "missing": 0}
+        ret = regenerate_on_cluster_ca_change(
+            body, "kafka", "production-cluster-ca-cert", MagicMock()
+        )
+        self.assertEqual(ret["regenerated"], 1)
+
+
+class Test_load_kafkauser(TestCase):
+    @patch("knuto.secrets.object_factory")
+    @patch("knuto.secrets.kafkauser_index")
+    def test_indexed_kafkauser_is_not_fetched(self, kafkauser_index, object_factory):
+        kafkauser_index.get.return_value = {"metadata": {"name": "ns-test"}}
+
+        ret = _load_kafkauser("kafka", "ns-test")
+
+        object_factory.return_value.assert_called_once()
+        ret.reload.assert_not_called()
+
+    @patch("knuto.secrets.object_factory")
+    @patch("knuto.secrets.kafkauser_index")
+    def test_unknown_kafkauser_is_fetched(self, kafkauser_index, object_factory):
+        kafkauser_index.get.return_value = None
+
+        ret = _load_kafkauser("kafka", "ns-test")
+
+        ret.reload.assert_called_once()
+
+
+class _ImmediateThread:
+    def __init__(self, target, **kwargs):
+        self.target = target
+
+    def start(self):
+        self.target()
+
+
+class Test_park_when_kafkauser_missing(TestCase):
+    @patch("knuto.secrets.threading", MagicMock(Thread=_ImmediateThread))
+    @patch("knuto.secrets.globalconf")
+    @patch("knuto.secrets.kafkauser_index")
+    @patch("knuto.secrets._update_or_create")
+    @patch("knuto.secrets._should_copy")
+    @patch("knuto.secrets._source_namespace_for_secret")
+    def test_parked_until_kafkauser_seen(
+        self,
+        _source_namespace_for_secret,
+        _should_copy,
+        _update_or_create,
+        index,
+        globalconf,
+    ):
+        logger = MagicMock()
+        _should_copy.return_value = True
+        index.get.return_value = None
+        _source_namespace_for_secret.side_effect = [
+            KafkaUserNotFound("kafka", "ns-test"),
+            "ns",
+        ]
+
+        secret_obj = {
+            "metadata": {
+                "namespace": "kafka",
+                "name": "ns-test",
+                "labels": {"strimzi.io/kind": "KafkaUser"},
+            },
+            "data": {"password": base64.b64encode("pass".encode("utf-8"))},
+        }
+
+        # kopf retries the event, unless the KafkaUser is seen before
+        with self.assertRaises(kopf.TemporaryError):
+            kafka_secret(secret_obj, "kafka", "ns-test", logger)
+        _update_or_create.assert_not_called()
+
+        index_kafkauser(
+            {"type": "ADDED"},
+            {"metadata": {"namespace": "kafka", "name": "ns-test"}},
+        )
+
+        _update_or_create.assert_called_once()
+        self.assertEqual(len(waiting_for_kafkauser), 0)
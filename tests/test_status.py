@@ -0,0 +1,78 @@
+from knuto.config import state
+from knuto.fakeapi import fake_api
+from knuto.status import collect, format_report
+
+READY = {"observedGeneration": 1, "conditions": [{"type": "Ready", "status": "True"}]}
+
+
+def _object(kind, namespace, name, source=None, labels=None, status=None):
+    obj = {
+        "apiVersion": "v1" if kind == "Secret" else "kafka.strimzi.io/v1beta1",
+        "kind": kind,
+        "metadata": {
+            "namespace": namespace,
+            "name": name,
+            "generation": 1,
+            "labels": labels or {},
+            "annotations": {"knuto.niradynamics.se/source": source} if source else {},
+        },
+    }
+    if status is not None:
+        obj["status"] = status
+    return obj
+
+
+def test_status_report(monkeypatch):
+    api, adapter = fake_api()
+    monkeypatch.setattr(state, "api", api)
+    cluster = {"strimzi.io/cluster": "kafka"}
+    for obj in [
+        _object("KafkaUser", "dev", "app"),
+        _object("KafkaUser", "kafka", "dev-app", "dev/app", status=READY),
+        _object(
+            "Secret",
+            "kafka",
+            "dev-app",
+            labels=dict(cluster, **{"strimzi.io/kind": "KafkaUser"}),
+        ),
+        _object("Secret", "dev", "app-kafka-config", "kafka/dev-app", labels=cluster),
+        _object("KafkaUser", "dev", "new"),
+        _object("KafkaUser", "kafka", "dev-new", "dev/new", status={}),
+        _object("KafkaUser", "kafka", "dev-old", "dev/old", status=READY),
+        _object("KafkaTopic", "dev", "dev-topic"),
+        _object(
+            "KafkaTopic",
+            "dev",
+            "refused",
+            status={"create_kafkatopic": {"policy_violation": "not prefixed"}},
+        ),
+        _object("KafkaTopic", "kafka", "dev-topic", "dev/dev-topic", status=READY),
+        _object("Secret", "dev", "unrelated"),
+    ]:
+        adapter.put_object(obj)
+
+    report = collect("kafka")
+
+    dev = report["namespaces"]["dev"]
+    assert dev["KafkaUser"] == {
+        "sources": 2,
+        "copied": 2,
+        "ready": 1,
+        "secret": 1,
+        "config": 1,
+    }
+    assert dev["KafkaTopic"] == {"sources": 2, "copied": 1, "ready": 1}
+    assert dev["missing"] == [
+        "KafkaUser dev/new: copy not ready",
+        "KafkaUser dev/new: no Secret kafka/dev-new",
+        "KafkaTopic dev/refused: no copy (policy_violation: not prefixed)",
+    ]
+    assert report["orphans"] == ["KafkaUser kafka/dev-old: source dev/old is gone"]
+    assert format_report(report).startswith("dev: degraded, KafkaUsers 2/2 copied")
+    # One LIST per kind, after the discovery of the Strimzi resources
+    assert {call: n for call, n in adapter.calls.items() if call[0] == "GET"} == {
+        ("GET", "discovery"): 1,
+        ("GET", "kafkausers"): 1,
+        ("GET", "kafkatopics"): 1,
+        ("GET", "secrets"): 1,
+    }
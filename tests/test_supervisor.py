@@ -0,0 +1,49 @@
+from knuto.supervisor import (
+    _supervisor_arguments,
+    split_namespaces,
+    worker_arguments,
+    worker_liveness_endpoint,
+)
+
+
+def test_split_namespaces():
+    assert split_namespaces(["dev", "production", "latest"], 2) == [
+        ["dev", "production"],
+        ["latest"],
+    ]
+    assert split_namespaces(["dev"], 4) == [["dev"]]
+
+
+def test_worker_arguments():
+    args, remaining_args = _supervisor_arguments().parse_known_args(
+        [
+            "-v",
+            "--workers",
+            "2",
+            "--kafka-user-topic-source-namespace",
+            "dev",
+            "--liveness-endpoint",
+            "http://0.0.0.0:8080/healthz",
+            "--metrics-port=9090",
+            "--secret-type-to-bootstrap-server",
+            "scram-sha-512=kafka:9092",
+            "--",
+            "kafka",
+        ]
+    )
+
+    assert args.workers == 2
+    assert args.metrics_port == 9090
+    endpoint = worker_liveness_endpoint(args.liveness_endpoint, 1)
+    assert endpoint == "http://127.0.0.1:8082/healthz"
+    assert worker_arguments(remaining_args, ["dev"], endpoint) == [
+        "--kafka-user-topic-source-namespace",
+        "dev",
+        "--liveness-endpoint",
+        "http://127.0.0.1:8082/healthz",
+        "-v",
+        "--secret-type-to-bootstrap-server",
+        "scram-sha-512=kafka:9092",
+        "--",
+        "kafka",
+    ]
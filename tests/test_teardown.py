@@ -0,0 +1,102 @@
+from unittest import TestCase
+from mock import patch, MagicMock
+
+from pykube.exceptions import ObjectDoesNotExist
+from pykube.objects import NamespacedAPIObject
+
+from knuto.teardown import NamespaceTeardown
+
+
+class KafkaUser(NamespacedAPIObject):
+    version = "kafka.strimzi.io/v1beta1"
+    endpoint = "kafkausers"
+    kind = "KafkaUser"
+
+
+def _namespace(phase):
+    namespace = MagicMock(obj={"status": {"phase": phase}})
+    namespace.metadata = {}
+    return namespace
+
+
+@patch("knuto.teardown._list_paged")
+@patch("knuto.teardown.object_factory")
+@patch("knuto.teardown.Namespace")
+@patch("knuto.teardown.state")
+class Test_NamespaceTeardown(TestCase):
+    def test_active_namespace_is_not_torn_down(
+        self, state, Namespace, object_factory, _list_paged
+    ):
+        Namespace.objects.return_value.get_by_name.return_value = _namespace("Active")
+        teardown = NamespaceTeardown()
+
+        self.assertFalse(
+            teardown.torn_down("dev", [("v", "KafkaUser")], "kafka", MagicMock())
+        )
+        self.assertFalse(
+            teardown.torn_down("dev", [("v", "KafkaUser")], "kafka", MagicMock())
+        )
+
+        state.api.delete.assert_not_called()
+        Namespace.objects.return_value.get_by_name.assert_called_once()
+
+    def test_terminating_namespace_is_torn_down_once(
+        self, state, Namespace, object_factory, _list_paged
+    ):
+        Namespace.objects.return_value.get_by_name.return_value = _namespace(
+            "Terminating"
+        )
+        object_factory.return_value = KafkaUser
+        unlabelled = KafkaUser(
+            MagicMock(),
+            {
+                "metadata": {
+                    "namespace": "kafka",
+                    "name": "dev-old",
+                    "annotations": {"knuto.niradynamics.se/source": "dev/old"},
+                }
+            },
+        )
+        unlabelled.delete = MagicMock()
+        other = KafkaUser(
+            MagicMock(),
+            {
+                "metadata": {
+                    "namespace": "kafka",
+                    "name": "production-user",
+                    "annotations": {"knuto.niradynamics.se/source": "production/user"},
+                }
+            },
+        )
+        other.delete = MagicMock()
+        _list_paged.return_value = [unlabelled, other]
+        teardown = NamespaceTeardown()
+
+        for _ in range(3):
+            self.assertTrue(
+                teardown.torn_down(
+                    "dev", [("kafka.strimzi.io/v1beta1", "KafkaUser")], "kafka", MagicMock()
+                )
+            )
+
+        state.api.delete.assert_called_once_with(
+            version="kafka.strimzi.io/v1beta1",
+            namespace="kafka",
+            url="kafkausers",
+            params={"labelSelector": "knuto.niradynamics.se/source-namespace=dev"},
+        )
+        unlabelled.delete.assert_called_once()
+        other.delete.assert_not_called()
+
+    def test_deleted_namespace_is_torn_down(
+        self, state, Namespace, object_factory, _list_paged
+    ):
+        Namespace.objects.return_value.get_by_name.side_effect = ObjectDoesNotExist()
+        object_factory.return_value = KafkaUser
+        _list_paged.return_value = []
+
+        self.assertTrue(
+            NamespaceTeardown().torn_down(
+                "dev", [("kafka.strimzi.io/v1beta1", "KafkaUser")], "kafka", MagicMock()
+            )
+        )
@@ -0,0 +1,113 @@
+from unittest import TestCase
+from mock import patch
+
+import base64
+
+import kopf
+
+from knuto.secrets import _create_new_secret
+from knuto.tls import KeystoreCache
+
+
+def _b64(value):
+    return base64.b64encode(value.encode("utf-8")).decode("ascii")
+
+
+USER_DATA = {
+    "ca.crt": _b64("clients-ca"),
+    "user.crt": _b64("user-certificate"),
+    "user.key": _b64("user-key"),
+    "user.p12": _b64("user-keystore"),
+    "user.password": _b64("keystore-password"),
+}
+CLUSTER_CA_DATA = {
+    "ca.crt": _b64("cluster-ca"),
+    "ca.p12": _b64("cluster-truststore"),
+    "ca.password": _b64("truststore-password"),
+}
+
+
+class Test_KeystoreCache(TestCase):
+    def test_strimzi_stores_are_reused(self):
+        data = KeystoreCache().client_data(USER_DATA, CLUSTER_CA_DATA)
+
+        self.assertEqual(data["user.p12"], USER_DATA["user.p12"])
+        self.assertEqual(data["truststore.p12"], CLUSTER_CA_DATA["ca.p12"])
+        self.assertEqual(data["cluster-ca.crt"], CLUSTER_CA_DATA["ca.crt"])
+
+    @patch("knuto.tls._build_keystore")
+    def test_keystore_built_once_per_certificate(self, _build_keystore):
+        _build_keystore.return_value = (_b64("built"), _b64("built-password"))
+        cache = KeystoreCache()
+        without_p12 = {
+            key: value for key, value in USER_DATA.items() if key != "user.p12"
+        }
+
+        cache.client_data(without_p12, CLUSTER_CA_DATA)
+        data = cache.client_data(without_p12, CLUSTER_CA_DATA)
+        self.assertEqual(data["user.p12"], _b64("built"))
+        _build_keystore.assert_called_once()
+
+        rotated = dict(without_p12, **{"user.crt": _b64("rotated-certificate")})
+        cache.client_data(rotated, CLUSTER_CA_DATA)
+        self.assertEqual(_build_keystore.call_count, 2)
+
+
+class Test_create_new_secret_tls(TestCase):
+    @patch("knuto.secrets.globalconf")
+    def test_secret_without_cluster_label(self, globalconf):
+        globalconf.secret_type_to_hostname_map = {"tls": "broker:9093"}
+
+        with self.assertRaises(kopf.PermanentError):
+            _create_new_secret(
+                "ns-test",
+                "kafka",
+                "ns",
+                {
+                    "metadata": {
+                        "namespace": "kafka",
+                        "name": "ns-test",
+                        "labels": {"strimzi.io/kind": "KafkaUser"},
+                    },
+                    "data": dict(USER_DATA),
+                },
+            )
+
+    @patch("knuto.secrets._load_cluster_ca")
+    @patch("knuto.secrets.globalconf")
+    def test_tls_secret(self, globalconf, _load_cluster_ca):
+        globalconf.secret_type_to_hostname_map = {"tls": "broker:9093"}
+        globalconf.tls_secret_mount_path = "/etc/kafka-config"
+        _load_cluster_ca.return_value = CLUSTER_CA_DATA
+
+        new_secret = _create_new_secret(
+            "ns-test",
+            "kafka",
+            "ns",
+            {
+                "metadata": {
+                    "namespace": "kafka",
+                    "name": "ns-test",
+                    "labels": {
+                        "strimzi.io/kind": "KafkaUser",
+                        "strimzi.io/cluster": "production",
+                    },
+                },
+                "data": dict(USER_DATA),
+            },
+        )
+
+        _load_cluster_ca.assert_called_with("kafka", "production")
+        self.assertEqual(new_secret.name, "test-kafka-config")
+        self.assertEqual(new_secret.namespace, "ns")
+        properties = base64.b64decode(
+            new_secret.obj["data"]["kafka-client.properties"]
+        ).decode("ascii")
+        self.assertIn("security.protocol=SSL\n", properties)
+        self.assertIn("ssl.keystore.location=/etc/kafka-config/user.p12\n", properties)
+        self.assertIn("ssl.keystore.password=keystore-password\n", properties)
+        self.assertIn("ssl.truststore.password=truststore-password\n", properties)
+        self.assertIn("bootstrap.servers=broker:9093\n", properties)
+        self.assertEqual(
+            new_secret.obj["data"]["truststore.p12"], CLUSTER_CA_DATA["ca.p12"]
+        )
@@ -0,0 +1,102 @@
+import pytest
+
+from knuto.topicconfig import (
+    adjust_spec,
+    config_default_argument,
+    config_range_argument,
+    namespace_settings,
+)
+
+
+def test_arguments():
+    assert config_default_argument("compression.type=zstd") == (
+        None,
+        "compression.type",
+        "zstd",
+    )
+    assert config_default_argument("dev/retention.ms=86400000") == (
+        "dev",
+        "retention.ms",
+        86400000,
+    )
+    assert config_range_argument("dev/partitions=1:12") == (
+        "dev",
+        "partitions",
+        (1, 12),
+    )
+    assert config_range_argument("segment.bytes=:1073741824") == (
+        None,
+        "segment.bytes",
+        (None, 1073741824),
+    )
+    for text in ["partitions", "partitions=12", "partitions=:", "partitions=12:1"]:
+        with pytest.raises(ValueError):
+            config_range_argument(text)
+
+
+def test_namespace_settings_override_those_for_all():
+    settings = {None: {"a": 1, "b": 2}, "dev": {"b": 3}}
+
+    assert namespace_settings(settings, "dev") == {"a": 1, "b": 3}
+    assert namespace_settings(settings, "production") == {"a": 1, "b": 2}
+    assert namespace_settings({}, "dev") == {}
+
+
+def test_adjust_spec():
+    spec = {
+        "partitions": 64,
+        "replicas": 3,
+        "config": {"retention.ms": "31536000000", "cleanup.policy": "compact"},
+    }
+    defaults = {"compression.type": "zstd", "retention.ms": 604800000}
+    ranges = {
+        "partitions": (1, 12),
+        "retention.ms": (3600000, 2592000000),
+        "segment.bytes": (None, 1073741824),
+        "cleanup.policy": (0, 1),
+    }
+
+    adjusted, changes = adjust_spec(spec, defaults, ranges)
+
+    assert adjusted == {
+        "partitions": 12,
+        "replicas": 3,
+        "config": {
+            "retention.ms": 2592000000,
+            "cleanup.policy": "compact",
+            "compression.type": "zstd",
+        },
+    }
+    assert changes == {
+        "compression.type": {"from": None, "to": "zstd"},
+        "partitions": {"from": 64, "to": 12},
+        "retention.ms": {"from": "31536000000", "to": 2592000000},
+    }
+    assert spec["partitions"] == 64
+    assert adjust_spec({"partitions": 3}, {}, ranges) == ({"partitions": 3}, {})
+
+
+def test_defaults_are_clamped_too():
+    adjusted, changes = adjust_spec({}, {"partitions": 32}, {"partitions": (1, 12)})
+
+    assert adjusted == {"partitions": 12}
+    assert changes == {"partitions": {"from": None, "to": 12}}
+
+
+def test_partitions_of_existing_copy_are_not_reduced():
+    ranges = {"partitions": (2, 12)}
+
+    adjusted, changes = adjust_spec(
+        {"partitions": 24}, {}, ranges, current_partitions=16
+    )
+    assert adjusted == {"partitions": 16}
+    assert changes == {"partitions": {"from": 24, "to": 16}}
+
+    assert adjust_spec({"partitions": 16}, {}, ranges, current_partitions=16) == (
+        {"partitions": 16},
+        {},
+    )
+    adjusted, _ = adjust_spec({"partitions": 1}, {}, ranges, current_partitions=16)
+    assert adjusted == {"partitions": 2}
+    adjusted, _ = adjust_spec({"partitions": 24}, {}, ranges, current_partitions=4)
+    assert adjusted == {"partitions": 12}
@@ -0,0 +1,146 @@
+from unittest import TestCase
+from mock import patch, MagicMock
+
+from pykube import Secret
+from pykube.objects import NamespacedAPIObject
+
+from knuto import tracing
+
+
+class KafkaUser(NamespacedAPIObject):
+    version = "kafka.strimzi.io/v1beta1"
+    endpoint = "kafkausers"
+    kind = "KafkaUser"
+
+
+class Test_last_write_time(TestCase):
+    def test_latest_managed_field_wins(self):
+        metadata = {
+            "creationTimestamp": "2021-01-01T00:00:00Z",
+            "managedFields": [
+                {"manager": "kubectl", "time": "2021-01-01T00:00:10Z"},
+                {"manager": "knuto"},
+            ],
+        }
+
+        self.assertEqual(
+            tracing.last_write_time(metadata),
+            tracing.last_write_time({"creationTimestamp": "2021-01-01T00:00:10Z"}),
+        )
+
+
+class Test_stamp_copy(TestCase):
+    @patch("knuto.tracing.replication_lag")
+    def test_kafkauser_annotations_reach_secret_template(self, replication_lag):
+        copy = KafkaUser(
+            MagicMock(), {"metadata": {"name": "ns-test"}, "spec": {"acls": []}}
+        )
+
+        tracing.stamp_copy(
+            {"metadata": {"creationTimestamp": "2021-01-01T00:00:00Z"}}, copy
+        )
+
+        secret_annotations = copy.obj["spec"]["template"]["secret"]["metadata"][
+            "annotations"
+        ]
+        self.assertEqual(secret_annotations, copy.annotations)
+        self.assertEqual(
+            set(secret_annotations),
+            set(
+                [
+                    tracing.TRACE_ID_ANNOTATION,
+                    tracing.SOURCE_TIMESTAMP_ANNOTATION,
+                    tracing.COPIED_TIMESTAMP_ANNOTATION,
+                ]
+            ),
+        )
+        replication_lag.labels.assert_called_with("KafkaUser", "copy")
+
+
+    @patch("knuto.tracing.replication_lag")
+    def test_unchanged_kafkauser_spec_keeps_its_stamps(self, replication_lag):
+        source = {"metadata": {"creationTimestamp": "2021-01-01T00:00:00Z"}}
+        current = KafkaUser(
+            MagicMock(), {"metadata": {"name": "ns-test"}, "spec": {"acls": []}}
+        )
+        tracing.stamp_copy(source, current)
+        stamped_spec = dict(current.obj["spec"])
+
+        copy = KafkaUser(
+            MagicMock(), {"metadata": {"name": "ns-test"}, "spec": {"acls": []}}
+        )
+        tracing.stamp_copy(source, copy, current)
+        self.assertEqual(copy.obj["spec"], stamped_spec)
+        self.assertNotEqual(
+            copy.annotations[tracing.TRACE_ID_ANNOTATION],
+            current.annotations[tracing.TRACE_ID_ANNOTATION],
+        )
+
+        changed = KafkaUser(
+            MagicMock(), {"metadata": {"name": "ns-test"}, "spec": {"acls": [{}]}}
+        )
+        tracing.stamp_copy(source, changed, current)
+        self.assertEqual(
+            changed.obj["spec"]["template"]["secret"]["metadata"]["annotations"],
+            changed.annotations,
+        )
+
+
+class Test_observe_delivery(TestCase):
+    @patch("knuto.tracing.replication_lag")
+    def test_untraced_secret_is_ignored(self, replication_lag):
+        new_secret = Secret(MagicMock(), {"metadata": {"name": "test-kafka-config"}})
+
+        tracing.stamp_delivery(new_secret)
+        tracing.observe_delivery({"metadata": {}}, new_secret)
+
+        self.assertEqual(new_secret.annotations, {})
+        replication_lag.labels.assert_not_called()
+
+    @patch("knuto.tracing.replication_lag")
+    def test_all_stages_observed(self, replication_lag):
+        new_secret = Secret(
+            MagicMock(),
+            {
+                "metadata": {
+                    "name": "test-kafka-config",
+                    "annotations": {
+                        tracing.TRACE_ID_ANNOTATION: "0af7651916cd43dd8448eb211c80319c",
+                        tracing.SOURCE_TIMESTAMP_ANNOTATION: "1609459200.000",
+                        tracing.COPIED_TIMESTAMP_ANNOTATION: "1609459201.000",
+                    },
+                }
+            },
+        )
+
+        tracing.stamp_delivery(new_secret)
+        tracing.observe_delivery(
+            {"metadata": {"creationTimestamp": "2021-01-01T00:00:05Z"}}, new_secret
+        )
+
+        stages = [call.args[1] for call in replication_lag.labels.call_args_list]
+        self.assertEqual(stages, ["strimzi", "secret", "total"])
+        replication_lag.labels.return_value.observe.assert_any_call(4.0)
+
+    @patch("knuto.tracing.replication_lag")
+    def test_each_trace_is_observed_once(self, replication_lag):
+        new_secret = Secret(
+            MagicMock(),
+            {
+                "metadata": {
+                    "name": "test-kafka-config",
+                    "annotations": {
+                        tracing.TRACE_ID_ANNOTATION: "5b8aa5a2d2c872e8321cf37308d69df2",
+                        tracing.SOURCE_TIMESTAMP_ANNOTATION: "1609459200.000",
+                        tracing.COPIED_TIMESTAMP_ANNOTATION: "1609459201.000",
+                    },
+                }
+            },
+        )
+
+        # Strimzi updates the Secret again, without a new trace
+        for _ in range(2):
+            tracing.stamp_delivery(new_secret)
+            tracing.observe_delivery({"metadata": {}}, new_secret)
+
+        self.assertEqual(replication_lag.labels.call_count, 3)
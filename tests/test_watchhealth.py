@@ -0,0 +1,86 @@
+from unittest import TestCase
+from mock import MagicMock
+
+import kopf
+from pykube.objects import NamespacedAPIObject
+
+from knuto.watchhealth import WatchHealth, watch_health, watches_probe
+
+
+class KafkaTopic(NamespacedAPIObject):
+    version = "kafka.strimzi.io/v1beta1"
+    endpoint = "kafkatopics"
+    kind = "KafkaTopic"
+
+
+def _body(name, resource_version, written="2020-01-01T00:00:00Z"):
+    return {
+        "metadata": {
+            "namespace": "ns",
+            "name": name,
+            "resourceVersion": resource_version,
+            "creationTimestamp": written,
+        }
+    }
+
+
+class Test_WatchHealth(TestCase):
+    def test_delivered_versions_are_not_stale(self):
+        health = WatchHealth()
+        health.observe("KafkaTopic", None, _body("ns-a", "1"))
+        health.observe("KafkaTopic", "MODIFIED", _body("ns-a", "2"))
+
+        missed = health.check(
+            "KafkaTopic", [KafkaTopic(MagicMock(), _body("ns-a", "2"))], 300
+        )
+
+        self.assertEqual(missed, [])
+        self.assertEqual(health.stale_kinds(), [])
+
+    def test_old_undelivered_version_is_missed(self):
+        health = WatchHealth()
+        health.observe("KafkaTopic", None, _body("ns-a", "1"))
+
+        missed = health.check(
+            "KafkaTopic",
+            [
+                KafkaTopic(MagicMock(), _body("ns-a", "2")),
+                KafkaTopic(MagicMock(), _body("ns-b", "3")),
+            ],
+            300,
+        )
+
+        self.assertEqual(missed, ["ns/ns-a", "ns/ns-b"])
+        self.assertEqual(health.stale_kinds(), ["KafkaTopic"])
+
+    def test_recent_undelivered_version_is_given_time(self):
+        health = WatchHealth()
+
+        missed = health.check(
+            "KafkaTopic",
+            [KafkaTopic(MagicMock(), _body("ns-a", "2", written="2999-01-01T00:00:00Z"))],
+            300,
+        )
+
+        self.assertEqual(missed, [])
+
+    def test_deleted_objects_are_forgotten(self):
+        health = WatchHealth()
+        health.observe("KafkaTopic", None, _body("ns-a", "1"))
+        health.observe("KafkaTopic", "DELETED", _body("ns-a", "1"))
+
+        self.assertEqual(health.check("KafkaTopic", [], 300), [])
+        self.assertIn("KafkaTopic", health.report())
+
+
+class Test_watches_probe(TestCase):
+    def tearDown(self):
+        watch_health.check("KafkaTopic", [], 300)
+
+    def test_stale_watch_fails_probe(self):
+        watch_health.check(
+            "KafkaTopic", [KafkaTopic(MagicMock(), _body("ns-a", "1"))], 300
+        )
+
+        with self.assertRaises(kopf.PermanentError):
+            watches_probe()